@@ -34,4 +34,355 @@ BEGIN
     GROUP BY u.id;
 END $$
 
-DELIMITER ;
\ No newline at end of file
+DELIMITER ;
+
+/*
+    Published child counters
+
+    Maintained by the triggers below and reconciled daily, since triggers do not fire for cascaded deletes.
+    The counter updates keep modified_at untouched.
+*/
+
+ALTER TABLE projects
+    ADD COLUMN IF NOT EXISTS sites_count INTEGER NOT NULL DEFAULT 0 COMMENT 'Published sites';
+ALTER TABLE sites
+    ADD COLUMN IF NOT EXISTS memories_count INTEGER NOT NULL DEFAULT 0 COMMENT 'Published memories';
+ALTER TABLE memories
+    ADD COLUMN IF NOT EXISTS comments_count INTEGER NOT NULL DEFAULT 0 COMMENT 'Published comments';
+
+DELIMITER $$
+
+DROP TRIGGER IF EXISTS sites_count_insert $$
+CREATE TRIGGER sites_count_insert
+    AFTER INSERT
+    ON sites
+    FOR EACH ROW
+BEGIN
+    IF NEW.published THEN
+        UPDATE projects SET sites_count = sites_count + 1, modified_at = modified_at WHERE id = NEW.project_id;
+    END IF;
+END $$
+
+DROP TRIGGER IF EXISTS sites_count_update $$
+CREATE TRIGGER sites_count_update
+    AFTER UPDATE
+    ON sites
+    FOR EACH ROW
+BEGIN
+    IF NEW.published <> OLD.published OR NEW.project_id <> OLD.project_id THEN
+        IF OLD.published THEN
+            UPDATE projects SET sites_count = sites_count - 1, modified_at = modified_at WHERE id = OLD.project_id;
+        END IF;
+        IF NEW.published THEN
+            UPDATE projects SET sites_count = sites_count + 1, modified_at = modified_at WHERE id = NEW.project_id;
+        END IF;
+    END IF;
+END $$
+
+DROP TRIGGER IF EXISTS sites_count_delete $$
+CREATE TRIGGER sites_count_delete
+    AFTER DELETE
+    ON sites
+    FOR EACH ROW
+BEGIN
+    IF OLD.published THEN
+        UPDATE projects SET sites_count = sites_count - 1, modified_at = modified_at WHERE id = OLD.project_id;
+    END IF;
+END $$
+
+DROP TRIGGER IF EXISTS memories_count_insert $$
+CREATE TRIGGER memories_count_insert
+    AFTER INSERT
+    ON memories
+    FOR EACH ROW
+BEGIN
+    IF NEW.published THEN
+        UPDATE sites SET memories_count = memories_count + 1, modified_at = modified_at WHERE id = NEW.site_id;
+    END IF;
+END $$
+
+DROP TRIGGER IF EXISTS memories_count_update $$
+CREATE TRIGGER memories_count_update
+    AFTER UPDATE
+    ON memories
+    FOR EACH ROW
+BEGIN
+    IF NEW.published <> OLD.published OR NEW.site_id <> OLD.site_id THEN
+        IF OLD.published THEN
+            UPDATE sites SET memories_count = memories_count - 1, modified_at = modified_at WHERE id = OLD.site_id;
+        END IF;
+        IF NEW.published THEN
+            UPDATE sites SET memories_count = memories_count + 1, modified_at = modified_at WHERE id = NEW.site_id;
+        END IF;
+    END IF;
+END $$
+
+DROP TRIGGER IF EXISTS memories_count_delete $$
+CREATE TRIGGER memories_count_delete
+    AFTER DELETE
+    ON memories
+    FOR EACH ROW
+BEGIN
+    IF OLD.published THEN
+        UPDATE sites SET memories_count = memories_count - 1, modified_at = modified_at WHERE id = OLD.site_id;
+    END IF;
+END $$
+
+DROP TRIGGER IF EXISTS comments_count_insert $$
+CREATE TRIGGER comments_count_insert
+    AFTER INSERT
+    ON comments
+    FOR EACH ROW
+BEGIN
+    IF NEW.published THEN
+        UPDATE memories SET comments_count = comments_count + 1, modified_at = modified_at WHERE id = NEW.memory_id;
+    END IF;
+END $$
+
+DROP TRIGGER IF EXISTS comments_count_update $$
+CREATE TRIGGER comments_count_update
+    AFTER UPDATE
+    ON comments
+    FOR EACH ROW
+BEGIN
+    IF NEW.published <> OLD.published OR NEW.memory_id <> OLD.memory_id THEN
+        IF OLD.published THEN
+            UPDATE memories SET comments_count = comments_count - 1, modified_at = modified_at WHERE id = OLD.memory_id;
+        END IF;
+        IF NEW.published THEN
+            UPDATE memories SET comments_count = comments_count + 1, modified_at = modified_at WHERE id = NEW.memory_id;
+        END IF;
+    END IF;
+END $$
+
+DROP TRIGGER IF EXISTS comments_count_delete $$
+CREATE TRIGGER comments_count_delete
+    AFTER DELETE
+    ON comments
+    FOR EACH ROW
+BEGIN
+    IF OLD.published THEN
+        UPDATE memories SET comments_count = comments_count - 1, modified_at = modified_at WHERE id = OLD.memory_id;
+    END IF;
+END $$
+
+DROP PROCEDURE IF EXISTS reconcile_counters $$
+CREATE PROCEDURE reconcile_counters()
+BEGIN
+    UPDATE projects p
+    SET p.sites_count = (SELECT COUNT(*) FROM sites s WHERE s.project_id = p.id AND s.published),
+        p.modified_at = p.modified_at;
+    UPDATE sites s
+    SET s.memories_count = (SELECT COUNT(*) FROM memories m WHERE m.site_id = s.id AND m.published),
+        s.modified_at    = s.modified_at;
+    UPDATE memories m
+    SET m.comments_count = (SELECT COUNT(*) FROM comments c WHERE c.memory_id = m.id AND c.published),
+        m.modified_at    = m.modified_at;
+END $$
+
+DROP EVENT IF EXISTS reconcile_counters;
+CREATE EVENT reconcile_counters
+    ON SCHEDULE EVERY 24 HOUR
+        STARTS '2021-01-01 02:20:00'
+    DO CALL reconcile_counters() $$
+
+DELIMITER ;
+
+CALL reconcile_counters();
+
+/*
+    Localized read models
+
+    Every site and project has a row per language with the localization fallback already resolved.
+    Triggers refresh the rows of the changed entity or the added language and the whole model is rebuilt daily.
+    Reads fall back to the row of the default language if the requested one is missing.
+*/
+
+CREATE TABLE IF NOT EXISTS project_localized
+(
+    project_id  INTEGER      NOT NULL COMMENT 'fk',
+    lang        VARCHAR(5)   NOT NULL COMMENT 'Requested language',
+    info_lang   VARCHAR(5)   NOT NULL COMMENT 'Language of the information',
+    name        VARCHAR(255) NOT NULL,
+    abstract    TEXT,
+    description LONGTEXT,
+    image       VARCHAR(100) NULL COLLATE ascii_general_ci,
+
+    PRIMARY KEY pk_pl (project_id, lang),
+
+    CONSTRAINT FOREIGN KEY fk_pl_project (project_id) REFERENCES projects (id)
+        ON UPDATE RESTRICT
+        ON DELETE CASCADE
+) COMMENT 'Localized read model for projects';
+
+CREATE TABLE IF NOT EXISTS site_localized
+(
+    site_id     INTEGER      NOT NULL COMMENT 'fk',
+    lang        VARCHAR(5)   NOT NULL COMMENT 'Requested language',
+    project_id  INTEGER      NOT NULL COMMENT 'fk',
+    info_lang   VARCHAR(5)   NOT NULL COMMENT 'Language of the information',
+    name        VARCHAR(255) NOT NULL,
+    abstract    TEXT,
+    description LONGTEXT,
+    image       VARCHAR(100) NULL COLLATE ascii_general_ci,
+    modifier_id INTEGER      NULL COMMENT 'Modifier of the information in the requested language',
+
+    PRIMARY KEY pk_sl (site_id, lang),
+    INDEX idx_sl_project (project_id, lang),
+
+    CONSTRAINT FOREIGN KEY fk_sl_site (site_id) REFERENCES sites (id)
+        ON UPDATE RESTRICT
+        ON DELETE CASCADE,
+    CONSTRAINT FOREIGN KEY fk_sl_project (project_id) REFERENCES projects (id)
+        ON UPDATE RESTRICT
+        ON DELETE CASCADE
+) COMMENT 'Localized read model for sites';
+
+DELIMITER $$
+
+DROP PROCEDURE IF EXISTS refresh_project_localized $$
+CREATE PROCEDURE refresh_project_localized(IN project INTEGER, IN language VARCHAR(5))
+BEGIN
+    DELETE
+    FROM project_localized
+    WHERE (project IS NULL OR project_id = project)
+      AND (language IS NULL OR lang = language);
+    INSERT INTO project_localized (project_id, lang, info_lang, name, abstract, description, image)
+    SELECT p.id,
+           l.lang,
+           IF(pi.project_id IS NULL, def_l.lang, l.lang),
+           COALESCE(pi.name, def_pi.name, p.name),
+           IFNULL(pi.abstract, def_pi.abstract),
+           IFNULL(pi.description, def_pi.description),
+           i.file_name
+    FROM projects p
+             JOIN languages l
+             LEFT JOIN project_information pi ON p.id = pi.project_id
+        AND pi.lang_id = l.id
+             JOIN project_information def_pi ON p.id = def_pi.project_id
+        AND def_pi.lang_id = p.default_language_id
+             JOIN languages def_l ON def_pi.lang_id = def_l.id
+             LEFT JOIN images i ON p.image_id = i.id
+    WHERE (project IS NULL OR p.id = project)
+      AND (language IS NULL OR l.lang = language);
+END $$
+
+DROP PROCEDURE IF EXISTS refresh_site_localized $$
+CREATE PROCEDURE refresh_site_localized(IN site INTEGER, IN project INTEGER, IN language VARCHAR(5))
+BEGIN
+    DELETE
+    FROM site_localized
+    WHERE (site IS NULL OR site_id = site)
+      AND (project IS NULL OR project_id = project)
+      AND (language IS NULL OR lang = language);
+    INSERT INTO site_localized (site_id, lang, project_id, info_lang, name, abstract, description, image, modifier_id)
+    SELECT s.id,
+           l.lang,
+           s.project_id,
+           IF(si.site_id IS NULL, def_l.lang, l.lang),
+           COALESCE(si.name, def_si.name, s.name),
+           IFNULL(si.abstract, def_si.abstract),
+           IFNULL(si.description, def_si.description),
+           i.file_name,
+           si.modifier_id
+    FROM sites s
+             JOIN projects p ON p.id = s.project_id
+             JOIN languages l
+             LEFT JOIN site_information si ON s.id = si.site_id
+        AND si.lang_id = l.id
+             JOIN site_information def_si ON s.id = def_si.site_id
+        AND def_si.lang_id = p.default_language_id
+             JOIN languages def_l ON def_si.lang_id = def_l.id
+             LEFT JOIN images i ON s.image_id = i.id
+    WHERE (site IS NULL OR s.id = site)
+      AND (project IS NULL OR s.project_id = project)
+      AND (language IS NULL OR l.lang = language);
+END $$
+
+DROP PROCEDURE IF EXISTS refresh_localized $$
+CREATE PROCEDURE refresh_localized()
+BEGIN
+    CALL refresh_project_localized(NULL, NULL);
+    CALL refresh_site_localized(NULL, NULL, NULL);
+END $$
+
+DROP TRIGGER IF EXISTS project_localized_insert $$
+CREATE TRIGGER project_localized_insert
+    AFTER INSERT
+    ON project_information
+    FOR EACH ROW CALL refresh_project_localized(NEW.project_id, NULL) $$
+
+DROP TRIGGER IF EXISTS project_localized_update $$
+CREATE TRIGGER project_localized_update
+    AFTER UPDATE
+    ON project_information
+    FOR EACH ROW CALL refresh_project_localized(NEW.project_id, NULL) $$
+
+DROP TRIGGER IF EXISTS project_localized_delete $$
+CREATE TRIGGER project_localized_delete
+    AFTER DELETE
+    ON project_information
+    FOR EACH ROW CALL refresh_project_localized(OLD.project_id, NULL) $$
+
+DROP TRIGGER IF EXISTS project_localized_project $$
+CREATE TRIGGER project_localized_project
+    AFTER UPDATE
+    ON projects
+    FOR EACH ROW
+BEGIN
+    IF NOT NEW.image_id <=> OLD.image_id OR NEW.default_language_id <> OLD.default_language_id THEN
+        CALL refresh_project_localized(NEW.id, NULL);
+    END IF;
+    IF NEW.default_language_id <> OLD.default_language_id THEN
+        CALL refresh_site_localized(NULL, NEW.id, NULL);
+    END IF;
+END $$
+
+DROP TRIGGER IF EXISTS site_localized_insert $$
+CREATE TRIGGER site_localized_insert
+    AFTER INSERT
+    ON site_information
+    FOR EACH ROW CALL refresh_site_localized(NEW.site_id, NULL, NULL) $$
+
+DROP TRIGGER IF EXISTS site_localized_update $$
+CREATE TRIGGER site_localized_update
+    AFTER UPDATE
+    ON site_information
+    FOR EACH ROW CALL refresh_site_localized(NEW.site_id, NULL, NULL) $$
+
+DROP TRIGGER IF EXISTS site_localized_delete $$
+CREATE TRIGGER site_localized_delete
+    AFTER DELETE
+    ON site_information
+    FOR EACH ROW CALL refresh_site_localized(OLD.site_id, NULL, NULL) $$
+
+DROP TRIGGER IF EXISTS site_localized_site $$
+CREATE TRIGGER site_localized_site
+    AFTER UPDATE
+    ON sites
+    FOR EACH ROW
+BEGIN
+    IF NOT NEW.image_id <=> OLD.image_id OR NEW.project_id <> OLD.project_id THEN
+        CALL refresh_site_localized(NEW.id, NULL, NULL);
+    END IF;
+END $$
+
+DROP TRIGGER IF EXISTS languages_localized $$
+CREATE TRIGGER languages_localized
+    AFTER INSERT
+    ON languages
+    FOR EACH ROW
+BEGIN
+    CALL refresh_project_localized(NULL, NEW.lang);
+    CALL refresh_site_localized(NULL, NULL, NEW.lang);
+END $$
+
+DROP EVENT IF EXISTS refresh_localized;
+CREATE EVENT refresh_localized
+    ON SCHEDULE EVERY 24 HOUR
+        STARTS '2021-01-01 02:30:00'
+    DO CALL refresh_localized() $$
+
+DELIMITER ;
+
+CALL refresh_localized();
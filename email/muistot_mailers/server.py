@@ -1,4 +1,4 @@
-from httpx import AsyncClient
+from muistot.clients import clients
 from muistot.mailer import Mailer, Result
 
 
@@ -19,13 +19,13 @@ class ServerMailer(Mailer):
         token = data.pop("token")
         url = urlencode(dict(user=data["user"], token=token, verified=data["verified"]))
         data["url"] = f'{self.reroute}#email-login:{url}'
-        async with AsyncClient() as client:
-            r = await client.post(
-                f"{self.host}/send",
-                json={"email": email, **data},
-                headers={"Authorization": f"bearer {self.token}"},
-            )
-            if 199 < r.status_code < 300:
-                return Result(success=True)
-            else:
-                return Result(success=False)
+        url = f"{self.host}/send"
+        r = await clients.get(url).post(
+            url,
+            json={"email": email, **data},
+            headers={"Authorization": f"bearer {self.token}"},
+        )
+        if 199 < r.status_code < 300:
+            return Result(success=True)
+        else:
+            return Result(success=False)
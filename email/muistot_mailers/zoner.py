@@ -1,9 +1,9 @@
 import pathlib
-import time
 from collections import deque
 from email.message import EmailMessage
-from smtplib import SMTP_SSL, SMTP
-from threading import Thread, Event
+from smtplib import SMTP_SSL, SMTP, SMTPServerDisconnected
+from threading import Thread, Condition, current_thread
+from typing import Optional
 
 from muistot.logging import log
 from muistot.mailer import Mailer, Result
@@ -18,7 +18,16 @@ class MailerConfig(BaseModel):
     ssl: bool = True
     sender: str
     service_url: str
-    delay: int = 10
+
+    # Queue
+    # -----------------------
+    # idle_timeout: Seconds an idle SMTP connection is kept open
+    # max_queue:    Mails allowed to wait for sending, new mails are rejected when full
+    # batch_size:   Mails sent per wake up before checking for shutdown
+    # -----------------------
+    idle_timeout: int = 60
+    max_queue: int = 1000
+    batch_size: int = 50
 
 
 with open(pathlib.Path(__file__).parent / "zoner_template.html", "r") as f:
@@ -56,36 +65,88 @@ def get_eng_template(user: str, link: str):
 
 
 class ZonerMailer(Mailer):
+    """SMTP mailer
+
+    Mails are queued and sent from a single thread that sleeps on a condition while the queue is empty.
+    The SMTP connection is kept logged in between mails and closed after being idle for `idle_timeout`.
+    When the queue is full new mails are rejected instead of letting the backlog grow.
+    Closing stops accepting mails and the thread exits once the queued ones are sent.
+    """
     config: MailerConfig
-    connection: SMTP
+    connection: Optional[SMTP]
 
     def __init__(self, **kwargs):
         self.config = MailerConfig(**kwargs)
         self.queue = deque()
-        self.flag = Event()
+        self.condition = Condition()
+        self.closed = False
+        self.connection = None
         self.thread = Thread(name="Zoner Mailer",
                              target=self.send_threaded, daemon=True)
         self.thread.start()
 
     def __del__(self):
-        self.flag.set()
+        self.close()
+
+    def close(self, timeout: Optional[float] = None):
+        with self.condition:
+            if not self.closed and self.queue:
+                log.info(f"Mailer closing with {len(self.queue)} mails queued, sending them first")
+            self.closed = True
+            self.condition.notify()
+        if timeout is not None and current_thread() is not self.thread:
+            self.thread.join(timeout)
+            if self.thread.is_alive():
+                log.warning(f"Mailer closed with {len(self.queue)} mails still queued")
+
+    @property
+    def depth(self) -> int:
+        """Number of mails waiting to be sent
+        """
+        return len(self.queue)
+
+    def connect(self):
+        s = (SMTP_SSL if self.config.ssl else SMTP)(self.config.host, port=self.config.port)
+        try:
+            s.login(self.config.user, self.config.password)
+        except BaseException:
+            s.close()
+            raise
+        self.connection = s
+
+    def disconnect(self):
+        if self.connection is not None:
+            s = self.connection
+            self.connection = None
+            try:
+                s.quit()
+            except BaseException:
+                s.close()
+
+    def take_batch(self):
+        """Waits for mails and takes at most one batch from the queue
+
+        Returns nothing if no mails arrived within the idle timeout.
+        """
+        with self.condition:
+            if not self.queue and not self.closed:
+                self.condition.wait(timeout=self.config.idle_timeout)
+            return [self.queue.popleft() for _ in range(0, min(len(self.queue), self.config.batch_size))]
 
     def send_threaded(self):
-        while not self.flag.is_set():
-            try:
-                mail_order = self.queue.popleft()
-                with (SMTP_SSL if self.config.ssl else SMTP)(self.config.host, port=self.config.port) as s:
-                    s.login(self.config.user, self.config.password)
-                    self.connection = s
+        try:
+            while True:
+                batch = self.take_batch()
+                if not batch:
+                    if self.closed:
+                        break
+                    self.disconnect()
+                elif len(batch) > 1:
+                    log.info(f"Sending {len(batch)} mails, {self.depth} queued")
+                for mail_order in batch:
                     self.handle_threaded(*mail_order)
-                    while True:
-                        mail_order = self.queue.popleft()
-                        self.handle_threaded(*mail_order)
-            except IndexError:
-                time.sleep(self.config.delay)
-            finally:
-                if hasattr(self, "connection"):
-                    del self.connection
+        finally:
+            self.disconnect()
 
     def send_via_smtp(self, email: str, subject: str, text: str, html: str):
         mail = EmailMessage()
@@ -93,8 +154,19 @@ class ZonerMailer(Mailer):
         mail["From"] = self.get_sender()
         mail["To"] = email
         mail.set_content(text)
-        mail.add_alternative(html, subtype="html")
-        self.connection.send_message(mail)
+        if html is not None:
+            mail.add_alternative(html, subtype="html")
+        if self.connection is None:
+            self.connect()
+        try:
+            self.connection.send_message(mail)
+        except SMTPServerDisconnected:
+            # The server dropped the kept open connection
+            s = self.connection
+            self.connection = None
+            s.close()
+            self.connect()
+            self.connection.send_message(mail)
 
     def get_sender(self):
         return f"Muistotkartalla <{self.config.sender}>"
@@ -167,7 +239,15 @@ class ZonerMailer(Mailer):
 
         except BaseException as e:
             log.exception("Failed mail", exc_info=e)
+            self.disconnect()
 
     async def send_email(self, email: str, email_type: str, **data):
-        self.queue.append((email, email_type, data))
+        with self.condition:
+            if self.closed:
+                return Result(success=False, reason="Mailer closed")
+            if len(self.queue) >= self.config.max_queue:
+                log.warning(f"Mail queue full with {len(self.queue)} mails")
+                return Result(success=False, reason="Too many emails queued")
+            self.queue.append((email, email_type, data))
+            self.condition.notify()
         return Result(success=True)
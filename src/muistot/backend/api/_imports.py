@@ -19,3 +19,4 @@ from ...database import Databases, Database
 from ...security import require_auth, scopes
 
 DEFAULT_DB = Depends(Databases.default)
+READ_DB = Depends(Databases.read)
@@ -1,7 +1,11 @@
+from typing import Optional
+
+from pydantic import conint
+
 from ._imports import *
 
 router = make_router(tags=["Comments"])
-caches = Cache("comments", evicts=["sites"])
+caches = Cache("comments")
 
 
 @router.get(
@@ -10,21 +14,31 @@ caches = Cache("comments", evicts=["sites"])
     description=dedent(
         """
         Returns all comments for a memory.
+        
+        The comments can be paged by giving a limit and/or a cursor.
+        Pages are ordered by comment id and the next cursor is returned while there are more comments.
         """
     ),
     responses=rex.gets(Comments),
 )
-@caches.args("project", "site", "memory")
+@caches.args("project", "site", "memory", "limit", "cursor")
 async def get_comments(
         r: Request,
         project: PID,
         site: SID,
         memory: MID,
-        db: Database = DEFAULT_DB
+        limit: Optional[conint(ge=1, le=MAX_PAGE_SIZE)] = None,
+        cursor: Optional[str] = None,
+        db: Database = READ_DB
 ) -> Comments:
+    limit = page_size(limit, cursor)
+    after = decode_cursor(cursor, int)
     repo = CommentRepo(db, project, site, memory)
     repo.configure(r)
-    return Comments(items=await repo.all())
+    if limit is None:
+        return Comments(items=await repo.all())
+    items, next_cursor = paginate(await repo.all(limit=limit + 1, after=after), limit, lambda o: o.id)
+    return Comments(items=items, next=next_cursor)
 
 
 @router.get(
@@ -44,7 +58,7 @@ async def get_comment(
         site: SID,
         memory: MID,
         comment: CID,
-        db: Database = DEFAULT_DB,
+        db: Database = READ_DB,
 ) -> Comment:
     repo = CommentRepo(db, project, site, memory)
     repo.configure(r)
@@ -31,7 +31,7 @@ router = make_router(tags=["Me"], default_response_class=Response)
     },
 )
 @require_auth(scopes.AUTHENTICATED)
-async def me(request: Request, db: Database = DEFAULT_DB):
+async def me(request: Request, db: Database = READ_DB):
     return await get_user_data(db, request.user.identity)
 
 
@@ -126,7 +126,7 @@ async def change_my_username(request: Request, username: str, db: Database = DEF
 )
 @require_auth(scopes.AUTHENTICATED)
 async def log_me_out(request: Request):
-    manager(request).end_session(request.user.token)
+    await manager(request).end_session(request.user.token)
 
 
 @router.delete(
@@ -140,4 +140,4 @@ async def log_me_out(request: Request):
 )
 @require_auth(scopes.AUTHENTICATED)
 async def log_me_out_all(request: Request):
-    manager(request).clear_sessions(request.user.identity)
+    await manager(request).clear_sessions(request.user.identity)
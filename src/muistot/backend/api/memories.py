@@ -1,7 +1,12 @@
+from typing import Optional
+
+from fastapi import HTTPException, status
+from pydantic import conint
+
 from ._imports import *
 
 router = make_router(tags=["Memories"])
-caches = Cache("memories", evicts={"sites"})
+caches = Cache("memories")
 
 
 @router.get(
@@ -12,21 +17,43 @@ caches = Cache("memories", evicts={"sites"})
         Returns all memories for a single site.
         
         Optionally returns all comments with the memories.
+        
+        The memories can be paged by giving a limit and/or a cursor.
+        Pages are ordered by memory id and the next cursor is returned while there are more memories.
+        
+        Large collections can be streamed by setting stream.
+        Streamed responses are not cached and cannot be combined with paging or comments.
         """
     ),
     responses=rex.gets(Memories),
 )
-@caches.args("project", "site", "include_comments")
+@caches.args("project", "site", "include_comments", "limit", "cursor", exclude=lambda *_, **kwargs: kwargs["stream"])
 async def get_memories(
         r: Request,
         project: PID,
         site: SID,
-        db: Database = DEFAULT_DB,
+        db: Database = READ_DB,
         include_comments: bool = False,
+        limit: Optional[conint(ge=1, le=MAX_PAGE_SIZE)] = None,
+        cursor: Optional[str] = None,
+        stream: bool = False,
 ) -> Memories:
+    limit = page_size(limit, cursor)
+    if stream and (limit is not None or include_comments):
+        raise HTTPException(status_code=status.HTTP_422_UNPROCESSABLE_ENTITY, detail="Bad Params")
+    after = decode_cursor(cursor, int)
     repo = MemoryRepo(db, project, site)
     repo.configure(r)
-    return Memories(items=await repo.all(include_comments=include_comments))
+    if stream:
+        return streamed(await repo.stream())
+    if limit is None:
+        return Memories(items=await repo.all(include_comments=include_comments))
+    items, next_cursor = paginate(
+        await repo.all(include_comments=include_comments, limit=limit + 1, after=after),
+        limit,
+        lambda o: o.id,
+    )
+    return Memories(items=items, next=next_cursor)
 
 
 @router.get(
@@ -47,7 +74,7 @@ async def get_memory(
         project: PID,
         site: SID,
         memory: MID,
-        db: Database = DEFAULT_DB,
+        db: Database = READ_DB,
         include_comments: bool = False,
 ) -> Memory:
     repo = MemoryRepo(db, project, site)
@@ -22,7 +22,7 @@ caches = Cache("projects")
 @caches.key("projects")
 async def get_projects(
         r: Request,
-        db: Database = DEFAULT_DB
+        db: Database = READ_DB
 ) -> Projects:
     repo = ProjectRepo(db)
     repo.configure(r)
@@ -50,7 +50,7 @@ async def get_projects(
 async def get_project(
         r: Request,
         project: PID,
-        db: Database = DEFAULT_DB,
+        db: Database = READ_DB,
 ) -> Project:
     repo = ProjectRepo(db)
     repo.configure(r)
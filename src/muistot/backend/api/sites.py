@@ -1,4 +1,4 @@
-from typing import Optional
+from typing import Optional, Tuple
 
 from fastapi import HTTPException, status
 from pydantic import conint, confloat
@@ -6,7 +6,7 @@ from pydantic import conint, confloat
 from ._imports import *
 
 router = make_router(tags=["Sites"])
-caches = Cache("sites", evicts={"projects"})
+caches = Cache("sites")
 
 
 @router.get(
@@ -16,16 +16,32 @@ caches = Cache("sites", evicts={"projects"})
         """
         Returns all sites for the current project.
         
-        This endpoint can be used in return-all or return nearest mode.
+        This endpoint can be used in return-all, return nearest or viewport mode.
         The return nearest mode is useful if the project has a lot of projects.
         Either all the query parameters have to be specified or none of them.
+        
+        The viewport mode returns the sites inside the area given by all the min/max coordinates.
+        The area is expanded outwards to a grid scaled to its size, so sites slightly outside it may be returned.
+        Optionally the amount of returned sites can be limited with n.
+        Areas crossing the antimeridian are not supported.
+        
+        The return-all and viewport modes can be paged by giving a limit and/or a cursor.
+        Pages are ordered by site id and the next cursor is returned while there are more sites.
+        Paging cannot be combined with n.
+        
+        Large collections can be streamed in the return-all and viewport modes by setting stream.
+        Streamed responses are not cached and cannot be combined with paging.
         """
     ),
     responses=rex.gets(Sites),
 )
 @caches.args(
     "project",
-    exclude=lambda *_, **kwargs: any(kwargs[k] is not None for k in ("n", "lat", "lon"))
+    "n",
+    "area",
+    "limit",
+    "cursor",
+    exclude=lambda *_, **kwargs: kwargs["stream"] or any(kwargs[k] is not None for k in ("lat", "lon"))
 )
 async def get_sites(
         r: Request,
@@ -33,14 +49,63 @@ async def get_sites(
         n: Optional[conint(ge=1)] = None,
         lat: Optional[confloat(ge=0, le=90)] = None,
         lon: Optional[confloat(ge=-180, le=180)] = None,
-        db: Database = DEFAULT_DB,
+        area: Optional[Tuple[float, float, float, float]] = Depends(viewport),
+        limit: Optional[conint(ge=1, le=MAX_PAGE_SIZE)] = None,
+        cursor: Optional[str] = None,
+        stream: bool = False,
+        db: Database = READ_DB,
 ) -> Sites:
+    limit = page_size(limit, cursor)
+    if (limit is not None or stream) and n is not None:
+        raise HTTPException(status_code=status.HTTP_422_UNPROCESSABLE_ENTITY, detail="Bad Params")
+    after = decode_cursor(cursor, str)
     params = [n, lat, lon]
-    if not all(map(lambda o: o is None, params)) and not all(map(lambda o: o is not None, params)):
+    if area is not None:
+        if lat is not None or lon is not None:
+            raise HTTPException(status_code=status.HTTP_422_UNPROCESSABLE_ENTITY, detail="Bad Params")
+    elif not all(map(lambda o: o is None, params)) and not all(map(lambda o: o is not None, params)):
         raise HTTPException(status_code=status.HTTP_422_UNPROCESSABLE_ENTITY, detail="Bad Params")
+    if stream and limit is not None:
+        raise HTTPException(status_code=status.HTTP_422_UNPROCESSABLE_ENTITY, detail="Bad Params")
+    repo = SiteRepo(db, project)
+    repo.configure(r)
+    if stream:
+        return streamed(await repo.stream(area))
+    if limit is None:
+        return Sites(items=await repo.all(n, lat, lon, area))
+    items, next_cursor = paginate(await repo.all(area=area, limit=limit + 1, after=after), limit, lambda o: o.id)
+    return Sites(items=items, next=next_cursor)
+
+
+@router.get(
+    "/projects/{project}/tiles/{z}/{x}/{y}",
+    response_model=SiteTile,
+    description=dedent(
+        """
+        Returns the sites inside a Web Mercator map tile.
+        
+        The tile is addressed the same way as in slippy map tile servers.
+        Tiles with only a few sites return the sites themselves,
+        but dense tiles return clusters with the amount of sites in each.
+        Sites are never clustered on the highest zoom levels.
+        """
+    ),
+    responses=rex.gets(SiteTile),
+)
+@caches.args("project", "z", "x", "y")
+async def get_site_tile(
+        r: Request,
+        project: PID,
+        z: conint(ge=0, le=22),
+        x: conint(ge=0),
+        y: conint(ge=0),
+        db: Database = READ_DB,
+) -> SiteTile:
+    if x >= 1 << z or y >= 1 << z:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Tile not found")
     repo = SiteRepo(db, project)
     repo.configure(r)
-    return Sites(items=await repo.all(n, lat, lon))
+    return await repo.tile(z=z, x=x, y=y)
 
 
 @router.get(
@@ -59,7 +124,7 @@ async def get_site(
         r: Request,
         project: PID,
         site: SID,
-        db: Database = DEFAULT_DB,
+        db: Database = READ_DB,
         include_memories: bool = False,
 ) -> Site:
     repo = SiteRepo(db, project)
@@ -1,10 +1,14 @@
-from typing import Callable
+from typing import Callable, AsyncIterator
 
 from fastapi import Response, status, APIRouter
+from fastapi.responses import StreamingResponse
+from pydantic import BaseModel
 from headers import LOCATION
 
 from . import _responses as rex
 from ._doctils import d, sample
+from ._paging import MAX_PAGE_SIZE, decode_cursor, page_size, paginate
+from ._viewport import viewport
 
 
 def created(url: str) -> Response:
@@ -24,6 +28,29 @@ def deleted(url: str) -> Response:
     return Response(status_code=status.HTTP_204_NO_CONTENT, headers={LOCATION: url})
 
 
+def streamed(items: AsyncIterator[BaseModel], chunk_size: int = 1 << 16) -> StreamingResponse:
+    """Streams a collection as JSON while the items are produced
+
+    The output has the same shape as the collection models and is written in chunks of about chunk_size bytes.
+    """
+
+    async def encode():
+        chunk = bytearray(b'{"items":[')
+        first = True
+        async for item in items:
+            if not first:
+                chunk += b","
+            first = False
+            chunk += item.json(exclude_none=True).encode("utf-8")
+            if len(chunk) >= chunk_size:
+                yield bytes(chunk)
+                chunk.clear()
+        chunk += b"]}"
+        yield bytes(chunk)
+
+    return StreamingResponse(encode(), media_type="application/json")
+
+
 def make_router(**kwargs) -> APIRouter:
     from functools import partial
 
@@ -63,4 +90,7 @@ def make_router(**kwargs) -> APIRouter:
     return router
 
 
-__all__ = ["created", "modified", "deleted", "make_router", "d", "sample", "rex"]
+__all__ = [
+    "created", "modified", "deleted", "streamed", "make_router", "d", "sample", "rex",
+    "MAX_PAGE_SIZE", "decode_cursor", "page_size", "paginate", "viewport",
+]
@@ -0,0 +1,51 @@
+import base64
+import json
+from typing import Any, Callable, List, Optional, Tuple, Type, TypeVar
+
+from fastapi import HTTPException, status
+
+T = TypeVar("T")
+
+PAGE_SIZE = 100
+"""Page size used when only a cursor is given"""
+MAX_PAGE_SIZE = 500
+"""Largest page a client can request"""
+
+
+def encode_cursor(key: Any) -> str:
+    """Opaque cursor pointing after the given key"""
+    return base64.urlsafe_b64encode(json.dumps(key).encode("utf-8")).decode("ascii").rstrip("=")
+
+
+def decode_cursor(cursor: Optional[str], key_type: Type[T]) -> Optional[T]:
+    """Key from a cursor created with encode_cursor
+
+    Raises a 422 if the cursor is not valid for the key type.
+    """
+    if cursor is None:
+        return None
+    try:
+        key = json.loads(base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)))
+    except ValueError:
+        key = None
+    if not isinstance(key, key_type):
+        raise HTTPException(status_code=status.HTTP_422_UNPROCESSABLE_ENTITY, detail="Bad Cursor")
+    return key
+
+
+def page_size(limit: Optional[int], cursor: Optional[str]) -> Optional[int]:
+    """Page size for the request or None if the whole collection was requested"""
+    if limit is None and cursor is not None:
+        return PAGE_SIZE
+    return limit
+
+
+def paginate(items: List[T], limit: int, key: Callable[[T], Any]) -> Tuple[List[T], Optional[str]]:
+    """Splits a page fetched with one extra item into the page and the next cursor"""
+    if len(items) > limit:
+        items = items[:limit]
+        return items, encode_cursor(key(items[-1]))
+    return items, None
+
+
+__all__ = ["PAGE_SIZE", "MAX_PAGE_SIZE", "encode_cursor", "decode_cursor", "page_size", "paginate"]
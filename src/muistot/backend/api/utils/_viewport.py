@@ -0,0 +1,54 @@
+import math
+from typing import Optional, Tuple
+
+from fastapi import HTTPException, status
+from pydantic import confloat
+
+AREA = Tuple[float, float, float, float]
+
+VIEWPORT_GRID = 8
+"""Grid cells per viewport side, higher values follow the requested area more closely"""
+VIEWPORT_MAX_ZOOM = 18
+"""Smallest grid used for tiny viewports"""
+
+
+def snap_area(area: AREA) -> AREA:
+    """Expands the area outwards to a grid scaled to the size of the area
+
+    Viewports of about the same size that are close to each other snap to the same area,
+    which keeps the amount of distinct cache keys for viewport queries bounded.
+    """
+    min_lat, min_lon, max_lat, max_lon = area
+    span = max(max_lat - min_lat, max_lon - min_lon)
+    if span > 0:
+        zoom = min(VIEWPORT_MAX_ZOOM, max(0, math.floor(math.log2(360 / span))))
+    else:
+        zoom = VIEWPORT_MAX_ZOOM
+    step = 360 / (1 << zoom) / VIEWPORT_GRID
+    return (
+        max(-90.0, math.floor(min_lat / step) * step),
+        max(-180.0, math.floor(min_lon / step) * step),
+        min(90.0, math.ceil(max_lat / step) * step),
+        min(180.0, math.ceil(max_lon / step) * step),
+    )
+
+
+def viewport(
+        min_lat: Optional[confloat(ge=-90, le=90)] = None,
+        min_lon: Optional[confloat(ge=-180, le=180)] = None,
+        max_lat: Optional[confloat(ge=-90, le=90)] = None,
+        max_lon: Optional[confloat(ge=-180, le=180)] = None,
+) -> Optional[AREA]:
+    """FastAPI
+
+    Viewport area from the query snapped with snap_area or None if no area was given.
+    """
+    area = [min_lat, min_lon, max_lat, max_lon]
+    if all(map(lambda o: o is None, area)):
+        return None
+    if any(map(lambda o: o is None, area)) or min_lat > max_lat or min_lon > max_lon:
+        raise HTTPException(status_code=status.HTTP_422_UNPROCESSABLE_ENTITY, detail="Bad Params")
+    return snap_area((min_lat, min_lon, max_lat, max_lon))
+
+
+__all__ = ["VIEWPORT_GRID", "snap_area", "viewport"]
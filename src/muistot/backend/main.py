@@ -7,10 +7,12 @@ from fastapi.responses import JSONResponse
 
 from .api import common_paths, api_paths
 from ..cache import register_redis_cache
+from ..clients import register_http_clients
 from ..config import Config
 from ..database import register_databases
 from ..errors import register_error_handlers, modify_openapi
 from ..login import register_login
+from ..mailer import register_mailer
 from ..sessions import register_session_manager
 
 description = textwrap.dedent(
@@ -104,6 +106,8 @@ app.include_router(api_paths)
 # ADDITIONAL COMPONENTS
 register_login(app)
 register_databases(app)
+register_http_clients(app)
+register_mailer(app)
 
 # MIDDLEWARE
 #
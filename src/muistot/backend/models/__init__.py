@@ -26,6 +26,8 @@ __all__ = [
     "Point",
     "NewSite",
     "ModifiedSite",
+    "SiteCluster",
+    "SiteTile",
     # Project
     "Project",
     "ProjectInfo",
@@ -1,7 +1,7 @@
 from textwrap import dedent
-from typing import List, Type
+from typing import List, Optional, Type
 
-from pydantic import BaseModel, create_model, BaseConfig
+from pydantic import BaseModel, create_model, BaseConfig, Field
 
 from .comment import Comment
 from .memory import Memory
@@ -16,7 +16,10 @@ def make_collection(model_cls: Type[BaseModel]):
         pass
 
     collection_model = create_model(
-        type_name, __config__=Config, items=(List[model_cls], None)
+        type_name,
+        __config__=Config,
+        items=(List[model_cls], None),
+        next=(Optional[str], Field(description="Cursor for the next page if there are more items")),
     )
 
     collection_model.__doc__ = f"{model_cls.__name__} Collection"
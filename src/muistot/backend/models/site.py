@@ -156,3 +156,43 @@ class ModifiedSite(BaseModel):
                 }
             }
         }
+
+
+class SiteCluster(BaseModel):
+    """
+    Group of sites close to each other on the current zoom level.
+    """
+
+    location: Point = Field(description="Centroid of the clustered sites")
+    count: int = Field(ge=1, description="Amount of sites in this cluster")
+
+
+class SiteTile(BaseModel):
+    """
+    Sites inside a single map tile.
+
+    Dense tiles are returned as clusters and sparse tiles as individual sites.
+    """
+
+    clusters: Optional[List[SiteCluster]] = Field(description="Clusters if the tile was too dense for sites")
+    items: Optional[List[Site]] = Field(description="Individual sites if the tile was sparse enough")
+
+    class Config:
+        __examples__ = {
+            "clusters": {
+                "summary": "Clustered",
+                "value": {
+                    "clusters": [
+                        {"location": {"lat": 60.75, "lon": 24.56}, "count": 120},
+                        {"location": {"lat": 60.51, "lon": 24.91}, "count": 12},
+                    ]
+                },
+                "description": "Cluster locations are the average of the locations of the clustered sites."
+            },
+            "sites": {
+                "summary": "Sites",
+                "value": {
+                    "items": [Site.Config.__examples__["basic"]["value"]]
+                },
+            },
+        }
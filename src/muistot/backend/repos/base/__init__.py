@@ -1,11 +1,11 @@
 # noinspection PyUnresolvedReferences
-from typing import List, Optional
+from typing import List, Optional, Dict, Tuple, AsyncIterator
 
 # noinspection PyUnresolvedReferences
 from fastapi import HTTPException, status
 
 from .base import BaseRepo
-from .utils import check_language
+from .utils import check_language, in_list
 # noinspection PyUnresolvedReferences
 from ...models import *
 # noinspection PyUnresolvedReferences
@@ -49,6 +49,7 @@ class BaseRepo(ABC):
         self._user: Union[User] = User.null()
         self.lang = None  # Late init from exists
         self.auto_publish = False  # Late init from exists
+        self.statuses = dict()  # Shared memo for exists checks
 
     def configure(self, r: Request) -> "BaseRepo":
         """
@@ -58,8 +59,12 @@ class BaseRepo(ABC):
 
         - User
         - Language
+        - Request scoped exists statuses
         """
         self._user = r.user
+        if not hasattr(r.state, "statuses"):
+            r.state.statuses = dict()
+        self.statuses = r.state.statuses
         try:
             self.lang = extract_language(r)
         except ValueError:
@@ -71,6 +76,7 @@ class BaseRepo(ABC):
     def from_repo(self, repo: "BaseRepo") -> "BaseRepo":
         self._user = repo._user
         self.lang = repo.lang
+        self.statuses = repo.statuses
         return self
 
     @abstractmethod
@@ -1,5 +1,5 @@
 import re
-from typing import Set, Optional
+from typing import Any, Dict, Optional, Sequence, Set, Tuple
 
 from fastapi import HTTPException, status
 from fastapi import Request
@@ -91,9 +91,21 @@ def check_language(lang: str):
         )
 
 
+def in_list(name: str, values: Sequence[Any]) -> Tuple[str, Dict[str, Any]]:
+    """Parameters for an IN list and their values
+
+    The list is padded to the next power of two by repeating the last value,
+    so lists of different lengths share a bounded amount of statements.
+    """
+    size = 1 << max(len(values) - 1, 0).bit_length()
+    padded = [*values, *(values[-1] for _ in range(len(values), size))]
+    return ",".join(f":{name}_{i}" for i in range(size)), {f"{name}_{i}": v for i, v in enumerate(padded)}
+
+
 __all__ = [
     "get_languages",
     "extract_language",
     "check_language",
+    "in_list",
     "not_implemented"
 ]
@@ -7,14 +7,15 @@ class CommentRepo(BaseRepo):
     site: SID
     memory: MID
 
-    _select = """
+    __select = """
         SELECT c.id,
+               c.memory_id,
                u.username AS user,
                c.comment,
                c.modified_at
         FROM comments c
                  JOIN memories m ON c.memory_id = m.id
-            AND m.id = :memory
+            AND {}
                  JOIN sites s ON m.site_id = s.id
             AND s.name = :site
                  JOIN projects p ON s.project_id = p.id
@@ -23,8 +24,9 @@ class CommentRepo(BaseRepo):
         WHERE c.published
         """
 
-    _select_for_user = """
+    __select_for_user = """
         SELECT c.id,
+               c.memory_id,
                u.username                                         AS user,
                c.comment,
                c.modified_at,
@@ -32,7 +34,7 @@ class CommentRepo(BaseRepo):
                u.username = :user                                 AS own
         FROM comments c
                  JOIN memories m ON c.memory_id = m.id
-            AND m.id = :memory
+            AND {}
                  JOIN sites s ON m.site_id = s.id
             AND s.name = :site
                  JOIN projects p ON s.project_id = p.id
@@ -43,8 +45,9 @@ class CommentRepo(BaseRepo):
         WHERE (c.published OR u.username = :user)
         """
 
-    _select_for_admin = """
+    __select_for_admin = """
         SELECT c.id,
+               c.memory_id,
                u.username               AS user,
                c.comment,
                c.modified_at,
@@ -52,7 +55,7 @@ class CommentRepo(BaseRepo):
                u.username = :user       AS own
         FROM comments c
                  JOIN memories m ON c.memory_id = m.id
-            AND m.id = :memory
+            AND {}
                  JOIN sites s ON m.site_id = s.id
             AND s.name = :site
                  JOIN projects p ON s.project_id = p.id
@@ -61,6 +64,10 @@ class CommentRepo(BaseRepo):
         WHERE TRUE
         """
 
+    _select = __select.format("m.id = :memory")
+    _select_for_user = __select_for_user.format("m.id = :memory")
+    _select_for_admin = __select_for_admin.format("m.id = :memory")
+
     @staticmethod
     def construct_comment(m) -> Comment:
         return Comment(**m)
@@ -69,7 +76,11 @@ class CommentRepo(BaseRepo):
         super().__init__(db, project=project, site=site, memory=memory)
 
     @check.parents
-    async def all(self, *, _status: Status) -> List[Comment]:
+    async def all(self, limit: Optional[int] = None, after: Optional[CID] = None, *, _status: Status) -> List[Comment]:
+        """Returns all comments of the memory
+
+        Giving a limit returns at most limit comments ordered by id starting after the given comment.
+        """
         values = dict(site=self.site, project=self.project, memory=self.memory)
         if _status.admin:
             sql = self._select_for_admin
@@ -79,12 +90,43 @@ class CommentRepo(BaseRepo):
             values.update(user=self.identity)
         else:
             sql = self._select
+        if after is not None:
+            sql += " AND c.id > :after"
+            values.update(after=after)
+        if limit is not None:
+            sql += " ORDER BY c.id LIMIT :limit"
+            values.update(limit=limit)
         return [
             self.construct_comment(m)
             async for m in self.db.iterate(sql, values=values)
             if m is not None
         ]
 
+    async def for_memories(self, memories: List[MID], admin: bool) -> Dict[MID, List[Comment]]:
+        """Fetches comments for multiple memories of this site in a single query
+
+        The comments are grouped by memory id and every requested memory will have an entry.
+        This does not check the parents and is meant to be called from a repo that already has.
+        """
+        out = {memory: list() for memory in memories}
+        if len(out) == 0:
+            return out
+        condition, values = in_list("memory", list(out.keys()))
+        values.update(site=self.site, project=self.project)
+        condition = f"m.id IN ({condition})"
+        if admin:
+            sql = self.__select_for_admin.format(condition)
+            values.update(user=self.identity)
+        elif self.authenticated:
+            sql = self.__select_for_user.format(condition)
+            values.update(user=self.identity)
+        else:
+            sql = self.__select.format(condition)
+        async for m in self.db.iterate(sql, values=values):
+            if m is not None:
+                out[m["memory_id"]].append(self.construct_comment(m))
+        return out
+
     @check.published_or_admin
     async def one(self, comment: CID, *, _status: Status) -> Comment:
         values = dict(
@@ -107,13 +149,10 @@ class CommentRepo(BaseRepo):
         return await self.db.fetch_val(
             """
             INSERT INTO comments (memory_id, user_id, comment, published)
-            SELECT m.id,
-                   u.id,
-                   :comment,
-                   :published
-            FROM memories m
-                     JOIN users u ON u.username = :user
-            WHERE m.id = :memory
+            VALUES (:memory,
+                    (SELECT id FROM users WHERE username = :user),
+                    :comment,
+                    :published)
             RETURNING id
             """,
             values=dict(
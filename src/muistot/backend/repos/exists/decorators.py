@@ -1,11 +1,24 @@
 import functools
-from typing import Callable, Optional, Any, Type
+from typing import Callable, Optional, Any, Type, Dict
 
 from fastapi import HTTPException, status
 
 from .base import Status, Exists
+from .comment import CommentExists
+from .memory import MemoryExists
+from .project import ProjectExists
+from .site import SiteExists
 from ..base import BaseRepo
 
+CHECKERS: Dict[str, Type[Exists]] = {
+    checker.__name__.removesuffix("Exists"): checker
+    for checker in (ProjectExists, SiteExists, MemoryExists, CommentExists)
+}
+"""Exists checkers by resource type name"""
+
+READS = {"all", "one", "tile", "stream"}
+"""Repo methods that do not modify any resource status"""
+
 
 def _name(repo: BaseRepo):
     """Actual type name from repo
@@ -36,30 +49,32 @@ def _guess_arg(arg: Any):
     return arg
 
 
-def _import_service(repo: BaseRepo) -> Type[Exists]:
-    """Imports an Exists checker
+def _get_service(repo: BaseRepo) -> Type[Exists]:
+    """Gets the Exists checker for a repo
     """
-    import importlib
-    _type = _name(repo)
-    return getattr(importlib.import_module(
-        f".{_type.lower()}",
-        __name__.removesuffix(".decorators")
-    ), f"{_type}Exists")
+    return CHECKERS[_name(repo)]
 
 
 async def _actual_exists(repo: BaseRepo, arg: Any) -> Status:
     """Handles exists checks for all repos
 
-    Imports the required module and gets the exists checker.
+    Gets the exists checker for the repo and memoizes the result in the repo statuses.
+    The statuses are shared by all repos configured from the same request.
     """
     kwargs = repo.identifiers
     kwargs[_name(repo).lower()] = arg
-    service = _import_service(repo)(user=repo.user, db=repo.db, **kwargs)
-    out = await service.exists()
+    key = (_name(repo), tuple(sorted(kwargs.items())), repo.identity)
+    if key in repo.statuses:
+        out, lang = repo.statuses[key]
+    else:
+        service = _get_service(repo)(user=repo.user, db=repo.db, **kwargs)
+        out = await service.exists()
+        lang = service.default_language
+        repo.statuses[key] = out, lang
 
     repo.auto_publish = Status.AUTO_PUBLISH in out
     if repo.lang is None:
-        repo.lang = service.default_language
+        repo.lang = lang
 
     return out | Status.SUPER if repo.superuser else out
 
@@ -122,7 +137,11 @@ def check(
                 kwargs = {**kwargs, inject_argument: status_}
 
             if (not force_exists or Status.EXISTS in status_) and any(map(status_.__contains__, allowed_types)):
-                return await f(*args, **kwargs)
+                try:
+                    return await f(*args, **kwargs)
+                finally:
+                    if f.__name__ not in READS:
+                        args[0].statuses.clear()
             else:
                 raise error_mapper(args[0], status_)
 
@@ -14,7 +14,7 @@ class MemoryRepo(BaseRepo):
                IF(m.deleted, '-', u.username)   AS user,
                IF(m.deleted, NULL, i.file_name) AS image,
                m.modified_at,
-               COUNT(c.id)                      AS comments_count
+               m.comments_count
         FROM memories m
                  JOIN sites s ON m.site_id = s.id
             AND s.name = :site
@@ -22,10 +22,7 @@ class MemoryRepo(BaseRepo):
             AND p.name = :project
                  JOIN users u ON m.user_id = u.id
                  LEFT JOIN images i ON m.image_id = i.id
-                 LEFT JOIN comments c ON m.id = c.memory_id
-                    AND c.published
         WHERE m.published {}
-        GROUP BY m.id
         """
 
     _select_for_user = """
@@ -35,7 +32,7 @@ class MemoryRepo(BaseRepo):
                IF(m.deleted, '-', u.username)                   AS user,
                IF(m.deleted, NULL, i.file_name)                 AS image,
                m.modified_at,               
-               COUNT(c.id)                                      AS comments_count,
+               m.comments_count,
                IF(u2.id IS NOT NULL, NOT m.published, NULL)     AS waiting_approval,
                u.username = :user                               AS own
         FROM memories m
@@ -45,12 +42,9 @@ class MemoryRepo(BaseRepo):
             AND p.name = :project
                  JOIN users u ON m.user_id = u.id
                  LEFT JOIN images i ON m.image_id = i.id
-                 LEFT JOIN comments c ON m.id = c.memory_id
-            AND c.published
                  LEFT JOIN users u2 ON u2.id = m.user_id
                     AND u2.username = :user
         WHERE (m.published OR u2.id IS NOT NULL) {}
-        GROUP BY m.id
         """
 
     _select_for_admin = """
@@ -60,7 +54,7 @@ class MemoryRepo(BaseRepo):
                IF(m.deleted, '-', u.username)                   AS user,
                IF(m.deleted, NULL, i.file_name)                 AS image,
                m.modified_at,               
-               COUNT(c.id)                                      AS comments_count,
+               m.comments_count,
                IF(m.published, NULL, 1)                         AS waiting_approval,
                u.username = :user                               AS own
         FROM memories m
@@ -70,10 +64,7 @@ class MemoryRepo(BaseRepo):
             AND p.name = :project
                  JOIN users u ON m.user_id = u.id
                  LEFT JOIN images i ON m.image_id = i.id
-                 LEFT JOIN comments c ON m.id = c.memory_id
-            AND c.published
         WHERE TRUE {}
-        GROUP BY m.id
         """
 
     def __init__(self, db: Database, project: PID, site: SID):
@@ -84,7 +75,18 @@ class MemoryRepo(BaseRepo):
         return Memory(**m)
 
     @check.parents
-    async def all(self, include_comments: bool = False, *, _status: Status) -> List[Memory]:
+    async def all(
+            self,
+            include_comments: bool = False,
+            limit: Optional[int] = None,
+            after: Optional[MID] = None,
+            *,
+            _status: Status,
+    ) -> List[Memory]:
+        """Returns all memories of the site
+
+        Giving a limit returns at most limit memories ordered by id starting after the given memory.
+        """
         values = dict(site=self.site, project=self.project)
         if _status.admin:
             sql = self._select_for_admin
@@ -94,18 +96,50 @@ class MemoryRepo(BaseRepo):
             values.update(user=self.identity)
         else:
             sql = self._select
+        if after is not None:
+            sql = sql.format("AND m.id > :after")
+            values.update(after=after)
+        else:
+            sql = sql.format("")
+        if limit is not None:
+            sql += "ORDER BY m.id LIMIT :limit"
+            values.update(limit=limit)
         out = [
             self.construct_memory(m)
-            async for m in self.db.iterate(sql.format(""), values=values)
+            async for m in self.db.iterate(sql, values=values)
             if m is not None
         ]
         if include_comments:
+            comments = await CommentRepo(self.db, self.project, self.site, None).from_repo(self).for_memories(
+                [m.id for m in out],
+                _status.admin,
+            )
             for m in out:
-                m.comments = await CommentRepo(
-                    self.db, self.project, self.site, m.id
-                ).all()
+                m.comments = comments[m.id]
         return out
 
+    @check.parents
+    async def stream(self, *, _status: Status) -> AsyncIterator[Memory]:
+        """Streams all memories of the site as they are read from the database
+        """
+        values = dict(site=self.site, project=self.project)
+        if _status.admin:
+            sql = self._select_for_admin
+            values.update(user=self.identity)
+        elif self.authenticated:
+            sql = self._select_for_user
+            values.update(user=self.identity)
+        else:
+            sql = self._select
+        rows = self.db.stream(sql.format(""), values=values)
+
+        async def iterate():
+            async for m in rows:
+                if m is not None:
+                    yield self.construct_memory(m)
+
+        return iterate()
+
     @check.published_or_admin
     async def one(self, memory: MID, include_comments: bool = False, *, _status: Status) -> Memory:
         values = dict(memory=memory, site=self.site, project=self.project)
@@ -123,7 +157,11 @@ class MemoryRepo(BaseRepo):
         )
 
         if include_comments:
-            out.comments = await CommentRepo(self.db, self.project, self.site, out.id).from_repo(self).all()
+            comments = await CommentRepo(self.db, self.project, self.site, out.id).from_repo(self).for_memories(
+                [out.id],
+                _status.admin,
+            )
+            out.comments = comments[out.id]
 
         return out
 
@@ -133,20 +171,19 @@ class MemoryRepo(BaseRepo):
             image_id = await self.files.handle(model.image)
         else:
             image_id = None
+        # The site is read separately, the memory count trigger updates sites
+        site_id = await self.db.fetch_val("SELECT id FROM sites WHERE name = :site", values=dict(site=self.site))
         return await self.db.fetch_val(
             """
             INSERT INTO memories (site_id, user_id, image_id, title, story, published)
-            SELECT s.id, u.id, :image, :title, :story, :published
-            FROM sites s
-                     JOIN users u ON u.username = :user
-            WHERE s.name = :site
+            VALUES (:site, (SELECT id FROM users WHERE username = :user), :image, :title, :story, :published)
             RETURNING id
             """,
             values=dict(
                 image=image_id,
                 title=model.title,
                 story=model.story,
-                site=self.site,
+                site=site_id,
                 user=self.identity,
                 published=self.auto_publish,
             ),
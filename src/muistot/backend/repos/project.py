@@ -12,11 +12,11 @@ class ProjectRepo(BaseRepo):
 
             p.id                                                AS project_id,
             p.name                                              AS id,
-            i.file_name                                         AS image,
-            IFNULL(l.lang, def_l.lang)                          AS lang,
-            COALESCE(pi.name, def_pi.name, p.name)              AS name,
-            IFNULL(pi.abstract, def_pi.abstract)                AS abstract,
-            IFNULL(pi.description, def_pi.description)          AS description,
+            pl.image,
+            pl.info_lang                                        AS lang,
+            pl.name,
+            pl.abstract,
+            pl.description,
             p.starts,
             p.ends,
             NOT ISNULL(pc.project_id)                           AS has_contact_data,
@@ -24,7 +24,7 @@ class ProjectRepo(BaseRepo):
             pc.contact_email,
             pc.can_contact,
             
-            COUNT(s.id)                                         AS sites_count,
+            p.sites_count,
             
             IF(p.starts IS NULL, TRUE, p.starts < CURDATE())    AS start_date,
             IF(p.ends IS NULL, TRUE, p.ends > CURDATE())        AS end_date,
@@ -34,41 +34,46 @@ class ProjectRepo(BaseRepo):
 
             %s
         FROM projects p
-
-            LEFT JOIN project_information pi 
-                JOIN languages l ON pi.lang_id = l.id
-                    AND l.lang = :lang
-                ON p.id = pi.project_id
-
-            JOIN project_information def_pi
-                ON p.id = def_pi.project_id
-                    AND def_pi.lang_id = p.default_language_id
-            JOIN languages def_l ON def_pi.lang_id = def_l.id
-                
-
-            LEFT JOIN images i ON p.image_id = i.id
+            JOIN languages dl ON dl.id = p.default_language_id
+            LEFT JOIN project_localized rpl ON p.id = rpl.project_id
+                AND rpl.lang = :lang
+            JOIN project_localized pl ON p.id = pl.project_id
+                AND pl.lang = IFNULL(rpl.lang, dl.lang)
             LEFT JOIN project_contact pc ON p.id = pc.project_id
-            LEFT JOIN sites s ON p.id = s.project_id
-                AND s.published
             %s
         WHERE TRUE %s
         GROUP BY p.id
         """
+    _select_one = _select % ("", "", " AND p.name = :project")
+    _select_all = _select % ("", "", " AND p.published")
+    _select_all_user = _select % (
+        ",IFNULL(au.id, su.id) IS NOT NULL AS is_admin",
+        """
+        LEFT JOIN users su JOIN superusers sus ON sus.user_id = su.id ON su.username = :user
+        LEFT JOIN users au JOIN project_admins pa ON pa.user_id = au.id ON au.username = :user
+        """,
+        """
+         AND p.published OR au.id IS NOT NULL OR su.id IS NOT NULL
+        """
+    )
 
-    async def _get_admins(self, project_id: int):
-        out = [
-            admin[0]
-            for admin in await self.db.fetch_all(
-                """
-            SELECT u.username
-            FROM project_admins pa
-                JOIN users u ON pa.user_id = u.id
-            WHERE project_id = :pid
-            """,
-                values=dict(pid=project_id),
-            )
-        ]
-        return out if len(out) > 0 else list()
+    async def _get_admins(self, *project_ids: int) -> Dict[int, List[str]]:
+        """Loads the admins for all given projects in a single query
+        """
+        out = {pid: list() for pid in project_ids}
+        if len(out) > 0:
+            condition, values = in_list("pid", list(out.keys()))
+            for pid, username in await self.db.fetch_all(
+                    f"""
+                    SELECT pa.project_id, u.username
+                    FROM project_admins pa
+                        JOIN users u ON pa.user_id = u.id
+                    WHERE pa.project_id IN ({condition})
+                    """,
+                    values=values,
+            ):
+                out[pid].append(username)
+        return out
 
     async def _handle_localization(self, project: PID, localized_data: ProjectInfo):
         if localized_data is not None:
@@ -140,15 +145,14 @@ class ProjectRepo(BaseRepo):
 
     async def _handle_admins(self, project: PID, admins: List[str]):
         if admins is not None and len(admins) > 0:
+            condition, values = in_list("admin", admins)
             data = await self.db.fetch_all(
                 f"""
                 SELECT u.username, u.id 
                 FROM users u 
-                WHERE u.username IN ({",".join(f":admin_{i}" for i in range(0, len(admins)))})
+                WHERE u.username IN ({condition})
                 """,
-                values=dict(
-                    project=project, **{f"admin_{i}": v for i, v in enumerate(admins)}
-                )
+                values=dict(project=project, **values)
             )
             not_found = [name for name in admins if name not in set(map(lambda m: m[0], data))]
             if len(not_found) != 0:
@@ -167,30 +171,20 @@ class ProjectRepo(BaseRepo):
                 ),
             )
 
-    async def construct_project(self, m) -> Project:
+    @staticmethod
+    def construct_project(m, admins: List[str]) -> Project:
         pi = ProjectInfo(**m)
         if m["has_contact_data"]:
             pc = ProjectContact(**m)
         else:
             pc = None
-        return Project(**m, info=pi, contact=pc, admins=await self._get_admins(m[0]))
+        return Project(**m, info=pi, contact=pc, admins=admins)
 
     async def all(self) -> List[Project]:
-        return [
-            await self.construct_project(m)
+        rows = [
+            m
             for m in await self.db.fetch_all(
-                self._select % (
-                    ",IFNULL(au.id, su.id) IS NOT NULL AS is_admin",
-                    """
-                    LEFT JOIN users su JOIN superusers sus ON sus.user_id = su.id ON su.username = :user
-                    LEFT JOIN users au JOIN project_admins pa ON pa.user_id = au.id ON au.username = :user
-                    """,
-                    """
-                     AND p.published OR au.id IS NOT NULL OR su.id IS NOT NULL
-                    """
-                )
-                if self.authenticated else
-                self._select % ("", "", " AND p.published"),
+                self._select_all_user if self.authenticated else self._select_all,
                 values=
                 dict(lang=self.lang)
                 if not self.authenticated else
@@ -199,11 +193,13 @@ class ProjectRepo(BaseRepo):
             )
             if m is not None and (_check_dates(m) or (self.superuser or m["is_admin"] if self.authenticated else False))
         ]
+        admins = await self._get_admins(*(m["project_id"] for m in rows))
+        return [self.construct_project(m, admins[m["project_id"]]) for m in rows]
 
     @check.published_or_admin
     async def one(self, project: PID, _status: Status = None) -> Project:
         m = await self.db.fetch_one(
-            self._select % ("", "", " AND p.name = :project"),
+            self._select_one,
             values=dict(lang=self.lang, project=project)
         )
         if m is None:
@@ -216,7 +212,7 @@ class ProjectRepo(BaseRepo):
                 status_code=status.HTTP_404_NOT_FOUND,
                 detail='Project not found'
             )
-        out = await self.construct_project(m)
+        out = self.construct_project(m, (await self._get_admins(m["project_id"]))[m["project_id"]])
         return out
 
     @check.not_exists
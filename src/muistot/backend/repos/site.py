@@ -1,4 +1,4 @@
-import random
+import math
 
 from .base import *
 from .exists import Status, check
@@ -11,14 +11,14 @@ class SiteRepo(BaseRepo):
     __select = """
         SELECT
             s.name                                      AS id,
-            COALESCE(si.name, def_si.name, s.name)      AS name,
+            sl.name,
             Y(s.location)                               AS lat,
             X(s.location)                               AS lon,
-            i.file_name                                 AS image,
-            COUNT(m.id)                                 AS memories_count,
-            IFNULL(l.lang, def_l.lang)                  AS lang,
-            IFNULL(si.abstract, def_si.abstract)        AS abstract,
-            IFNULL(si.description, def_si.description)  AS description,
+            sl.image,
+            s.memories_count,
+            sl.info_lang                                AS lang,
+            sl.abstract,
+            sl.description,
             IF(s.published, NULL, 1)                    AS waiting_approval,
             IF(uc.username = :user, TRUE, NULL)         AS own,
             uc.username                                 AS creator,
@@ -27,34 +27,78 @@ class SiteRepo(BaseRepo):
         FROM sites s
             JOIN projects p ON p.id = s.project_id
                 AND p.name = :project
-            LEFT JOIN site_information si 
-                JOIN languages l ON si.lang_id = l.id
-                    AND l.lang = :lang
-                ON s.id = si.site_id 
-                
-            JOIN site_information def_si ON s.id = def_si.site_id
-                    AND def_si.lang_id = p.default_language_id 
-            JOIN languages def_l ON def_si.lang_id = def_l.id
-                
-            LEFT JOIN memories m ON s.id = m.site_id
-                AND m.published
-            LEFT JOIN images i ON i.id = s.image_id
-            LEFT JOIN users um ON um.id = si.modifier_id
+            JOIN languages dl ON dl.id = p.default_language_id
+            LEFT JOIN site_localized rsl ON rsl.site_id = s.id
+                AND rsl.lang = :lang
+            JOIN site_localized sl ON sl.site_id = s.id
+                AND sl.lang = IFNULL(rsl.lang, dl.lang)
+            LEFT JOIN users um ON um.id = sl.modifier_id
             LEFT JOIN users uc ON uc.id = s.creator_id
         {}
-        GROUP BY s.id
         %s
         """
 
     _select = __select % ("", "")
     _select_dist = __select % (
         ",\nST_DISTANCE_SPHERE(s.location, POINT(:lon, :lat)) AS distance",
-        " ORDER BY distance LIMIT {:d}",
+        " ORDER BY distance LIMIT :limit",
     )
+    _select_limit = __select % ("", " LIMIT :limit")
+    _select_page = __select % ("", " ORDER BY s.name LIMIT :limit")
+    _select_stream = __select % (
+        """,
+            IF(sl.image IS NULL AND s.memories_count > 0, (
+                SELECT fi.file_name
+                FROM memories fm
+                    JOIN images fi ON fm.image_id = fi.id
+                WHERE fm.site_id = s.id
+                    AND fm.published
+                ORDER BY RAND()
+                LIMIT 1
+            ), NULL)                                    AS fallback_image""",
+        "",
+    )
+    # Covers the edges too, sites on a shared tile edge are in both tiles
+    _area = (
+        " AND MBRIntersects(ST_Envelope(LineString(POINT(:min_lon, :min_lat), POINT(:max_lon, :max_lat))), s.location)"
+    )
+
+    _cluster = """
+        SELECT
+            COUNT(s.id)         AS count,
+            AVG(Y(s.location))  AS lat,
+            AVG(X(s.location))  AS lon
+        FROM sites s
+            JOIN projects p ON p.id = s.project_id
+                AND p.name = :project
+            LEFT JOIN users uc ON uc.id = s.creator_id
+        {}
+        GROUP BY
+            FLOOR((X(s.location) - :min_lon) / :cell_x),
+            FLOOR((:top - LN(TAN(PI() / 4 + RADIANS(Y(s.location)) / 2))) / :cell_y)
+        """
+
+    TILE_GRID = 8
+    """Clusters per tile side"""
+    TILE_SITES = 64
+    """Maximum amount of sites in a tile that is returned without clustering"""
+    TILE_MAX_ZOOM = 18
+    """Zoom level from which on sites are never clustered"""
 
     def __init__(self, db: Database, project: PID):
         super().__init__(db, project=project)
 
+    @staticmethod
+    def _tile_area(z: int, x: int, y: int) -> Tuple[float, float, float, float]:
+        """Web Mercator tile to (min_lat, min_lon, max_lat, max_lon)
+        """
+        n = 1 << z
+
+        def lat(t: int) -> float:
+            return math.degrees(math.atan(math.sinh(math.pi * (1 - 2 * t / n))))
+
+        return lat(y + 1), x / n * 360 - 180, lat(y), (x + 1) / n * 360 - 180
+
     @staticmethod
     def _check_pap(_status: Status):
         if _status.pap and not _status.admin:
@@ -130,37 +174,51 @@ class SiteRepo(BaseRepo):
         else:
             return False
 
-    async def _get_project_default_lang(self):
-        project_default = await self.db.fetch_val(
-            """
-            SELECT l.lang
-            FROM projects p 
-                JOIN languages l on p.default_language_id = l.id
-            WHERE p.name = :project
-            """,
-            values=dict(project=self.project)
-        )
-        return project_default
+    async def _get_random_images(self, sites: List[SID]) -> Dict[SID, str]:
+        """Picks a random published memory image for each of the given sites in a single query
+        """
+        if len(sites) == 0:
+            return dict()
+        condition, values = in_list("site", sites)
+        return {
+            m[0]: m[1]
+            for m in await self.db.fetch_all(
+                f"""
+                SELECT s.name,
+                       (
+                           SELECT i.file_name
+                           FROM memories m
+                               JOIN images i ON m.image_id = i.id
+                           WHERE m.site_id = s.id
+                               AND m.published
+                           ORDER BY RAND()
+                           LIMIT 1
+                       ) AS image
+                FROM sites s
+                WHERE s.name IN ({condition})
+                """,
+                values=values,
+            )
+            if m[1] is not None
+        }
 
-    async def _get_random_image(self, site: SID):
-        images = list(map(lambda m: m[0], await self.db.fetch_all(
-            """
-            SELECT i.file_name FROM  sites s
-                JOIN memories m on s.id = m.site_id
-                    AND m.published
-                JOIN images i on m.image_id = i.id
-            WHERE s.name = :site
-            ORDER BY RAND()
-            LIMIT 1
-            """,
-            values=dict(site=site)
-        )))
-        return random.choice(images) if len(images) > 0 else None
-
-    async def construct_site(self, m) -> Site:
-        if m.get("memories_count", 0) > 0 and m.get("image", None) is None:
-            m = dict(**m)
-            m["image"] = await self._get_random_image(m["id"])
+    async def _fill_images(self, rows: List) -> List:
+        """Fills in a fallback image for all sites that have memories but no image of their own
+        """
+        missing = [m["id"] for m in rows if m["memories_count"] > 0 and m["image"] is None]
+        images = await self._get_random_images(missing)
+        if len(images) == 0:
+            return rows
+        out = list()
+        for m in rows:
+            if m["id"] in images:
+                m = dict(**m)
+                m["image"] = images[m["id"]]
+            out.append(m)
+        return out
+
+    @staticmethod
+    def construct_site(m) -> Site:
         return Site(location=Point(**m), info=SiteInfo(**m), **m)
 
     @check.parents
@@ -169,9 +227,20 @@ class SiteRepo(BaseRepo):
             n: Optional[int] = None,
             lat: Optional[float] = None,
             lon: Optional[float] = None,
+            area: Optional[Tuple[float, float, float, float]] = None,
+            limit: Optional[int] = None,
+            after: Optional[SID] = None,
             *,
             _status: Status,
     ) -> List[Site]:
+        """Returns all sites, the n nearest sites or the sites inside an area
+
+        The area is given as (min_lat, min_lon, max_lat, max_lon) and is matched
+        against the spatial index. The n parameter limits the sites returned from an area.
+
+        Giving a limit returns at most limit sites ordered by id starting after the given site.
+        Paging is not available for the nearest sites.
+        """
         values = dict(lang=self.lang, project=self.project, user=self.identity)
         if _status.admin:
             where = "WHERE TRUE"
@@ -179,24 +248,88 @@ class SiteRepo(BaseRepo):
             where = "WHERE (s.published OR uc.username = :user)"
         else:
             where = "WHERE s.published"
-        if n is not None and lat is not None and lon is not None:
-            values.update(lon=lon, lat=lat)
-            out = [
-                await self.construct_site(m)
-                async for m in self.db.iterate(
-                    self._select_dist.format(where, n), values=values
-                )
-                if m is not None
-            ]
+        if after is not None:
+            values.update(after=after)
+            where += " AND s.name > :after"
+        if area is not None:
+            values.update(zip(("min_lat", "min_lon", "max_lat", "max_lon"), area))
+            where += self._area
+        if limit is not None:
+            values.update(limit=limit)
+            sql = self._select_page.format(where)
+        elif area is not None and n is not None:
+            values.update(limit=n)
+            sql = self._select_limit.format(where)
+        elif area is None and n is not None and lat is not None and lon is not None:
+            values.update(lon=lon, lat=lat, limit=n)
+            sql = self._select_dist.format(where)
         else:
-            out = [
-                await self.construct_site(m)
-                async for m in self.db.iterate(
-                    self._select.format(where), values=values
-                )
-                if m is not None
-            ]
-        return out
+            sql = self._select.format(where)
+        rows = [m async for m in self.db.iterate(sql, values=values) if m is not None]
+        return [self.construct_site(m) for m in await self._fill_images(rows)]
+
+    @check.parents
+    async def stream(
+            self,
+            area: Optional[Tuple[float, float, float, float]] = None,
+            *,
+            _status: Status,
+    ) -> AsyncIterator[Site]:
+        """Streams all sites or the sites inside an area as they are read from the database
+
+        Fallback images are picked in the same query since the connection is busy while streaming.
+        """
+        values = dict(lang=self.lang, project=self.project, user=self.identity)
+        if _status.admin:
+            where = "WHERE TRUE"
+        elif self.authenticated:
+            where = "WHERE (s.published OR uc.username = :user)"
+        else:
+            where = "WHERE s.published"
+        if area is not None:
+            values.update(zip(("min_lat", "min_lon", "max_lat", "max_lon"), area))
+            where += self._area
+        rows = self.db.stream(self._select_stream.format(where), values=values)
+
+        async def iterate():
+            async for m in rows:
+                if m is not None:
+                    m = dict(**m)
+                    fallback = m.pop("fallback_image")
+                    if m["image"] is None:
+                        m["image"] = fallback
+                    yield self.construct_site(m)
+
+        return iterate()
+
+    @check.parents
+    async def tile(self, z: int, x: int, y: int, *, _status: Status) -> SiteTile:
+        """Returns the sites in a map tile clustered on a grid if there are too many of them
+        """
+        area = self._tile_area(z, x, y)
+        if z >= self.TILE_MAX_ZOOM:
+            return SiteTile(items=await self.all(area=area))
+        n = 1 << z
+        values = dict(
+            project=self.project,
+            user=self.identity,
+            cell_x=360 / n / self.TILE_GRID,
+            cell_y=2 * math.pi / n / self.TILE_GRID,
+            top=math.pi * (1 - 2 * y / n),
+            **dict(zip(("min_lat", "min_lon", "max_lat", "max_lon"), area)),
+        )
+        if _status.admin:
+            where = "WHERE TRUE"
+        elif self.authenticated:
+            where = "WHERE (s.published OR uc.username = :user)"
+        else:
+            where = "WHERE s.published"
+        clusters = [m async for m in self.db.iterate(self._cluster.format(where + self._area), values=values)]
+        if sum(m["count"] for m in clusters) <= self.TILE_SITES:
+            return SiteTile(items=await self.all(area=area))
+        return SiteTile(clusters=[
+            SiteCluster(location=Point(lat=m["lat"], lon=m["lon"]), count=m["count"]) for m in clusters
+        ])
 
     @check.published_or_admin
     async def one(self, site: SID, include_memories: bool = False, *, _status: Status) -> Site:
@@ -216,7 +349,7 @@ class SiteRepo(BaseRepo):
                 status_code=status.HTTP_406_NOT_ACCEPTABLE,
                 detail='Site missing default localization'
             )
-        out = await self.construct_site(m)
+        out = self.construct_site((await self._fill_images([m]))[0])
         if include_memories:
             out.memories = await MemoryRepo(self.db, self.project, out.id).from_repo(self).all(include_comments=False)
         return out
@@ -226,19 +359,26 @@ class SiteRepo(BaseRepo):
         SiteRepo._check_pap(_status)
         check_language(model.info.lang)
         image_id = await self.files.handle(model.image)
-        ret = await self.db.fetch_one(
+        # The project is read separately, the site count trigger updates projects
+        project_id, default_lang = await self.db.fetch_one(
             """
-            INSERT INTO sites (project_id, name, image_id, published, location, modifier_id, creator_id)
-            SELECT p.id,
-                   :name,
-                   :image,
-                   :published,
-                   POINT(:lon, :lat),
-                   u.id,
-                   u.id
+            SELECT p.id, l.lang
             FROM projects p
-                LEFT JOIN users u ON u.username = :user
+                JOIN languages l on p.default_language_id = l.id
             WHERE p.name = :project
+            """,
+            values=dict(project=self.project),
+        )
+        ret = await self.db.fetch_one(
+            """
+            INSERT INTO sites (project_id, name, image_id, published, location, modifier_id, creator_id)
+            VALUES (:project,
+                    :name,
+                    :image,
+                    :published,
+                    POINT(:lon, :lat),
+                    (SELECT id FROM users WHERE username = :user),
+                    (SELECT id FROM users WHERE username = :user))
             RETURNING id, name
             """,
             values=dict(
@@ -247,13 +387,12 @@ class SiteRepo(BaseRepo):
                 published=self.auto_publish,
                 lon=model.location.lon,
                 lat=model.location.lat,
-                project=self.project,
+                project=project_id,
                 user=self.identity,
             ),
         )
         _id, name = ret
         await self._handle_info(name, model.info)
-        default_lang = await self._get_project_default_lang()
         if default_lang != model.info.lang:
             info = model.info
             info.lang = default_lang
@@ -20,13 +20,13 @@ async def check_username_not_exists(db: Database, username: Optional[str]):
 
 
 async def change_password(db: Database, username: str, password: str, mgr: SessionManager):
-    from ...security.password import hash_password
-    mgr.clear_sessions(username)
+    from ...security.password import hash_password_async
+    await mgr.clear_sessions(username)
     await db.execute(
         "UPDATE users SET password_hash = :hash WHERE username = :user",
-        values=dict(hash=hash_password(password=password), user=username),
+        values=dict(hash=await hash_password_async(password=password), user=username),
     )
-    mgr.clear_sessions(username)
+    await mgr.clear_sessions(username)
 
 
 async def change_email(db: Database, username: str, email: str, mgr: SessionManager) -> bool:
@@ -42,14 +42,14 @@ async def change_email(db: Database, username: str, email: str, mgr: SessionMana
             return False
         elif m[0]:
             raise HTTPException(status_code=status.HTTP_409_CONFLICT, detail="Email in use")
-        mgr.clear_sessions(username)
+        await mgr.clear_sessions(username)
         await db.execute(
             """
             UPDATE users SET email = :email WHERE username = :user
             """,
             values=dict(email=email, user=username)
         )
-        mgr.clear_sessions(username)
+        await mgr.clear_sessions(username)
         return True
     except db.IntegrityError:
         raise HTTPException(status_code=status.HTTP_409_CONFLICT, detail="Email in use")
@@ -59,8 +59,8 @@ async def change_username(db: Database, username_old: str, username_new: str, mg
     if username_old != username_new:
         try:
             await check_username_not_exists(db, username_new)
-            mgr.clear_sessions(username_old)
-            mgr.clear_sessions(username_new)
+            await mgr.clear_sessions(username_old)
+            await mgr.clear_sessions(username_new)
             await db.execute(
                 """
                 UPDATE users SET username = :new WHERE username = :old
@@ -71,8 +71,8 @@ async def change_username(db: Database, username_old: str, username_new: str, mg
         except db.IntegrityError:
             raise HTTPException(status_code=status.HTTP_409_CONFLICT, detail="Username in use")
         finally:
-            mgr.clear_sessions(username_old)
-            mgr.clear_sessions(username_new)
+            await mgr.clear_sessions(username_old)
+            await mgr.clear_sessions(username_new)
     return False
 
 
@@ -1,22 +1,26 @@
+import asyncio
 import collections
 import contextlib
+import contextvars
 import functools
 import hashlib
 import inspect
-import itertools
+import secrets
 import threading
 import typing
 
-import redis
-from fastapi import Request, Depends
+from fastapi import Request, Depends, status
 from fastapi.params import Depends as DependsParam
 from fastapi.responses import Response, JSONResponse
+from headers import ETAG, IF_NONE_MATCH, CACHE_CONTROL, VARY, ACCEPT_LANGUAGE, AUTHORIZATION
 from pydantic import BaseModel
+from redis import asyncio as redis
 
 from .redis import FastStorage
 from ..config import Config
-from ..database import DatabaseDependency
-from ..security import User
+from ..database import DatabaseDependency, ReadDependency, after_commit
+from ..logging import log
+from ..security import User, scopes
 
 
 class LazyDelegator:
@@ -54,29 +58,133 @@ class DelayedDependency:
     stack: contextlib.AsyncExitStack
     wrapped: typing.Any
 
-    def __init__(self, dependency: DatabaseDependency):
+    def __init__(self, dependency: typing.Union[DatabaseDependency, ReadDependency]):
         self.wrapped = contextlib.asynccontextmanager(dependency)
 
-    async def __call__(self):
+    async def __call__(self, r: Request):
         """FastAPI"""
         async with contextlib.AsyncExitStack() as stack:
-            yield LazyDelegator(self.wrapped, stack)
+            yield LazyDelegator(functools.partial(self.wrapped, r), stack)
 
 
 STORAGE = "entity-cache:{}:"
+TAG_STORAGE = "entity-cache:tags:{}:"
+ENTITIES = {"projects": "project", "sites": "site", "memories": "memory", "comments": "comment"}
+TAGS = tuple(ENTITIES.values())
 SHIM_KEY = "__cache_shim__"
 TTL = Config.cache.cache_ttl
+LEASE = Config.cache.lease
+LEASE_TTL = Config.cache.lease_ttl_ms
+LEASE_POLL = Config.cache.lease_poll_ms / 1000
+REPLICA_LAG = (
+    Config.database["default"].sticky_seconds
+    if "default" in Config.database and Config.database["default"].replica is not None
+    else 0
+)
+"""Seconds replicas may lag behind the primary, entries filled within it are evicted again"""
 
 FUNC_TYPE = typing.Callable[..., typing.Awaitable[BaseModel]]
 
+_evicting = contextvars.ContextVar("cache_evicting", default=False)
+"""Set while the current request is evicting, other requests keep using the cache"""
+
+_evicted = contextvars.ContextVar("cache_evicted", default=None)
+"""Always evicted caches already cleared by the current eviction"""
+
 
 def shash(data: typing.Iterable[typing.Any]):
     d = hashlib.md5()
     for a in data:
         d.update(str(a).encode("utf-8"))
+        d.update(b"\0")
     return d.digest()
 
 
+def _tag_key(kind: typing.Literal["node", "tree"], path: typing.Tuple) -> bytes:
+    return TAG_STORAGE.format(kind).encode("ascii") + shash([path])
+
+
+def _tag_lookup(f: FUNC_TYPE) -> typing.Dict[str, int]:
+    s = inspect.signature(f)
+    return {tag: _index_of(tag, f) for tag in TAGS if tag in s.parameters}
+
+
+def _read_dependency(f: FUNC_TYPE) -> typing.Optional[ReadDependency]:
+    for v in inspect.signature(f).parameters.values():
+        if type(v.default) == DependsParam and isinstance(v.default.dependency, ReadDependency):
+            return v.default.dependency
+    return None
+
+
+def _tag_path(
+        lookup: typing.Dict[str, int],
+        args: typing.Sequence[typing.Any],
+        kwargs: typing.Dict[str, typing.Any]
+) -> typing.Tuple:
+    """Path of entity identifiers from the outermost entity inwards e.g. (project, site)
+    """
+    path = list()
+    for tag in TAGS:
+        if tag in kwargs:
+            value = kwargs[tag]
+        elif tag in lookup and lookup[tag] < len(args):
+            value = args[lookup[tag]]
+        else:
+            break
+        if value is None:
+            break
+        path.append(value)
+    return tuple(path)
+
+
+EVICT_SCRIPT = """
+local keys = redis.call('SUNION', unpack(KEYS))
+for i = 1, #keys, 1000 do
+    redis.call('DEL', unpack(keys, i, math.min(i + 999, #keys)))
+end
+redis.call('DEL', unpack(KEYS))
+return #keys
+"""
+"""Deletes all members of the given tag sets and the sets in one go"""
+
+RELEASE_SCRIPT = """
+if redis.call('GET', KEYS[1]) == ARGV[1] then
+    return redis.call('DEL', KEYS[1])
+end
+return 0
+"""
+"""Deletes a lease only if it is still held with the given token"""
+
+
+def _etag(data: typing.Union[str, bytes]) -> bytes:
+    if isinstance(data, str):
+        data = data.encode("utf-8")
+    return f'"{hashlib.md5(data).hexdigest()}"'.encode("ascii")
+
+
+def _etag_matches(if_none_match: typing.Optional[str], etag: typing.Optional[bytes]) -> bool:
+    if if_none_match is None or etag is None:
+        return False
+    etag = etag.decode("ascii")
+    return any(
+        tag == "*" or tag.removeprefix("W/") == etag
+        for tag in map(str.strip, if_none_match.split(","))
+    )
+
+
+def _response(
+        data: typing.Union[str, bytes],
+        etag: typing.Optional[bytes],
+        if_none_match: typing.Optional[str] = None,
+) -> Response:
+    headers = {CACHE_CONTROL: "no-cache", VARY: f"{ACCEPT_LANGUAGE}, {AUTHORIZATION}"}
+    if etag is not None:
+        headers[ETAG] = etag.decode("ascii")
+    if _etag_matches(if_none_match, etag):
+        return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=headers)
+    return Response(status_code=200, content=data, media_type=JSONResponse.media_type, headers=headers)
+
+
 async def _get_request(r: Request):
     yield r
 
@@ -92,7 +200,7 @@ def _add_shim(f: FUNC_TYPE, replace_deps: bool = False) -> FUNC_TYPE:
         Replaces Dependency With a mock one that will later be called if needed
         """
         for v in s.parameters.values():
-            if type(v.default) == DependsParam and type(v.default.dependency) == DatabaseDependency:
+            if type(v.default) == DependsParam and isinstance(v.default.dependency, (DatabaseDependency, ReadDependency)):
                 v = v.replace(default=Depends(DelayedDependency(v.default.dependency), use_cache=False))
             params.append(v)
     else:
@@ -112,9 +220,37 @@ def _add_shim(f: FUNC_TYPE, replace_deps: bool = False) -> FUNC_TYPE:
     return f
 
 
-def _pop(kwargs: typing.Dict[str, typing.Any]) -> typing.Tuple[FastStorage, User]:
+def _pop(kwargs: typing.Dict[str, typing.Any]) -> typing.Tuple[FastStorage, Request]:
     r: Request = kwargs.pop(SHIM_KEY)
-    return r.state.cache, r.user
+    return r.state.cache, r
+
+
+def _visibility(u: User, project: typing.Optional[str]) -> typing.Tuple[str, ...]:
+    """Collapses user scopes into the classes that change what the user can see
+    """
+    if u.is_superuser:
+        return scopes.SUPERUSER,
+    elif project is not None and project in u.admin_projects:
+        return scopes.ADMIN,
+    elif project is None and len(u.admin_projects) != 0:
+        return scopes.ADMIN, *sorted(u.admin_projects)
+    elif u.is_authenticated:
+        return scopes.AUTHENTICATED,
+    else:
+        return scopes.UNAUTHENTICATED,
+
+
+def _key_scope(r: Request, tags: typing.Tuple) -> typing.Optional[typing.Tuple[str, ...]]:
+    """Language and visibility part of cache keys
+
+    Returns None if the request language can not be resolved
+    """
+    from ..backend.repos.base.utils import extract_language
+    try:
+        lang = extract_language(r)
+    except ValueError:
+        return None
+    return lang, *_visibility(r.user, tags[0] if len(tags) != 0 else None)
 
 
 def _index_of(arg: str, f: FUNC_TYPE) -> int:
@@ -147,9 +283,8 @@ class CachesMeta(type):
 
 
 class Cache(metaclass=CachesMeta):
-    _evicting = False
     _always_evict = collections.deque()
-    _evicted = set()
+    _delayed: typing.Set[asyncio.Task] = set()
 
     Operator: 'CacheOperator'
     """
@@ -161,12 +296,13 @@ class Cache(metaclass=CachesMeta):
     Inject marker for Cache.use decorator
     """
 
-    def __init__(self, prefix: str, *, evicts: typing.Set[str] = None, always_evict: bool = False):
+    def __init__(self, prefix: str, *, always_evict: bool = False):
         self.name = prefix
         self.store_prefix = STORAGE.format(prefix)
-        self.evicts = list(evicts) if evicts is not None else list()
-        # Locking
-        self.lock = threading.Lock()
+        self.entity = ENTITIES.get(prefix, None)
+        # Single-flight
+        self.inflight: typing.Dict[bytes, asyncio.Future] = dict()
+        self.metrics = collections.Counter(hit=0, miss=0, coalesced=0)
         if always_evict:
             Cache._always_evict.append(prefix)
 
@@ -179,27 +315,126 @@ class Cache(metaclass=CachesMeta):
             prefix: str,
             _type: str,
             *keys,
-    ) -> typing.Union[BaseModel, Response]:
+            tags: typing.Tuple = (),
+            if_none_match: typing.Optional[str] = None,
+    ) -> Response:
         key = f"{prefix}{_type}:".encode("ascii") + shash(keys)
-        data = r.get(key)
-        if data is None:
-            with self.lock:
-                data = r.get(key)
-                if data is None:  # pragma: no branch
-                    # This is a very unlikely race condition, double-checked
-                    response_entity: BaseModel = await f(*args, **kwargs)
-                    r.sadd(f"{prefix}all".encode("ascii"), key)
-                    r.set(key, response_entity.json(), ex=TTL)
-                    return response_entity
-        return Response(status_code=200, content=data, media_type=JSONResponse.media_type)
+        etag_key = key + b":etag"
+        if if_none_match is not None:
+            # Revalidation only needs the hash
+            etag = await r.get(etag_key)
+            if _etag_matches(if_none_match, etag):
+                self.metrics["hit"] += 1
+                return _response(b"", etag, if_none_match)
+        data, etag = await r.mget(key, etag_key)
+        if data is not None:
+            self.metrics["hit"] += 1
+            return _response(data, etag, if_none_match)
+
+        inflight = self.inflight.get(key, None)
+        if inflight is not None:
+            # Another coroutine in this process is already filling the key
+            try:
+                data, etag = await asyncio.shield(inflight)
+                self.metrics["coalesced"] += 1
+                return _response(data, etag, if_none_match)
+            except asyncio.CancelledError:
+                if not inflight.cancelled():
+                    raise
+            return await f(*args, **kwargs)
+
+        self.metrics["miss"] += 1
+        inflight = asyncio.get_running_loop().create_future()
+        self.inflight[key] = inflight
+        try:
+            data, etag = await self._fill(r, f, args, kwargs, prefix, key, tags)
+            inflight.set_result((data, etag))
+            return _response(data, etag, if_none_match)
+        except asyncio.CancelledError:
+            inflight.cancel()
+            raise
+        except Exception as e:
+            inflight.set_exception(e)
+            inflight.exception()  # Retrieved, waiters re-raise it themselves
+            raise
+        finally:
+            del self.inflight[key]
+
+    async def _fill(
+            self,
+            r: redis.Redis,
+            f: FUNC_TYPE,
+            args: typing.Sequence[typing.Any],
+            kwargs: typing.Dict[str, typing.Any],
+            prefix: str,
+            key: bytes,
+            tags: typing.Tuple,
+    ) -> typing.Tuple[bytes, bytes]:
+        """Fills a missing key and its ETag
+
+        The key is tagged with the entity path it was created for and added to the subtree of every
+        entity on the path. The tag sets live as long as the newest key in them.
+
+        With leases enabled only one worker fills the key at a time.
+        The others wait for it to appear until the lease expires and fill it themselves if it does not.
+        The lease holds a random token so a worker only ever releases its own lease.
+        """
+        etag_key = key + b":etag"
+        lease = key + b":lease"
+        token = secrets.token_bytes(16)
+        leased = LEASE and await r.set(lease, token, nx=True, px=LEASE_TTL)
+        if LEASE and not leased:
+            deadline = asyncio.get_running_loop().time() + LEASE_TTL / 1000
+            while asyncio.get_running_loop().time() < deadline:
+                await asyncio.sleep(LEASE_POLL)
+                data, etag = await r.mget(key, etag_key)
+                if data is not None:
+                    self.metrics["coalesced"] += 1
+                    return data, etag
+                if not await r.exists(lease):
+                    break
+        try:
+            response_entity: BaseModel = await f(*args, **kwargs)
+            data = response_entity.json().encode("utf-8")
+            etag = _etag(data)
+            async with r.pipeline(transaction=False) as pipe:
+                pipe.set(key, data, ex=TTL)
+                pipe.set(etag_key, etag, ex=TTL)
+                if self.name in Cache._always_evict:
+                    pipe.sadd(f"{prefix}all".encode("ascii"), key, etag_key)
+                for tag in [_tag_key("node", tags), *(_tag_key("tree", tags[:i]) for i in range(len(tags) + 1))]:
+                    pipe.sadd(tag, key, etag_key)
+                    pipe.expire(tag, TTL)
+                await pipe.execute()
+            return data, etag
+        finally:
+            if leased:
+                # The lease may have expired and been taken by another worker
+                await r.register_script(RELEASE_SCRIPT)(keys=[lease], args=[token])
+
+    @staticmethod
+    def stats() -> str:
+        """Hit, miss and coalesced counts of all caches for logging
+        """
+        return ", ".join(
+            f"{name} " + " ".join(f"{k} {v}" for k, v in c.metrics.items())
+            for name, c in CachesMeta.instances.items()
+        )
 
     def key(self, key: str):
 
         def cache_decorator(f: FUNC_TYPE) -> FUNC_TYPE:
+            tag_lookup = _tag_lookup(f)
+            read = _read_dependency(f)
+
             @functools.wraps(f)
             async def wrapper(*args, **kwargs):
-                c, u = _pop(kwargs)
-                if Cache._evicting:
+                c, r = _pop(kwargs)
+                if _evicting.get() or (read is not None and await read.sticky(r)):
+                    return await f(*args, **kwargs)
+                tags = _tag_path(tag_lookup, args, kwargs)
+                scope = _key_scope(r, tags)
+                if scope is None:
                     return await f(*args, **kwargs)
                 return await self._get_from_cache(
                     c.redis,
@@ -209,8 +444,10 @@ class Cache(metaclass=CachesMeta):
                     self.store_prefix,
                     "key",
                     f.__name__,
-                    *u.scopes,
-                    key
+                    *scope,
+                    key,
+                    tags=tags,
+                    if_none_match=r.headers.get(IF_NONE_MATCH, None),
                 )
 
             return _add_shim(wrapper, replace_deps=True)
@@ -221,11 +458,20 @@ class Cache(metaclass=CachesMeta):
 
         def cache_decorator(f: FUNC_TYPE) -> FUNC_TYPE:
             idx_lookup = {arg: _index_of(arg, f) for arg in args}
+            tag_lookup = _tag_lookup(f)
+            read = _read_dependency(f)
 
             @functools.wraps(f)
             async def wrapper(*func_args, **func_kwargs):
-                c, u = _pop(func_kwargs)
-                if Cache._evicting or (exclude is not None and exclude(*func_args, **func_kwargs)):
+                c, r = _pop(func_kwargs)
+                if _evicting.get() or (exclude is not None and exclude(*func_args, **func_kwargs)):
+                    return await f(*func_args, **func_kwargs)
+                if read is not None and await read.sticky(r):
+                    # Cached entries may be older than the own writes of the user
+                    return await f(*func_args, **func_kwargs)
+                tags = _tag_path(tag_lookup, func_args, func_kwargs)
+                scope = _key_scope(r, tags)
+                if scope is None:
                     return await f(*func_args, **func_kwargs)
                 key = iter(func_kwargs[arg] if arg in func_kwargs else args[idx_lookup[arg]] for arg in args)
                 return await self._get_from_cache(
@@ -236,38 +482,83 @@ class Cache(metaclass=CachesMeta):
                     self.store_prefix,
                     "args",
                     f.__name__,
-                    *u.scopes,
-                    *key
+                    *scope,
+                    *key,
+                    tags=tags,
+                    if_none_match=r.headers.get(IF_NONE_MATCH, None),
                 )
 
             return _add_shim(wrapper, replace_deps=True)
 
         return cache_decorator
 
-    def _evict(self, r: redis.Redis):
-        Cache._evicted.add(self.name)
+    async def _evict_tags(self, r: redis.Redis, path: typing.Tuple):
+        """Evicts all keys related to a mutation of the entity at path
+
+        A mutation of an entity of this cache evicts its whole subtree.
+        Creating one only evicts the listings it would be added to.
+        Listings and counts on the parents of the mutated entity are evicted in both cases.
+        """
+        depth = TAGS.index(self.entity) + 1 if self.entity in TAGS else 0
+        if len(path) >= depth:
+            tags = [_tag_key("tree", path), *(_tag_key("node", path[:i]) for i in range(len(path)))]
+        else:
+            tags = [_tag_key("node", path[:i]) for i in range(len(path) + 1)]
+        await r.register_script(EVICT_SCRIPT)(keys=tags)
+
+    async def _evict(self, r: redis.Redis):
+        evicted = _evicted.get()
+        if evicted is not None:
+            evicted.add(self.name)
         set_key = f"{self.store_prefix}all".encode("ascii")
-        keys = r.smembers(set_key)
+        keys = await r.smembers(set_key)
         if keys is not None:
             for k in keys:
-                r.delete(k)
-        r.delete(set_key)
+                await r.delete(k)
+        await r.delete(set_key)
+
+    async def _evict_path(self, r: redis.Redis, path: typing.Tuple):
+        evicting = _evicting.set(True)
+        evicted = _evicted.set(set())
+        try:
+            await self._evict_tags(r, path)
+            for cache in Cache._always_evict:
+                if cache not in _evicted.get():
+                    await Cache(cache)._evict(r)
+        finally:
+            _evicted.reset(evicted)
+            _evicting.reset(evicting)
+
+    async def _evict_delayed(self, r: redis.Redis, path: typing.Tuple):
+        await asyncio.sleep(REPLICA_LAG)
+        try:
+            await self._evict_path(r, path)
+        except Exception as e:
+            log.warning(f"Failed delayed eviction of {self.name}", exc_info=e)
+
+    async def _evict_committed(self, r: redis.Redis, path: typing.Tuple):
+        await self._evict_path(r, path)
+        if REPLICA_LAG > 0:
+            task = asyncio.get_running_loop().create_task(self._evict_delayed(r, path))
+            Cache._delayed.add(task)
+            task.add_done_callback(Cache._delayed.discard)
 
     def evict(self, f: FUNC_TYPE) -> FUNC_TYPE:
+        """Evicts the entities affected by the call
+
+        Evicted once before the call and again after the commit,
+        so that entries filled while the write was in progress do not survive it.
+        With a replica the entities are evicted a third time once the replica has caught up,
+        entries filled from the replica in between may not contain the write yet.
+        """
+        tag_lookup = _tag_lookup(f)
 
         @functools.wraps(f)
         async def wrapper(*func_args, **func_kwargs):
-            Cache._evicting = True
-            Cache._evicted.clear()
-            try:
-                c, u = _pop(func_kwargs)
-                self._evict(c.redis)
-                for cache in itertools.chain(self.evicts, Cache._always_evict):
-                    if cache not in Cache._evicted:
-                        Cache(cache)._evict(c.redis)
-            finally:
-                Cache._evicted.clear()
-                Cache._evicting = False
+            c, r = _pop(func_kwargs)
+            path = _tag_path(tag_lookup, func_args, func_kwargs)
+            await self._evict_path(c.redis, path)
+            after_commit(r, functools.partial(self._evict_committed, c.redis, path))
             return await f(*func_args, **func_kwargs)
 
         return _add_shim(wrapper)
@@ -275,7 +566,7 @@ class Cache(metaclass=CachesMeta):
     async def operate(self, r: Request):
         """FastAPI
         """
-        if Cache._evicting:
+        if _evicting.get():
             yield None
         else:
             yield CacheOperator(self, r.state.cache)
@@ -304,23 +595,23 @@ class CacheOperator:
         self.parent = p
         self.redis = r
 
-    def set(
+    async def set(
             self,
             *keys: typing.Any,
             data: typing.Union[str, bytes],
             prefix: typing.Literal["key", "args", "custom"] = "custom"
     ):
         key = f"{self.parent.store_prefix}{prefix}:".encode("ascii") + shash(keys)
-        self.redis.set(key, data)
-        self.redis.sadd(f"{self.parent.store_prefix}all".encode("ascii"), key)
+        await self.redis.set(key, data)
+        await self.redis.sadd(f"{self.parent.store_prefix}all".encode("ascii"), key)
 
-    def get(
+    async def get(
             self,
             *keys: typing.Any,
             prefix: typing.Literal["key", "args", "custom"] = "custom"
     ):
         key = f"{self.parent.store_prefix}{prefix}:".encode("ascii") + shash(keys)
-        return self.redis.get(key)
+        return await self.redis.get(key)
 
 
 Cache.Operator = CacheOperator
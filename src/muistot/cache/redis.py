@@ -1,10 +1,14 @@
 import typing
 
-import redis
 from fastapi import FastAPI
+from redis import asyncio as redis
 
 
 class FastStorage:
+    """Async Redis storage
+
+    All connections are taken from a single shared connection pool.
+    """
     redis: typing.Optional[redis.Redis]
 
     def __init__(self, url: str):
@@ -13,25 +17,25 @@ class FastStorage:
 
     def connect(self):
         if self.redis is None:
-            self.redis = redis.from_url(self.url)
+            self.redis = redis.Redis(connection_pool=redis.ConnectionPool.from_url(self.url))
 
-    def disconnect(self):
+    async def disconnect(self):
         if self.redis is not None:
             i = self.redis
             self.redis = None
-            i.close()
+            await i.close(close_connection_pool=True)
 
-    def set(self, key: str, value: typing.Union[str, bytes], /, prefix: str = "custom:", ttl: int = None):
-        self.redis.set(f"{prefix}{key}", value, ex=ttl)
+    async def set(self, key: str, value: typing.Union[str, bytes], /, prefix: str = "custom:", ttl: int = None):
+        await self.redis.set(f"{prefix}{key}", value, ex=ttl)
 
-    def get(self, key: str, /, prefix: str = "custom:") -> typing.Optional[bytes]:
-        return self.redis.get(f"{prefix}{key}")
+    async def get(self, key: str, /, prefix: str = "custom:") -> typing.Optional[bytes]:
+        return await self.redis.get(f"{prefix}{key}")
 
-    def delete(self, *keys: str, prefix: str = "custom:"):
-        return self.redis.delete(*(f"{prefix}{key}" for key in keys))
+    async def delete(self, *keys: str, prefix: str = "custom:"):
+        return await self.redis.delete(*(f"{prefix}{key}" for key in keys))
 
-    def exists(self, *keys: str, prefix: str = "custom:") -> bool:
-        return bool(self.redis.exists(*iter(f"{prefix}{key}" for key in keys)))
+    async def exists(self, *keys: str, prefix: str = "custom:") -> bool:
+        return bool(await self.redis.exists(*iter(f"{prefix}{key}" for key in keys)))
 
 
 def register_redis_cache(app: FastAPI):
@@ -51,4 +55,7 @@ def register_redis_cache(app: FastAPI):
 
     @app.on_event("shutdown")
     async def close_cache():
-        instance.disconnect()
+        from .decorator import Cache
+        from ..logging import log
+        await instance.disconnect()
+        log.info(f"Entity cache {Cache.stats()}")
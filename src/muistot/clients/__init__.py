@@ -0,0 +1,95 @@
+import asyncio
+import typing
+from urllib.parse import urlsplit
+
+import httpx
+from fastapi import FastAPI
+
+from ..config import Config
+from ..logging import log
+
+
+class HTTPClients:
+    """Shared HTTP clients
+
+    One client is kept per host so that connections stay alive between calls and the connection limits apply
+    per host. The clients are bound to the event loop they were created in and are closed on shutdown.
+    Clients replaced because they belong to another loop are closed in the background.
+    """
+    _clients: typing.Dict[str, typing.Tuple[asyncio.AbstractEventLoop, httpx.AsyncClient]]
+    _closing: typing.Set[asyncio.Task]
+
+    def __init__(self):
+        self._clients = dict()
+        self._closing = set()
+
+    @staticmethod
+    def _origin(url: str) -> str:
+        parts = urlsplit(url)
+        return f"{parts.scheme}://{parts.netloc}"
+
+    @staticmethod
+    def _create() -> httpx.AsyncClient:
+        config = Config.http
+        return httpx.AsyncClient(
+            timeout=httpx.Timeout(config.timeout_seconds, connect=config.connect_timeout_seconds),
+            limits=httpx.Limits(
+                max_connections=config.max_connections_per_host,
+                max_keepalive_connections=config.max_keepalive_per_host,
+                keepalive_expiry=config.keepalive_seconds,
+            ),
+        )
+
+    def get(self, url: str) -> httpx.AsyncClient:
+        """Returns the shared client for the host of the url
+
+        The client has no base url, requests should be made with absolute urls.
+        """
+        origin = HTTPClients._origin(url)
+        loop = asyncio.get_running_loop()
+        entry = self._clients.get(origin, None)
+        if entry is None or entry[0] is not loop or entry[1].is_closed:
+            if entry is not None and not entry[1].is_closed:
+                task = loop.create_task(HTTPClients._close(*entry))
+                self._closing.add(task)
+                task.add_done_callback(self._closing.discard)
+            entry = loop, HTTPClients._create()
+            self._clients[origin] = entry
+        return entry[1]
+
+    @staticmethod
+    async def _close(loop: asyncio.AbstractEventLoop, client: httpx.AsyncClient):
+        """Closes the client in its own loop if that loop is still running elsewhere
+        """
+        try:
+            if loop is not asyncio.get_running_loop() and loop.is_running():
+                await asyncio.wrap_future(asyncio.run_coroutine_threadsafe(client.aclose(), loop))
+            else:
+                await client.aclose()
+        except Exception as e:
+            log.warning("Failed to close HTTP client", exc_info=e)
+
+    async def close(self):
+        """Closes all clients including the ones of other loops
+        """
+        clients = self._clients
+        self._clients = dict()
+        loop = asyncio.get_running_loop()
+        await asyncio.gather(
+            *(task for task in self._closing if task.get_loop() is loop),
+            *(HTTPClients._close(*entry) for entry in clients.values()),
+        )
+
+
+clients = HTTPClients()
+
+
+def register_http_clients(app: FastAPI):
+    app.state.HTTPClients = clients
+
+    @app.on_event("shutdown")
+    async def close_clients():
+        await clients.close()
+
+
+__all__ = ["clients", "HTTPClients", "register_http_clients"]
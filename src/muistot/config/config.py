@@ -1,5 +1,5 @@
 from pathlib import Path
-from typing import Dict, Set
+from typing import Dict, Set, Optional
 
 from pydantic import BaseModel, Field, AnyUrl, AnyHttpUrl, Extra, DirectoryPath
 
@@ -29,6 +29,14 @@ class Database(BaseModel):
     # -----------------------
     ssl: bool = False
 
+    # Read Replica
+    # -----------------------
+    # replica:        Name of the database serving reads of this database
+    # sticky_seconds: Time the reads of a user stay on this database after they have written
+    # -----------------------
+    replica: Optional[str] = None
+    sticky_seconds: int = 10
+
     class Config:
         extra = Extra.ignore
 
@@ -37,11 +45,33 @@ class Mailer(BaseModel):
     driver: str = Field(".logmailer", regex=r'^\.?\w+(?:\.\w+)*$')
     config: Dict = Field(default_factory=dict)
 
+    # Shutdown
+    # -----------------------
+    # close_timeout_seconds: Time waited on shutdown for queued mails to be sent
+    # -----------------------
+    close_timeout_seconds: float = 10
+
 
 class Namegen(BaseModel):
     url: AnyHttpUrl = "http://username-generator"
 
 
+class HTTP(BaseModel):
+    # Shared HTTP clients
+    # -----------------------
+    # timeout_seconds:          Timeout for reading, writing and waiting for a pooled connection
+    # connect_timeout_seconds:  Timeout for opening a connection
+    # max_connections_per_host: Open connections to a single host at most
+    # max_keepalive_per_host:   Idle connections kept alive to a single host at most
+    # keepalive_seconds:        Time an idle connection is kept alive
+    # -----------------------
+    timeout_seconds: float = 10
+    connect_timeout_seconds: float = 5
+    max_connections_per_host: int = 20
+    max_keepalive_per_host: int = 10
+    keepalive_seconds: float = 30
+
+
 class Sessions(BaseModel):
     redis_url: AnyUrl = "redis://session-storage?db=0"
     token_lifetime: int = 60 * 16
@@ -50,6 +80,15 @@ class Sessions(BaseModel):
 
 class Security(BaseModel):
     bcrypt_cost: int = 12
+
+    # Password Hashing
+    # -----------------------
+    # hash_workers: Threads hashing passwords outside the event loop
+    # hash_queue:   Calls allowed to wait for a hashing thread before rejecting with 503
+    # -----------------------
+    hash_workers: int = 2
+    hash_queue: int = 32
+
     oauth: Dict[str, Dict] = Field(default_factory=dict)
 
     class Config:
@@ -80,6 +119,16 @@ class Cache(BaseModel):
     redis_url: AnyUrl = "redis://session-storage?db=1"
     cache_ttl: int = 60 * 10
 
+    # Cache fill leases
+    # -----------------------
+    # lease:         Coalesce cache fills across workers with a Redis lease
+    # lease_ttl_ms:  Time the lease is held at most
+    # lease_poll_ms: Interval for polling the filled value while waiting
+    # -----------------------
+    lease: bool = False
+    lease_ttl_ms: int = 5000
+    lease_poll_ms: int = 50
+
 
 class BaseConfig(BaseModel):
     testing: bool = Field(default_factory=lambda: True)
@@ -87,6 +136,7 @@ class BaseConfig(BaseModel):
     security: Security = Field(default_factory=Security)
     sessions: Sessions = Field(default_factory=Sessions)
     namegen: Namegen = Field(default_factory=Namegen)
+    http: HTTP = Field(default_factory=HTTP)
     files: FileStore = Field(default_factory=FileStore)
     mailer: Mailer = Field(default_factory=Mailer)
     localization: Localization = Field(default_factory=Localization)
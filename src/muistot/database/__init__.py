@@ -6,16 +6,21 @@ from .connection import (
     OperationalError,
     InterfaceError,
 )
-from .store import Databases, register_databases, DatabaseDependency
+from .statements import statements, StatementCache
+from .store import Databases, register_databases, DatabaseDependency, ReadDependency, after_commit
 
 __all__ = [
     "register_databases",
     "Database",
     "Databases",
     "DatabaseDependency",
+    "ReadDependency",
+    "after_commit",
     "IntegrityError",
     "DatabaseError",
     "OperationalError",
     "InterfaceError",
     "DatabaseProvider",
+    "statements",
+    "StatementCache",
 ]
@@ -1,10 +1,11 @@
 import contextlib
-from typing import Mapping, Any
+from typing import Mapping, Any, Dict
 
-from sqlalchemy import exc, text, Result
+from sqlalchemy import exc, Result
 from sqlalchemy.ext.asyncio import create_async_engine, AsyncEngine, AsyncConnection
 
 from .resultset import ResultSet
+from .statements import statements
 from ..config.config import Database
 
 
@@ -24,6 +25,12 @@ class InterfaceError(DatabaseError):
     pass
 
 
+def _columns(result) -> Dict[str, int]:
+    """Column to index map shared by all rows of a result
+    """
+    return {k: i for i, k in enumerate(result.keys())}
+
+
 class ConnectionWrapper:
     """Wraps connection operations to something a bit more concise
     """
@@ -35,7 +42,7 @@ class ConnectionWrapper:
 
     @contextlib.asynccontextmanager
     async def _query(self, query: str, values: Mapping[str, Any]) -> Result:
-        query = text(query)
+        query = statements(query)
         if values:
             result = await self.connection.execute(query, parameters=values)
         else:
@@ -53,20 +60,39 @@ class ConnectionWrapper:
 
     async def fetch_one(self, query: str, values: Mapping[str, Any] = None):
         async with self._query(query, values) as c:
-            res = c.mappings().fetchone()
+            res = c.fetchone()
             if res:
-                return ResultSet(res.items())
+                return ResultSet.from_row(_columns(c), res)
 
     async def fetch_all(self, query: str, values: Mapping[str, Any] = None):
         async with self._query(query, values) as c:
-            rs = c.mappings().fetchall()
-            return [ResultSet(res.items()) for res in rs] if rs is not None else []
+            rs = c.fetchall()
+            columns = _columns(c)
+            return [ResultSet.from_row(columns, res) for res in rs] if rs is not None else []
 
     async def iterate(self, query: str, values: Mapping[str, Any] = None):
         async with self._query(query, values) as c:
-            rs = c.mappings()
-            for res in rs:
-                yield ResultSet(res.items())
+            columns = _columns(c)
+            for res in c:
+                yield ResultSet.from_row(columns, res)
+
+    async def stream(self, query: str, values: Mapping[str, Any] = None):
+        """Iterates rows from a server side cursor
+
+        Rows are fetched from the database as they are consumed instead of buffering the whole result.
+        No other queries can be made on this connection until the iteration has finished.
+        """
+        query = statements(query)
+        if values:
+            result = await self.connection.stream(query, parameters=values)
+        else:
+            result = await self.connection.stream(query)
+        try:
+            columns = _columns(result)
+            async for res in result:
+                yield ResultSet.from_row(columns, res)
+        finally:
+            await result.close()
 
 
 class DatabaseProvider:
@@ -103,19 +129,26 @@ class DatabaseProvider:
         del self.engine
 
     @contextlib.asynccontextmanager
-    async def __call__(self):
+    async def __call__(self, read_only: bool = False):
         """Allocates a single connection
+
+        Read-only connections are not wrapped in an explicit transaction.
+        The implicit transaction started by the first query is rolled back when the connection is closed,
+        which also counts as the pool reset, so no COMMIT is sent.
         """
         if not self.is_connected():
             raise OperationalError("Database not Running")
         try:
             async with self.engine.connect() as connection:
-                async with connection.begin() as tsx:
+                if read_only:
                     yield ConnectionWrapper(connection)
-                    if self.config.rollback:
-                        await tsx.rollback()
-                    else:
-                        await tsx.commit()
+                else:
+                    async with connection.begin() as tsx:
+                        yield ConnectionWrapper(connection)
+                        if self.config.rollback:
+                            await tsx.rollback()
+                        else:
+                            await tsx.commit()
         except exc.DBAPIError as e:
             if isinstance(e, exc.IntegrityError):
                 raise IntegrityError() from e
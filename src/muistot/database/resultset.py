@@ -1,4 +1,4 @@
-from typing import Tuple, Iterable, Any, Union
+from typing import Tuple, Iterable, Any, Union, Mapping, Sequence, Optional
 
 
 class ResultSet:
@@ -16,22 +16,33 @@ class ResultSet:
     1
     >>> print(c2)
     b
+
+    Rows of a single result should be created with *from_row* to share the column map between all rows.
     """
+    __slots__ = ("_columns", "_values")
+
+    _columns: Mapping[str, int]
+    _values: Sequence[Any]
 
-    def __init__(self, items: Iterable[Tuple[str, Any]]):
+    def __init__(self, items: Optional[Iterable[Tuple[str, Any]]] = None):
         super(ResultSet, self).__init__()
-        self.dict = dict()
-        self.list = list()
-        for k, v in items:
-            self.dict[k] = v
-            self.list.append(v)
-        # Dict
-        self.values = self.dict.values
-        self.items = self.dict.items
-        self.get = self.dict.get
-        # List
-        self.count = self.list.count
-        self.__reversed__ = self.list.__reversed__
+        columns = dict()
+        values = list()
+        if items is not None:
+            for k, v in items:
+                columns[k] = len(values)
+                values.append(v)
+        self._columns = columns
+        self._values = tuple(values)
+
+    @classmethod
+    def from_row(cls, columns: Mapping[str, int], values: Sequence[Any]) -> 'ResultSet':
+        """Creates a row from a shared column to index map and the row values
+        """
+        self = cls.__new__(cls)
+        self._columns = columns
+        self._values = values
+        return self
 
     def __getitem__(self, item: Union[str, int]):
         """Maps item to a value
@@ -39,37 +50,61 @@ class ResultSet:
         - Integer access means positional access [0,len(result)[
         - Str is viewed as a column key
         """
-        if isinstance(item, int):
-            return self.list[item]
+        if item.__class__ is str or not isinstance(item, int):
+            return self._values[self._columns[item]]
         else:
-            return self.dict[item]
+            return self._values[item]
 
     def __iter__(self):
         """Return all values from result
         """
-        return self.list.__iter__()
+        return iter(self._values)
+
+    def __reversed__(self):
+        return reversed(self._values)
 
     def __len__(self) -> int:
         """Results length e.i. number of columns
         """
-        return self.dict.__len__()
+        return len(self._columns)
 
     def __repr__(self):
         """Dict.__repr__
         """
-        return self.dict.__repr__()
+        return dict(self.items()).__repr__()
 
     def __str__(self):
         """Dict.__str__
         """
-        return self.dict.__str__()
+        return dict(self.items()).__str__()
 
     def __contains__(self, key: str):
         """Checks for column in result set
         """
-        return key in self.dict
+        return key in self._columns
 
     def keys(self):
         """Returns a view of result columns
         """
-        return self.dict.keys()
+        return self._columns.keys()
+
+    def values(self):
+        """Returns the result values
+        """
+        return self._values
+
+    def items(self):
+        """Returns column and value pairs
+        """
+        return list(zip(self._columns.keys(), self._values))
+
+    def get(self, key: str, default: Any = None):
+        """Dict.get
+        """
+        i = self._columns.get(key, None)
+        return default if i is None else self._values[i]
+
+    def count(self, value: Any) -> int:
+        """List.count
+        """
+        return tuple(self._values).count(value)
@@ -0,0 +1,84 @@
+import contextlib
+import contextvars
+from collections import OrderedDict
+from typing import Iterator
+
+from sqlalchemy import text, TextClause
+
+
+class StatementCounts:
+    """Statement cache hits and misses of a single request
+    """
+    __slots__ = ["hits", "misses"]
+
+    def __init__(self):
+        self.hits = 0
+        self.misses = 0
+
+
+_counts = contextvars.ContextVar("statement_counts", default=None)
+
+
+class StatementCache:
+    """Reuses text clauses for repeated SQL
+
+    Creating a text clause parses the bind parameters out of the SQL on every call.
+    Reusing the same clause skips the parsing and also keeps the SQLAlchemy compiled cache warm.
+
+    The cache is a LRU keyed by the SQL text so dynamically built queries only take a slot per distinct text.
+    """
+
+    def __init__(self, size: int = 512):
+        self.size = size
+        self.hits = 0
+        self.misses = 0
+        self._data = OrderedDict()
+
+    def __call__(self, query: str) -> TextClause:
+        """Returns a text clause for the query
+        """
+        data = self._data
+        counts = _counts.get()
+        try:
+            clause = data[query]
+            data.move_to_end(query)
+            self.hits += 1
+            if counts is not None:
+                counts.hits += 1
+        except KeyError:
+            clause = text(query)
+            data[query] = clause
+            if len(data) > self.size:
+                data.popitem(last=False)
+            self.misses += 1
+            if counts is not None:
+                counts.misses += 1
+        return clause
+
+    @staticmethod
+    @contextlib.contextmanager
+    def track() -> Iterator[StatementCounts]:
+        """Counts the hits and misses of the current context and the tasks it starts
+        """
+        counts = StatementCounts()
+        token = _counts.set(counts)
+        try:
+            yield counts
+        finally:
+            _counts.reset(token)
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+    def clear(self):
+        self._data.clear()
+        self.hits = 0
+        self.misses = 0
+
+    def stats(self) -> str:
+        """Hit and miss counts for logging
+        """
+        return f"statements {len(self)}/{self.size} hits {self.hits} misses {self.misses}"
+
+
+statements = StatementCache()
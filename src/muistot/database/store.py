@@ -1,21 +1,70 @@
-from typing import Dict, Iterator
+import contextlib
+from typing import Awaitable, Callable, Dict, Iterator, Optional
+
+from fastapi import Request
 
 from .connection import DatabaseProvider
+from .statements import statements
 from ..config import Config
 from ..logging import log
 
+STICKY = "database-sticky:{}:"
+SAFE_METHODS = {"GET", "HEAD", "OPTIONS"}
 
 def create_connection(database):
     return DatabaseProvider(database)
 
 
+def after_commit(r: Request, hook: Callable[[], Awaitable]):
+    """Runs the hook once the write connection of the request has committed
+
+    The hook is skipped if the request fails and the transaction is rolled back.
+    """
+    try:
+        hooks = r.state.after_commit
+    except AttributeError:
+        hooks = r.state.after_commit = list()
+    hooks.append(hook)
+
+
+async def _run_after_commit(r: Request):
+    hooks = getattr(r.state, "after_commit", None)
+    if hooks:
+        r.state.after_commit = list()
+        for hook in hooks:
+            try:
+                await hook()
+            except Exception as e:
+                log.warning("Failed after commit hook", exc_info=e)
+
+
+def _sticky_user(r: Optional[Request]) -> Optional[str]:
+    """User whose reads should follow their writes
+    """
+    if r is None or "user" not in r.scope or not r.user.is_authenticated:
+        return None
+    return r.user.identity
+
+
 class DatabaseDependency:
+    """Connection for a single request
+
+    Successful writes of authenticated users mark the user as sticky for `sticky` seconds.
+    Hooks added with after_commit run once the write has been committed.
+    """
+    sticky: int
 
     def __init__(self, name: str, database_instance):
         self.database = database_instance
         self.name = name
+        self.sticky = 0
+
+    async def __call__(self, r: Request = None):
+        async with self.connection(r) as db:
+            yield db
 
-    async def __call__(self):
+    @contextlib.asynccontextmanager
+    async def connection(self, r: Request = None, read_only: bool = False):
         c = self.database
         if not c.is_connected:
             try:
@@ -23,18 +72,70 @@ class DatabaseDependency:
             except c.OperationalError as e:
                 log.error(f"Failed to connect database: {self.name}", exc_info=e)
                 raise e
-        async with c() as db:
+        async with (c(read_only=True) if read_only else c()) as db:
+            yield db
+            # Marked before commit so that a read racing the commit will not go to the replica
+            if self.sticky > 0 and not read_only and r is not None and r.method not in SAFE_METHODS:
+                user = _sticky_user(r)
+                if user is not None:
+                    await r.state.cache.set(user, b"1", prefix=STICKY.format(self.name), ttl=self.sticky)
+        if not read_only and r is not None:
+            await _run_after_commit(r)
+
+
+class ReadDependency:
+    """Routes reads to the replica of a database
+
+    Users that have recently written keep reading from the primary to see their own writes.
+    Without a replica all reads go to the primary.
+    Connections are always read-only.
+    """
+
+    def __init__(self, primary: DatabaseDependency, replica: Optional[DatabaseDependency] = None):
+        self.primary = primary
+        self.replica = replica
+
+    @property
+    def name(self) -> str:
+        return self.primary.name if self.replica is None else self.replica.name
+
+    async def sticky(self, r: Optional[Request]) -> bool:
+        """Whether the user of the request has to read from the primary to see their own writes
+        """
+        if self.replica is None:
+            return False
+        user = _sticky_user(r)
+        return user is not None and await r.state.cache.exists(user, prefix=STICKY.format(self.primary.name))
+
+    async def _route(self, r: Optional[Request]) -> DatabaseDependency:
+        if self.replica is None or await self.sticky(r):
+            return self.primary
+        return self.replica
+
+    async def __call__(self, r: Request = None):
+        dependency = await self._route(r)
+        async with dependency.connection(r, read_only=True) as db:
             yield db
 
 
 class _Databases:
     _data: Dict[str, DatabaseDependency]
     default: DatabaseDependency
+    read: ReadDependency
 
     def __init__(self):
         self._data = dict()
         for k, v in Config.database.items():
             self._data[k] = DatabaseDependency(k, create_connection(v))
+        primary = self._data.get("default", None)
+        replica = Config.database["default"].replica if primary is not None else None
+        if replica is not None:
+            if replica not in self._data:
+                raise ValueError(f"Unknown replica database: {replica}")
+            primary.sticky = Config.database["default"].sticky_seconds
+            self.read = ReadDependency(primary, self._data[replica])
+        else:
+            self.read = ReadDependency(primary)
 
     def __getattr__(self, item) -> DatabaseDependency:
         return self._data[item]
@@ -49,6 +150,21 @@ Databases = _Databases()
 def register_databases(app):
     app.state.Databases = Databases
 
+    @app.middleware("http")
+    async def count_statements(r, cn):
+        """Logs the statement cache hits and misses of each request
+
+        Misses mean new statements were compiled and are logged as info.
+        """
+        with statements.track() as counts:
+            try:
+                return await cn(r)
+            finally:
+                (log.info if counts.misses else log.debug)(
+                    f"{r.method} request to {r.url.path}"
+                    f" (statement cache hits {counts.hits} misses {counts.misses})"
+                )
+
     @app.on_event("startup")
     async def connect():
         """Try to connect to all declared connections
@@ -70,3 +186,4 @@ def register_databases(app):
                 await db.disconnect()
             except db.OperationalError as e:
                 log.warning(f"Failed to disconnect from database: {dbd.name}", exc_info=e)
+        log.info(f"Database {statements.stats()}")
@@ -9,5 +9,12 @@ def register_login(app: FastAPI):
     register_default_providers(app)
     register_oauth_providers(app)
 
+    @app.on_event("shutdown")
+    async def stop_hashing():
+        from ..logging import log
+        from ..security.password import hashing
+        log.info(f"Password {hashing.stats()}")
+        hashing.shutdown()
+
 
 __all__ = ["register_login", "start_session"]
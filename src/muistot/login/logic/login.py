@@ -1,5 +1,6 @@
+from typing import Optional
+
 import headers
-import httpx
 from fastapi import HTTPException
 from fastapi import status
 from fastapi.responses import Response
@@ -7,14 +8,15 @@ from fastapi.responses import Response
 from .data import load_session_data, check_token
 from .email import send_confirm_email
 from .models import LoginQuery, RegisterQuery, EmailStr
+from ...clients import clients
 from ...config import Config
 from ...database import Database
-from ...security.password import check_password, hash_password
+from ...security.password import verify_password_async, hash_password_async
 from ...sessions import SessionManager, Session
 
 
 async def start_session(username: str, db: Database, sm: SessionManager) -> Response:
-    token = sm.start_session(
+    token = await sm.start_session(
         Session(
             user=username,
             data=await load_session_data(username, db)
@@ -32,15 +34,34 @@ async def start_session(username: str, db: Database, sm: SessionManager) -> Resp
     )
 
 
+async def update_hash(username: str, old_hash: bytes, new_hash: str, db: Database):
+    """Replaces a hash made with an outdated cost
+
+    Does nothing if the password has been changed since the old hash was read.
+    """
+    await db.execute(
+        """
+        UPDATE users SET password_hash = :new_hash WHERE username = :user AND password_hash = :old_hash
+        """,
+        values=dict(user=username, old_hash=old_hash, new_hash=new_hash),
+    )
+
+
 async def handle_login(m, login: LoginQuery, sm: SessionManager, db: Database) -> Response:
     if m is None:
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST, detail="Bad Request"
         )
     username: str = m[0]
-    stored_hash: bytes = m[1]
+    stored_hash: Optional[bytes] = m[1]
     verified = m[2] == 1
-    if check_password(password_hash=stored_hash, password=login.password):
+    if stored_hash is None:
+        valid, new_hash = False, None
+    else:
+        valid, new_hash = await verify_password_async(password_hash=stored_hash, password=login.password)
+    if valid:
+        if new_hash is not None:
+            await update_hash(username, stored_hash, new_hash, db)
         if not verified:
             raise HTTPException(
                 status_code=status.HTTP_403_FORBIDDEN,
@@ -86,12 +107,12 @@ async def login_email(login: LoginQuery, db: Database, sm: SessionManager) -> Re
     )
 
 
-async def register_user(user: RegisterQuery, db: Database, lang: str, send_mail: bool = True) -> Response:
+async def check_available(username: str, email: EmailStr, db: Database):
     m = await db.fetch_one(
         "SELECT"
         "   EXISTS(SELECT 1 FROM users WHERE username=:uname), "
         "   EXISTS(SELECT 1 FROM users WHERE email=:email)",
-        values=dict(uname=user.username, email=user.email),
+        values=dict(uname=username, email=email),
     )
     username_taken = m[0] == 1
     email_taken = m[1] == 1
@@ -103,18 +124,34 @@ async def register_user(user: RegisterQuery, db: Database, lang: str, send_mail:
         raise HTTPException(
             status_code=status.HTTP_409_CONFLICT, detail="Email already in use"
         )
-    else:
-        await db.execute(
-            "INSERT INTO users (email, username, password_hash) VALUE (:email, :user, :password)",
-            values=dict(
-                email=user.email,
-                user=user.username,
-                password=hash_password(password=user.password),
-            ),
-        )
-        if send_mail:
-            await send_confirm_email(user.username, db, lang)
-        return Response(status_code=status.HTTP_201_CREATED)
+
+
+async def insert_user(username: str, email: EmailStr, password_hash: Optional[bytes], db: Database):
+    await db.execute(
+        "INSERT INTO users (email, username, password_hash) VALUE (:email, :user, :password)",
+        values=dict(
+            email=email,
+            user=username,
+            password=password_hash,
+        ),
+    )
+
+
+async def register_user(user: RegisterQuery, db: Database, lang: str, send_mail: bool = True) -> Response:
+    await check_available(user.username, user.email, db)
+    await insert_user(user.username, user.email, await hash_password_async(password=user.password), db)
+    if send_mail:
+        await send_confirm_email(user.username, db, lang)
+    return Response(status_code=status.HTTP_201_CREATED)
+
+
+async def register_passwordless_user(username: str, email: EmailStr, db: Database):
+    """Registers a user logging in through email or OAuth
+
+    No password hash is stored, so password logins fail for the user until a password is set.
+    """
+    await check_available(username, email, db)
+    await insert_user(username, email, None, db)
 
 
 async def is_verified(username: str, db: Database) -> bool:
@@ -149,31 +186,22 @@ async def handle_login_token(username: str, token: str, db: Database, sm: Sessio
     raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Not found")
 
 
-async def try_create_user(email: EmailStr, db: Database, lang: str) -> str:
-    from secrets import token_urlsafe
-    async with httpx.AsyncClient(base_url=Config.namegen.url) as client:
-        for _ in range(0, 5):
-            try:
-                r = await client.get("/")
-                if r.status_code != 200:
-                    raise HTTPException(status_code=status.HTTP_503_SERVICE_UNAVAILABLE)
-                username = r.json()["value"]
-                await register_user(
-                    RegisterQuery(
-                        username=username,
-                        email=email,
-                        password=token_urlsafe(200),
-                    ),
-                    db,
-                    send_mail=False,
-                    lang=lang,
-                )
-                return username
-            except HTTPException as e:
-                if e.status_code == 409:
-                    pass
-                else:
-                    raise e
+async def try_create_user(email: EmailStr, db: Database) -> str:
+    url = f"{Config.namegen.url.rstrip('/')}/"
+    client = clients.get(url)
+    for _ in range(0, 5):
+        try:
+            r = await client.get(url)
+            if r.status_code != 200:
+                raise HTTPException(status_code=status.HTTP_503_SERVICE_UNAVAILABLE)
+            username = r.json()["value"]
+            await register_passwordless_user(username, email, db)
+            return username
+        except HTTPException as e:
+            if e.status_code == 409:
+                pass
+            else:
+                raise e
     raise HTTPException(status_code=status.HTTP_503_SERVICE_UNAVAILABLE)
 
 
@@ -190,7 +218,7 @@ async def email_login(email: EmailStr, db: Database, lang: str) -> Response:
     from .email import fetch_user_by_email, can_send_email, send_login_email
     username = await fetch_user_by_email(email, db)
     if username is None:
-        username = await try_create_user(email, db, lang)
+        username = await try_create_user(email, db)
     if await can_send_email(email, db):
         await send_login_email(username, db, lang)
         return Response(status_code=status.HTTP_204_NO_CONTENT)
@@ -208,6 +236,7 @@ async def password_login(login: LoginQuery, db: Database, sm: SessionManager) ->
 __all__ = [
     "confirm",
     "register_user",
+    "register_passwordless_user",
     "handle_login_token",
     "try_create_user",
     "email_login",
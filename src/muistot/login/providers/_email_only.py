@@ -24,7 +24,7 @@ router = APIRouter(tags=["Auth"])
 )
 @disallow_auth
 async def email_only_login(r: Request, email: EmailStr, db: Database = Depends(Databases.default)):
-    ratelimit_via_redis_host_and_key(r, email)
+    await ratelimit_via_redis_host_and_key(r, email)
     return await email_login(email, db, lang=extract_language(r, default_on_invalid=True))
 
 
@@ -34,6 +34,13 @@ class Mailer(metaclass=abc.ABCMeta):
         :return:            Result
         """
 
+    def close(self, timeout: Optional[float] = None):
+        """
+        Stops accepting mails
+
+        :param timeout:     Seconds to wait for queued mails to be sent, does not wait if None
+        """
+
 
 instance_lock = Lock()
 instance: Optional[Mailer] = None
@@ -59,4 +66,16 @@ def get_mailer() -> Mailer:
         return instance
 
 
-__all__ = ["get_mailer", "Mailer", "Result"]
+def register_mailer(app):
+    @app.on_event("shutdown")
+    def close_mailer():
+        """Close the mailer and wait for the queued mails
+        """
+        global instance
+        with instance_lock:
+            mailer, instance = instance, None
+        if mailer is not None:
+            mailer.close(timeout=Config.mailer.close_timeout_seconds)
+
+
+__all__ = ["get_mailer", "register_mailer", "Mailer", "Result"]
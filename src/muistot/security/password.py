@@ -1,12 +1,24 @@
+import asyncio
+import functools
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Optional, Callable, TypeVar, Tuple
+
+from fastapi import HTTPException, status
 from passlib.context import CryptContext
 
 from ..config import Config
 from ..logging import log
 
+T = TypeVar("T")
+
 crypto_context = CryptContext(
     schemes=["bcrypt"],
     deprecated="auto",
     bcrypt__default_rounds=Config.security.bcrypt_cost,
+    # Hashes with any other cost are rehashed on login
+    bcrypt__min_rounds=Config.security.bcrypt_cost,
+    bcrypt__max_rounds=Config.security.bcrypt_cost,
 )
 
 
@@ -18,8 +30,110 @@ def check_password(*, password_hash: bytes, password: str) -> bool:
         return False
 
 
+def verify_password(*, password_hash: bytes, password: str) -> Tuple[bool, Optional[str]]:
+    """Checks the password and rehashes it if the stored hash uses an outdated cost
+
+    Returns the result of the check and the new hash if the stored one should be replaced.
+    """
+    try:
+        return crypto_context.verify_and_update(password, password_hash)
+    except Exception as e:
+        log.warning("Failed password check with exception", exc_info=e)
+        return False, None
+
+
 def hash_password(*, password: str) -> bytes:
     return crypto_context.hash(password)
 
 
-__all__ = ["check_password", "hash_password"]
+class HashingPool:
+    """Runs password hashing outside the event loop
+
+    Hashing is done in a small thread pool, bcrypt releases the GIL while hashing.
+    At most `workers` hashes run at a time and at most `queue` calls may wait for a worker,
+    calls over that are rejected with 503 instead of piling up behind a burst of logins.
+
+    The time calls spend waiting for a worker is recorded for monitoring.
+    """
+    SLOW_WAIT = 1.0
+
+    def __init__(self, workers: int, queue: int):
+        self.workers = workers
+        self.queue = queue
+        self.pending = 0
+        self.calls = 0
+        self.rejected = 0
+        self.total_wait = 0.0
+        self.max_wait = 0.0
+        self._executor: Optional[ThreadPoolExecutor] = None
+
+    @property
+    def executor(self) -> ThreadPoolExecutor:
+        if self._executor is None:
+            self._executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="password-hashing")
+        return self._executor
+
+    def _record(self, submitted: float):
+        wait = time.perf_counter() - submitted
+        self.calls += 1
+        self.total_wait += wait
+        if wait > self.max_wait:
+            self.max_wait = wait
+        if wait > HashingPool.SLOW_WAIT:
+            log.warning(f"Password hashing waited {wait:.3f} seconds for a worker")
+
+    def _timed(self, submitted: float, f: Callable[..., T], **kwargs) -> T:
+        self._record(submitted)
+        return f(**kwargs)
+
+    async def run(self, f: Callable[..., T], **kwargs) -> T:
+        if self.pending >= self.workers + self.queue:
+            self.rejected += 1
+            raise HTTPException(status_code=status.HTTP_503_SERVICE_UNAVAILABLE, detail="Busy")
+        self.pending += 1
+        try:
+            return await asyncio.get_running_loop().run_in_executor(
+                self.executor,
+                functools.partial(self._timed, time.perf_counter(), f, **kwargs),
+            )
+        finally:
+            self.pending -= 1
+
+    def shutdown(self):
+        if self._executor is not None:
+            self._executor.shutdown(wait=False)
+            self._executor = None
+
+    def stats(self) -> str:
+        """Queue time statistics for logging
+        """
+        average = self.total_wait / self.calls if self.calls != 0 else 0.0
+        return (
+            f"hashes {self.calls} pending {self.pending} rejected {self.rejected}"
+            f" wait avg {average * 1000:.1f} ms max {self.max_wait * 1000:.1f} ms"
+        )
+
+
+hashing = HashingPool(Config.security.hash_workers, Config.security.hash_queue)
+
+
+async def verify_password_async(*, password_hash: bytes, password: str) -> Tuple[bool, Optional[str]]:
+    """verify_password in the hashing pool
+    """
+    return await hashing.run(verify_password, password_hash=password_hash, password=password)
+
+
+async def hash_password_async(*, password: str) -> bytes:
+    """hash_password in the hashing pool
+    """
+    return await hashing.run(hash_password, password=password)
+
+
+__all__ = [
+    "check_password",
+    "hash_password",
+    "verify_password",
+    "hash_password_async",
+    "verify_password_async",
+    "hashing",
+]
@@ -9,7 +9,7 @@ import secrets
 from hashlib import sha256
 from typing import Optional, Dict, NoReturn, Union, List
 
-import redis
+from redis import asyncio as redis
 
 ALT = b":-"
 USER_PREFIX = "user:"
@@ -35,6 +35,8 @@ def decode(token: str) -> bytes:
 
 class SessionManager:
     """Manages Session in Redis
+
+    All connections are taken from a single shared connection pool.
     """
 
     redis: Optional[redis.Redis]
@@ -64,17 +66,17 @@ class SessionManager:
         """Connects the instance
         """
         if not self.connected:
-            self.redis = redis.from_url(self.url)
+            self.redis = redis.Redis(connection_pool=redis.ConnectionPool.from_url(self.url))
             self.connected = True
 
-    def disconnect(self) -> NoReturn:
+    async def disconnect(self) -> NoReturn:
         """Disconnect the instance
         """
         if self.redis is not None:
-            self.redis.close()
+            await self.redis.close(close_connection_pool=True)
         self.connected = False
 
-    def extend(self, value: Union[bytes, str]):
+    async def extend(self, value: Union[bytes, str]):
         """Extends a key in the Redis
 
         Parameters
@@ -84,11 +86,13 @@ class SessionManager:
         """
         self.connect()
         if self.lifetime is not None:
-            self.redis.expire(value, self.lifetime)
+            await self.redis.expire(value, self.lifetime)
 
-    def get_session(self, token: str) -> Session:
+    async def get_session(self, token: str) -> Session:
         """Fetches a session if one exists
 
+        The session is extended in the same round trip it is fetched in.
+
         Parameters
         ----------
         token
@@ -105,27 +109,30 @@ class SessionManager:
         """
         self.connect()
         token = decode(token)
-        self.extend(token)
-        data = self.redis.get(token)
+        if self.lifetime is not None:
+            async with self.redis.pipeline(transaction=False) as pipe:
+                data, _ = await pipe.get(token).expire(token, self.lifetime).execute()
+        else:
+            data = await self.redis.get(token)
         if data is not None:
             return Session(**json.loads(data))
         raise ValueError("Invalid Session")
 
-    def start_session(self, session: Session) -> str:
+    async def start_session(self, session: Session) -> str:
         """Returns a session id for given user and stores session data
         """
         self.connect()
-        self.clear_stale(session.user)
+        await self.clear_stale(session.user)
         while True:
             token = TOKEN_PREFIX + secrets.token_bytes(nbytes=self.bytes)
             token_hash = sha256(token).digest()
-            if not self.redis.exists(token_hash):
+            if not await self.redis.exists(token_hash):
                 break
-        self.redis.sadd(f"{USER_PREFIX}{session.user}", token_hash)
-        self.redis.set(token_hash, json.dumps(dataclasses.asdict(session)), ex=self.lifetime)
+        await self.redis.sadd(f"{USER_PREFIX}{session.user}", token_hash)
+        await self.redis.set(token_hash, json.dumps(dataclasses.asdict(session)), ex=self.lifetime)
         return encode(token)
 
-    def end_session(self, token: str) -> NoReturn:
+    async def end_session(self, token: str) -> NoReturn:
         """Ends a session
 
         Parameters
@@ -135,12 +142,12 @@ class SessionManager:
         """
         self.connect()
         token = decode(token)
-        data = self.redis.get(token)
-        self.redis.delete(token)
+        data = await self.redis.get(token)
+        await self.redis.delete(token)
         if data is not None:
-            self.redis.srem(f"{USER_PREFIX}{Session(**json.loads(data)).user}", token)
+            await self.redis.srem(f"{USER_PREFIX}{Session(**json.loads(data)).user}", token)
 
-    def clear_sessions(self, user: str) -> NoReturn:
+    async def clear_sessions(self, user: str) -> NoReturn:
         """Clears all sessions for a user
 
         Parameters
@@ -150,34 +157,34 @@ class SessionManager:
         """
         self.connect()
         key = f"{USER_PREFIX}{user}"
-        tokens = self.redis.smembers(key)
-        self.redis.delete(key)
+        tokens = await self.redis.smembers(key)
+        await self.redis.delete(key)
         for token in tokens:
-            self.redis.delete(token)
+            await self.redis.delete(token)
 
-    def clear_all_sessions(self) -> NoReturn:
+    async def clear_all_sessions(self) -> NoReturn:
         """Clears all sessions in the database
         """
         self.connect()
-        self.redis.flushdb()
+        await self.redis.flushdb()
 
-    def clear_stale(self, user: str):
+    async def clear_stale(self, user: str):
         """Clears all stale user sessions
         """
         self.connect()
         user_sessions = f"{USER_PREFIX}{user}"
-        for session in self.redis.smembers(user_sessions):
-            if not self.redis.exists(session):
-                self.redis.srem(user_sessions, session)
+        for session in await self.redis.smembers(user_sessions):
+            if not await self.redis.exists(session):
+                await self.redis.srem(user_sessions, session)
 
-    def get_sessions(self, user: str) -> List[Session]:
+    async def get_sessions(self, user: str) -> List[Session]:
         """Gets all open user sessions
         """
         self.connect()
-        self.clear_stale(user)
+        await self.clear_stale(user)
         out = list()
-        for session in self.redis.smembers(f"{USER_PREFIX}{user}"):
-            data = self.redis.get(session)
+        for session in await self.redis.smembers(f"{USER_PREFIX}{user}"):
+            data = await self.redis.get(session)
             if data:
                 out.append(Session(**json.loads(data)))
         return out
@@ -31,7 +31,7 @@ class SessionManagerMiddleware(AuthenticationBackend):
             if scheme.lower() != "bearer":
                 raise AuthenticationError() from ValueError("Wrong Scheme")
             try:
-                session = self.manager.get_session(credentials)
+                session = await self.manager.get_session(credentials)
                 user = User.from_cache(username=session.user, token=credentials)
                 session_data = session.data
                 if "projects" in session_data:
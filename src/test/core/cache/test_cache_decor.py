@@ -1,5 +1,8 @@
+import collections
+
 import pytest
-from muistot.cache.decorator import Cache, _index_of, SHIM_KEY, CachesMeta
+from pydantic import BaseModel
+from muistot.cache.decorator import Cache, _index_of, SHIM_KEY, CachesMeta, _evicting, _evicted
 
 
 class Mock:
@@ -12,9 +15,9 @@ class Mock:
 
 @pytest.fixture
 def evicting():
-    Cache._evicting = True
+    token = _evicting.set(True)
     yield
-    Cache._evicting = False
+    _evicting.reset(token)
 
 
 @pytest.fixture(autouse=True)
@@ -100,29 +103,31 @@ async def test_exclude_early_return_arg():
 
 
 @pytest.mark.anyio
-async def test_evict_loop_only_first():
-    # Evicting A should only evict B and eviction should not propagate
-    a = Cache("a", evicts={"b"})
-    b = Cache("b", evicts={"a", "c"})
-    c = Cache("c", evicts={"b"})
+async def test_evict_tags_and_always_evict():
+    # Evicting A should evict its tags and D which is always evicted
+    a = Cache("a")
+    b = Cache("b")
     d = Cache("d", always_evict=True)
 
-    evicted = [0]
-    evicted_c = [0]
+    evicted_a = [0]
+    evicted_b = [0]
     evicted_d = [0]
 
-    def eviction_proxy(*_):
-        evicted[0] += 1
+    async def eviction_proxy(*_):
+        evicted_a[0] += 1
 
-    def eviction_proxy_2(*_):
-        evicted_c[0] += 1
+    async def eviction_proxy_2(*_):
+        evicted_b[0] += 1
 
-    def eviction_proxy_3(*_):
+    async def eviction_proxy_3(*_):
         evicted_d[0] += 1
 
-    a._evict = lambda *_: None
-    b._evict = eviction_proxy
-    c._evict = eviction_proxy_2
+    async def no_eviction(*_):
+        pass
+
+    a._evict = no_eviction
+    a._evict_tags = eviction_proxy
+    b._evict = eviction_proxy_2
     d._evict = eviction_proxy_3
 
     @a.evict
@@ -130,8 +135,8 @@ async def test_evict_loop_only_first():
         return True
 
     assert await assertion(**{SHIM_KEY: Mock})
-    assert evicted[0] == 1
-    assert evicted_c[0] == 0
+    assert evicted_a[0] == 1
+    assert evicted_b[0] == 0
     assert evicted_d[0] == 1  # Always evict
 
 
@@ -187,16 +192,17 @@ async def test_cache_operate_yields_none(evicting):
     assert operator is None
 
 
-def test_operator_set_adds_key():
+@pytest.mark.anyio
+async def test_operator_set_adds_key():
     """Adds to set of all keys for clearing"""
 
     class MockRedis:
         ok = False
 
-        def set(self, *_, **__):
+        async def set(self, *_, **__):
             pass
 
-        def sadd(self, *_, **__):
+        async def sadd(self, *_, **__):
             MockRedis.ok = True
 
     class MockParent:
@@ -204,19 +210,20 @@ def test_operator_set_adds_key():
 
     op = Cache.Operator(MockParent, MockRedis())
 
-    op.set('a', data=b'1234')
+    await op.set('a', data=b'1234')
 
     assert MockRedis.ok
 
 
-def test_operator_get_returns_value():
+@pytest.mark.anyio
+async def test_operator_get_returns_value():
     """Just a sanity check for returning raw value"""
     flag = object()
 
     class MockRedis:
         ok = False
 
-        def get(self, *_, **__):
+        async def get(self, *_, **__):
             return flag
 
     class MockParent:
@@ -224,23 +231,28 @@ def test_operator_get_returns_value():
 
     op = Cache.Operator(MockParent, MockRedis())
 
-    assert op.get('a') is flag
+    assert await op.get('a') is flag
 
 
 @pytest.mark.anyio
 async def test_cache_evict_only_once():
-    a = Cache("a", evicts={"b"})
+    a = Cache("a")
     b = Cache("b", always_evict=True)
+    Cache._always_evict.append(b.name)
 
     assert b.name == "b"
 
     evict_count = [0]
 
-    def proxy(*_, **__):
-        Cache._evicted.add(b.name)
+    async def proxy(*_, **__):
+        _evicted.get().add(b.name)
         evict_count[0] += 1
 
-    a._evict = lambda *_, **__: None
+    async def no_eviction(*_, **__):
+        pass
+
+    a._evict = no_eviction
+    a._evict_tags = no_eviction
     b._evict = proxy
 
     @a.evict
@@ -248,4 +260,524 @@ async def test_cache_evict_only_once():
         return True
 
     assert await assertion(**{SHIM_KEY: Mock})
-    assert evict_count[0] == 1  # fails if b was evicted twice (From a and always)
+    assert evict_count[0] == 1  # fails if b was evicted twice (Listed twice in always)
+
+
+
+class AsyncRedis:
+    """In-memory stand-in for the used redis.asyncio commands"""
+
+    def __init__(self):
+        self.data = dict()
+        self.sets = collections.defaultdict(set)
+        self.evictions = 0
+
+    async def get(self, key):
+        return self.data.get(key, None)
+
+    async def set(self, key, value, nx=False, **_):
+        if nx and key in self.data:
+            return None
+        self.data[key] = value
+        return True
+
+    async def mget(self, *keys):
+        return [self.data.get(key, None) for key in keys]
+
+    async def sadd(self, name, *keys):
+        self.sets[name].update(keys)
+
+    async def expire(self, *_):
+        pass
+
+    async def exists(self, key):
+        return key in self.data
+
+    async def delete(self, key):
+        self.data.pop(key, None)
+
+    def pipeline(self, **_):
+        redis = self
+
+        class Pipeline:
+            def __init__(self):
+                self.commands = list()
+
+            async def __aenter__(self):
+                return self
+
+            async def __aexit__(self, *_):
+                pass
+
+            def __getattr__(self, item):
+                return lambda *args, **kwargs: self.commands.append(getattr(redis, item)(*args, **kwargs))
+
+            async def execute(self):
+                return [await c for c in self.commands]
+
+        return Pipeline()
+
+    def register_script(self, script):
+        from muistot.cache.decorator import RELEASE_SCRIPT
+
+        async def evict(keys):
+            self.evictions += 1
+            for k in set().union(*(self.sets.pop(k, set()) for k in keys)):
+                self.data.pop(k, None)
+
+        async def release(keys, args):
+            if self.data.get(keys[0], None) == args[0]:
+                self.data.pop(keys[0])
+
+        return release if script == RELEASE_SCRIPT else evict
+
+
+class Model(BaseModel):
+    a: int
+
+
+@pytest.mark.anyio
+async def test_get_from_cache_fills_once():
+    """Miss calls the function and stores the result, hit returns stored data"""
+    calls = [0]
+
+    async def f():
+        calls[0] += 1
+        return Model(a=1)
+
+    a = Cache("test")
+    r = AsyncRedis()
+    first = await a._get_from_cache(r, f, [], {}, a.store_prefix, "key", "f")
+    response = await a._get_from_cache(r, f, [], {}, a.store_prefix, "key", "f")
+    assert calls[0] == 1
+    assert first.body == response.body == Model(a=1).json().encode("utf-8")
+    assert first.headers["etag"] == response.headers["etag"]
+    assert len(r.data) == 2  # Value and ETag
+    assert len(r.sets) == 2  # Tagged to the root listing and subtree
+    assert a.metrics["miss"] == 1 and a.metrics["hit"] == 1
+
+
+@pytest.mark.anyio
+async def test_get_from_cache_single_flight():
+    """Concurrent misses on one key run the function once"""
+    import asyncio
+    calls = [0]
+
+    async def f():
+        calls[0] += 1
+        await asyncio.sleep(0.05)
+        return Model(a=1)
+
+    a = Cache("test")
+    r = AsyncRedis()
+    responses = await asyncio.gather(*(
+        a._get_from_cache(r, f, [], {}, a.store_prefix, "key", "f") for _ in range(10)
+    ))
+    assert calls[0] == 1
+    assert a.metrics["coalesced"] == 9
+    assert all(o.body == Model(a=1).json().encode("utf-8") for o in responses[1:])
+    assert len(a.inflight) == 0
+
+
+@pytest.mark.anyio
+async def test_get_from_cache_single_flight_error():
+    """Waiters get the error of the filling coroutine"""
+    import asyncio
+    from fastapi import HTTPException
+
+    async def f():
+        await asyncio.sleep(0.05)
+        raise HTTPException(status_code=404)
+
+    a = Cache("test")
+    r = AsyncRedis()
+    results = await asyncio.gather(
+        *(a._get_from_cache(r, f, [], {}, a.store_prefix, "key", "f") for _ in range(3)),
+        return_exceptions=True
+    )
+    assert all(isinstance(o, HTTPException) for o in results)
+    assert len(r.data) == 0
+    assert len(a.inflight) == 0
+
+
+@pytest.mark.anyio
+async def test_get_from_cache_lease_waits(monkeypatch):
+    """Another worker holding the lease fills the key"""
+    import asyncio
+    from muistot.cache import decorator
+
+    monkeypatch.setattr(decorator, "LEASE", True)
+    monkeypatch.setattr(decorator, "LEASE_POLL", 0.01)
+
+    async def f():
+        raise AssertionError("Lease holder fills the key")
+
+    a = Cache("test")
+    r = AsyncRedis()
+    key = f"{a.store_prefix}key:".encode("ascii") + decorator.shash(["f"])
+    await r.set(key + b":lease", b"")
+
+    async def other_worker():
+        await asyncio.sleep(0.05)
+        await r.set(key, Model(a=2).json())
+
+    response, _ = await asyncio.gather(
+        a._get_from_cache(r, f, [], {}, a.store_prefix, "key", "f"),
+        other_worker()
+    )
+    assert response.body == Model(a=2).json().encode("utf-8")
+    assert a.metrics["coalesced"] == 1
+
+
+@pytest.mark.anyio
+async def test_get_from_cache_lease_released(monkeypatch):
+    from muistot.cache import decorator
+
+    monkeypatch.setattr(decorator, "LEASE", True)
+
+    async def f():
+        return Model(a=1)
+
+    a = Cache("test")
+    r = AsyncRedis()
+    await a._get_from_cache(r, f, [], {}, a.store_prefix, "key", "f")
+    assert len(r.data) == 2  # Only the value and ETag, lease deleted
+
+
+@pytest.mark.anyio
+async def test_get_from_cache_expired_lease_kept(monkeypatch):
+    """A fill outliving its lease does not release the lease of the next holder"""
+    from muistot.cache import decorator
+
+    monkeypatch.setattr(decorator, "LEASE", True)
+
+    a = Cache("test")
+    r = AsyncRedis()
+    lease = f"{a.store_prefix}key:".encode("ascii") + decorator.shash(["f"]) + b":lease"
+
+    async def f():
+        r.data[lease] = b"other"  # Expired and taken over during the fill
+        return Model(a=1)
+
+    await a._get_from_cache(r, f, [], {}, a.store_prefix, "key", "f")
+    assert r.data[lease] == b"other"
+
+
+def test_cache_stats():
+    a = Cache("a")
+    Cache("b")
+    a.metrics["hit"] += 2
+    assert Cache.stats() == "a hit 2 miss 0 coalesced 0, b hit 0 miss 0 coalesced 0"
+
+
+def test_tag_path():
+    from muistot.cache.decorator import _tag_lookup, _tag_path
+
+    async def f(project, site, memory=None, include_comments=False):
+        pass
+
+    lookup = _tag_lookup(f)
+    assert _tag_path(lookup, ["a"], dict(site="b")) == ("a", "b")
+    assert _tag_path(lookup, ["a", "b", 1], dict()) == ("a", "b", 1)
+    assert _tag_path(lookup, ["a", "b"], dict(memory=None)) == ("a", "b")
+    assert _tag_path(lookup, [], dict(site="b")) == ()  # Missing parent stops the path
+
+
+@pytest.mark.anyio
+async def test_evict_tags_only_affected():
+    """Mutating a memory only evicts its subtree and parent listings"""
+    projects = Cache("projects")
+    sites = Cache("sites")
+    memories = Cache("memories")
+    r = AsyncRedis()
+
+    def entity(name):
+        async def f():
+            return Model(a=1)
+
+        f.__name__ = name
+        return f
+
+    entries = {
+        "projects": (projects, ()),
+        "project": (projects, ("p",)),
+        "sites": (sites, ("p",)),
+        "site": (sites, ("p", "s")),
+        "other_site": (sites, ("p", "o")),
+        "memories": (memories, ("p", "s")),
+        "memory": (memories, ("p", "s", 1)),
+        "other_memory": (memories, ("p", "s", 2)),
+        "other_site_memory": (memories, ("p", "o", 1)),
+    }
+    for name, (cache, tags) in entries.items():
+        await cache._get_from_cache(r, entity(name), [], {}, cache.store_prefix, "args", name, tags=tags)
+    assert len(r.data) == 2 * len(entries)  # Values and ETags
+
+    def cached(name):
+        from muistot.cache.decorator import shash
+        cache, _ = entries[name]
+        return f"{cache.store_prefix}args:".encode("ascii") + shash([name]) in r.data
+
+    await memories._evict_tags(r, ("p", "s", 1))
+    assert r.evictions == 1
+    assert {n for n in entries if not cached(n)} == {"projects", "project", "sites", "site", "memories", "memory"}
+
+    # Creating a memory on the other site evicts only the listings and counts it changes
+    await memories._evict_tags(r, ("p", "o"))
+    assert {n for n in entries if cached(n)} == {"other_memory", "other_site_memory"}
+
+
+def test_visibility_classes():
+    from muistot.cache.decorator import _visibility
+    from muistot.security import User, scopes
+
+    anonymous = User.null()
+    user = User(username="a", scopes={scopes.AUTHENTICATED})
+    other = User(username="b", scopes={scopes.AUTHENTICATED, "some-scope"})
+    admin = User(username="c", scopes={scopes.AUTHENTICATED, scopes.ADMIN}, admin_projects={"p"})
+    superuser = User(username="d", scopes={scopes.AUTHENTICATED, scopes.SUPERUSER})
+
+    assert _visibility(anonymous, "p") == (scopes.UNAUTHENTICATED,)
+    assert _visibility(user, "p") == _visibility(other, "p") == (scopes.AUTHENTICATED,)
+    assert _visibility(admin, "p") == (scopes.ADMIN,)
+    assert _visibility(admin, "o") == (scopes.AUTHENTICATED,)  # Admin of another project
+    assert _visibility(admin, None) == (scopes.ADMIN, "p")  # Listings show administered projects
+    assert _visibility(superuser, "p") == _visibility(superuser, None) == (scopes.SUPERUSER,)
+
+
+def test_key_scope_language():
+    from headers import ACCEPT_LANGUAGE
+    from muistot.cache.decorator import _key_scope
+    from muistot.security import User
+
+    class Request:
+        method = "GET"
+        user = User.null()
+
+        def __init__(self, lang):
+            self.headers = {ACCEPT_LANGUAGE: lang}
+
+    assert _key_scope(Request("fi"), ()) != _key_scope(Request("en"), ())
+    assert _key_scope(Request("en-US,en"), ("p",)) == _key_scope(Request("en"), ("p",))
+    assert _key_scope(Request("xx"), ()) is None
+
+
+@pytest.mark.anyio
+async def test_bad_language_bypasses_cache():
+    from headers import ACCEPT_LANGUAGE
+    from muistot.security import User
+
+    class BadLanguage:
+        method = "GET"
+        headers = {ACCEPT_LANGUAGE: "xx"}
+        user = User.null()
+
+        class state:
+            class cache:
+                redis = None
+
+    a = Cache("test")
+
+    @a.args("b")
+    async def assertion(b=1):
+        return True
+
+    # this will raise if it doesn't bypass
+    assert await assertion(**{SHIM_KEY: BadLanguage})
+
+
+@pytest.mark.anyio
+async def test_get_from_cache_not_modified():
+    """Matching If-None-Match is answered without the body or calling the function"""
+    calls = [0]
+
+    async def f():
+        calls[0] += 1
+        return Model(a=1)
+
+    a = Cache("test")
+    r = AsyncRedis()
+    etag = (await a._get_from_cache(r, f, [], {}, a.store_prefix, "key", "f")).headers["etag"]
+
+    class NoBody(AsyncRedis):
+        async def mget(self, *keys):
+            raise AssertionError("Body fetched")
+
+    r.__class__ = NoBody
+    for header in [etag, f"W/{etag}", f'"other", {etag}', "*"]:
+        response = await a._get_from_cache(r, f, [], {}, a.store_prefix, "key", "f", if_none_match=header)
+        assert response.status_code == 304
+        assert response.headers["etag"] == etag
+        assert response.body == b""
+    assert calls[0] == 1
+
+
+@pytest.mark.anyio
+async def test_get_from_cache_modified():
+    async def f():
+        return Model(a=1)
+
+    a = Cache("test")
+    r = AsyncRedis()
+    await a._get_from_cache(r, f, [], {}, a.store_prefix, "key", "f")
+    response = await a._get_from_cache(r, f, [], {}, a.store_prefix, "key", "f", if_none_match='"other"')
+    assert response.status_code == 200
+    assert response.body == Model(a=1).json().encode("utf-8")
+    assert "no-cache" in response.headers["cache-control"]
+
+
+@pytest.mark.anyio
+async def test_evicting_is_request_scoped():
+    """Requests running concurrently with an eviction keep using the cache"""
+    import asyncio
+    a = Cache("a")
+    evicting = asyncio.Event()
+    done = asyncio.Event()
+
+    async def evict_tags(*_):
+        evicting.set()
+        await done.wait()
+
+    a._evict_tags = evict_tags
+
+    @a.evict
+    async def assertion():
+        return True
+
+    async def other_request():
+        await evicting.wait()
+        try:
+            return [o async for o in a.operate(Mock)][0]
+        finally:
+            done.set()
+
+    result, operator = await asyncio.gather(assertion(**{SHIM_KEY: Mock}), other_request())
+    assert result
+    assert isinstance(operator, a.Operator)
+
+
+@pytest.mark.anyio
+async def test_cached_endpoint_not_modified():
+    """A cache hit with a matching If-None-Match answers 304 from the decorated endpoint"""
+    from headers import ACCEPT_LANGUAGE, IF_NONE_MATCH
+    from muistot.security import User
+
+    calls = [0]
+    redis = AsyncRedis()
+
+    class Request:
+        method = "GET"
+        user = User.null()
+
+        class state:
+            class cache:
+                pass
+
+        def __init__(self, **headers):
+            self.headers = {ACCEPT_LANGUAGE: "en", **headers}
+
+    Request.state.cache.redis = redis
+    a = Cache("test")
+
+    @a.args("b")
+    async def endpoint(b=1):
+        calls[0] += 1
+        return Model(a=b)
+
+    response = await endpoint(**{SHIM_KEY: Request()})
+    assert response.status_code == 200
+    response = await endpoint(**{SHIM_KEY: Request(**{IF_NONE_MATCH: response.headers["etag"]})})
+    assert response.status_code == 304
+    assert response.body == b""
+    assert calls[0] == 1
+
+
+@pytest.mark.anyio
+async def test_evict_again_after_commit():
+    from starlette.datastructures import State
+    from muistot.database.store import _run_after_commit
+
+    a = Cache("a")
+    evicted = list()
+
+    async def evict_tags(_, path):
+        evicted.append((path, _evicting.get()))
+
+    a._evict_tags = evict_tags
+
+    class Request:
+        state = State()
+
+    Request.state.cache = Mock.state.cache
+
+    @a.evict
+    async def assertion(project):
+        return True
+
+    assert await assertion("p", **{SHIM_KEY: Request})
+    assert evicted == [(("p",), True)]
+    await _run_after_commit(Request)
+    assert evicted == [(("p",), True), (("p",), True)]
+    assert not _evicting.get()
+
+
+@pytest.mark.anyio
+async def test_evict_again_after_replica_lag(monkeypatch):
+    import asyncio
+    from starlette.datastructures import State
+    from muistot.cache import decorator
+    from muistot.database.store import _run_after_commit
+
+    monkeypatch.setattr(decorator, "REPLICA_LAG", 0.01)
+    a = Cache("a")
+    evicted = list()
+
+    async def evict_tags(_, path):
+        evicted.append(path)
+
+    a._evict_tags = evict_tags
+
+    class Request:
+        state = State()
+
+    Request.state.cache = Mock.state.cache
+
+    @a.evict
+    async def assertion(project):
+        return True
+
+    assert await assertion("p", **{SHIM_KEY: Request})
+    await _run_after_commit(Request)
+    assert evicted == [("p",), ("p",)]
+    await asyncio.gather(*Cache._delayed)
+    assert evicted == [("p",), ("p",), ("p",)]
+    assert len(Cache._delayed) == 0
+
+
+@pytest.mark.anyio
+async def test_sticky_user_bypasses_cache():
+    from fastapi import Depends
+    from muistot.database import ReadDependency
+
+    class Sticky(ReadDependency):
+
+        def __init__(self):
+            super().__init__(None)
+
+        async def sticky(self, r):
+            return True
+
+    a = Cache("test")
+    read = Depends(Sticky())
+
+    @a.key("c")
+    async def by_key(db=read):
+        return True
+
+    @a.args("b")
+    async def by_args(b=1, db=read):
+        return True
+
+    # these will raise if they don't bypass
+    assert await by_key(**{SHIM_KEY: Mock})
+    assert await by_args(**{SHIM_KEY: Mock})
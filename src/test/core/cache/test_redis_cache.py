@@ -5,7 +5,7 @@ from muistot.cache import register_redis_cache as use_redis_cache
 
 
 @pytest.fixture
-def redis():
+async def redis():
     class State:
         FastStorage = None
 
@@ -25,28 +25,31 @@ def redis():
     assert i is not None
     i.connect()
     yield i
-    i.disconnect()
+    await i.disconnect()
     del i
 
 
-def test_get_set_custom(redis):
-    redis.set("a", "", ttl=2)
+@pytest.mark.anyio
+async def test_get_set_custom(redis):
+    await redis.set("a", "", ttl=2)
     time.sleep(3)
-    assert redis.get("a") is None
+    assert await redis.get("a") is None
 
 
-def test_get_set_custom_with_prefix(redis):
-    redis.set("a", "c", prefix="b")
-    assert redis.get("a") is None
-    assert redis.get("a", prefix="b") == "c".encode("utf-8")
+@pytest.mark.anyio
+async def test_get_set_custom_with_prefix(redis):
+    await redis.set("a", "c", prefix="b")
+    assert await redis.get("a") is None
+    assert await redis.get("a", prefix="b") == "c".encode("utf-8")
 
 
-def test_set_delete_custom(redis):
-    redis.set("a", "c", prefix="b")
-    redis.delete("a")
-    assert redis.get("a", prefix="b") == "c".encode("utf-8")
-    redis.delete("a", prefix="b")
-    assert redis.get("a", prefix="b") is None
+@pytest.mark.anyio
+async def test_set_delete_custom(redis):
+    await redis.set("a", "c", prefix="b")
+    await redis.delete("a")
+    assert await redis.get("a", prefix="b") == "c".encode("utf-8")
+    await redis.delete("a", prefix="b")
+    assert await redis.get("a", prefix="b") is None
 
 
 def test_connect_on_startup():
@@ -60,11 +63,71 @@ def test_connect_on_startup():
     assert i.redis is None
 
 
-def test_disconnect_without_connect_ok():
+@pytest.mark.anyio
+async def test_disconnect_without_connect_ok():
     from fastapi import FastAPI
     app = FastAPI()
     use_redis_cache(app)
     i = app.state.FastStorage
     assert i.redis is None
-    i.disconnect()
+    await i.disconnect()
     assert i.redis is None
+
+
+@pytest.mark.anyio
+async def test_lease_release_compares_token(redis):
+    from muistot.cache.decorator import RELEASE_SCRIPT
+    r = redis.redis
+    release = r.register_script(RELEASE_SCRIPT)
+    await r.set(b"test-lease", b"a")
+    assert await release(keys=[b"test-lease"], args=[b"b"]) == 0
+    assert await r.get(b"test-lease") == b"a"
+    assert await release(keys=[b"test-lease"], args=[b"a"]) == 1
+    assert await r.get(b"test-lease") is None
+
+
+@pytest.mark.anyio
+async def test_evict_script_deletes_tagged_keys(redis):
+    from muistot.cache.decorator import EVICT_SCRIPT
+    r = redis.redis
+    members = [f"test-evict:{i}".encode("ascii") for i in range(2500)]  # Over one delete batch
+    await r.mset({k: b"1" for k in members})
+    await r.sadd(b"test-evict-tag:a", *members[:2000])
+    await r.sadd(b"test-evict-tag:b", *members[1000:])
+    await r.set(b"test-evict:other", b"1")
+
+    assert await r.register_script(EVICT_SCRIPT)(keys=[b"test-evict-tag:a", b"test-evict-tag:b"]) == len(members)
+    assert await r.exists(*members) == 0
+    assert await r.exists(b"test-evict-tag:a", b"test-evict-tag:b") == 0
+    assert await r.get(b"test-evict:other") == b"1"
+    await r.delete(b"test-evict:other")
+
+
+@pytest.mark.anyio
+async def test_evict_tags_through_script(redis):
+    from pydantic import BaseModel
+    from muistot.cache.decorator import Cache
+
+    class Model(BaseModel):
+        a: int
+
+    async def f():
+        return Model(a=1)
+
+    r = redis.redis
+    sites = Cache("sites")
+    memories = Cache("memories")
+    await sites._get_from_cache(r, f, [], {}, sites.store_prefix, "args", "test-site", tags=("test", "s"))
+    await sites._get_from_cache(r, f, [], {}, sites.store_prefix, "args", "test-other", tags=("test", "o"))
+    await memories._get_from_cache(r, f, [], {}, memories.store_prefix, "args", "test-memory", tags=("test", "s", 1))
+
+    def keys(cache, name):
+        from muistot.cache.decorator import shash
+        key = f"{cache.store_prefix}args:".encode("ascii") + shash([name])
+        return key, key + b":etag"
+
+    await sites._evict_tags(r, ("test", "s"))
+    assert await r.exists(*keys(sites, "test-site"), *keys(memories, "test-memory")) == 0
+    assert await r.exists(*keys(sites, "test-other")) == 2
+    await sites._evict_tags(r, ("test", "o"))
+    assert await r.exists(*keys(sites, "test-other")) == 0
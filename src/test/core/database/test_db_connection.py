@@ -15,3 +15,30 @@ async def test_throws_on_not_connected():
     with pytest.raises(OperationalError):
         async with d():
             pass
+
+
+@pytest.mark.anyio
+async def test_stream_closes_result():
+    from muistot.database import Database
+
+    class MockResult:
+        closed = False
+
+        def keys(self):
+            return ["id"]
+
+        async def __aiter__(self):
+            for i in range(0, 3):
+                yield i,
+
+        async def close(self):
+            MockResult.closed = True
+
+    class MockConnection:
+        async def stream(self, query, parameters=None):
+            assert parameters == dict(a=1)
+            return MockResult()
+
+    db = Database(MockConnection())
+    assert [r["id"] async for r in db.stream("SELECT", values=dict(a=1))] == [0, 1, 2]
+    assert MockResult.closed
@@ -66,3 +66,37 @@ async def test_rollback_works(rb):
         pass
 
     assert called == {'rollback' if rb else 'commit'}, 'Failed to call correct method'
+
+
+@pytest.mark.anyio
+async def test_read_only_skips_transaction():
+    called = list()
+
+    class MockConfig:
+        rollback: bool = False
+
+    class MockEngine:
+
+        async def __aenter__(self):
+            return self
+
+        async def __aexit__(self, exc_type, exc_val, exc_tb):
+            called.append('close')
+
+        def connect(self):
+            return self
+
+        def begin(self):
+            called.append('begin')
+            return self
+
+        async def commit(self):
+            called.append('commit')
+
+    d = DatabaseProvider(MockConfig())
+    d.engine = MockEngine()
+
+    async with d(read_only=True):
+        pass
+
+    assert called == ['close']
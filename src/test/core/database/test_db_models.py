@@ -53,3 +53,31 @@ def test_str_repr():
 def test_format_string():
     data = ResultSet(dict(a=1, b=2, c="2").items())
     assert "%(a)s %(b)s %(c)s" % data == "1 2 2"
+
+
+def test_dict_methods():
+    expected = dict(a=1, b="b", c=False, d=None)
+    data = ResultSet(expected.items())
+    assert list(expected.items()) == list(data.items())
+    assert list(expected.values()) == list(data.values())
+    assert data.get("b") == "b"
+    assert data.get("e", 5) == 5
+    assert data.count(1) == 1
+    assert list(reversed(data)) == list(reversed(expected.values()))
+    assert len(data) == 4
+
+
+def test_from_row_shares_columns():
+    columns = dict(a=0, b=1)
+    first = ResultSet.from_row(columns, (1, 2))
+    second = ResultSet.from_row(columns, (3, 4))
+    assert first._columns is second._columns
+    assert {**first} == dict(a=1, b=2)
+    assert {**second} == dict(a=3, b=4)
+    assert second["b"] == 4
+    assert second[0] == 3
+
+
+def test_no_instance_dict():
+    data = ResultSet(dict(a=1).items())
+    assert not hasattr(data, "__dict__")
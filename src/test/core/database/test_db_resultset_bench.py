@@ -0,0 +1,99 @@
+"""Compares the slotted ResultSet against the previous dict and list backed version
+
+Run directly for timings:
+
+    python src/test/core/database/test_db_resultset_bench.py
+"""
+import timeit
+import tracemalloc
+from typing import Tuple, Iterable, Any, Union
+
+from muistot.database.resultset import ResultSet
+
+COLUMNS = [f"column_{i}" for i in range(0, 12)]
+ROWS = [tuple(range(i, i + len(COLUMNS))) for i in range(0, 10_000)]
+
+
+class LegacyResultSet:
+    """The ResultSet implementation before rows shared their columns
+    """
+
+    def __init__(self, items: Iterable[Tuple[str, Any]]):
+        super(LegacyResultSet, self).__init__()
+        self.dict = dict()
+        self.list = list()
+        for k, v in items:
+            self.dict[k] = v
+            self.list.append(v)
+        # Dict
+        self.values = self.dict.values
+        self.items = self.dict.items
+        self.get = self.dict.get
+        # List
+        self.count = self.list.count
+        self.__reversed__ = self.list.__reversed__
+
+    def __getitem__(self, item: Union[str, int]):
+        if isinstance(item, int):
+            return self.list[item]
+        else:
+            return self.dict[item]
+
+    def __iter__(self):
+        return self.list.__iter__()
+
+    def __len__(self) -> int:
+        return self.dict.__len__()
+
+    def __contains__(self, key: str):
+        return key in self.dict
+
+    def keys(self):
+        return self.dict.keys()
+
+
+def build_legacy():
+    return [LegacyResultSet(zip(COLUMNS, row)) for row in ROWS]
+
+
+def build_current():
+    columns = {k: i for i, k in enumerate(COLUMNS)}
+    return [ResultSet.from_row(columns, row) for row in ROWS]
+
+
+def consume(rows):
+    return sum(r["column_3"] + r[5] for r in rows) + sum(len({**r}) for r in rows)
+
+
+def allocated(builder) -> int:
+    tracemalloc.start()
+    try:
+        rows = builder()
+        size, _ = tracemalloc.get_traced_memory()
+        del rows
+        return size
+    finally:
+        tracemalloc.stop()
+
+
+def test_same_behaviour():
+    for legacy, current in zip(build_legacy()[:100], build_current()[:100]):
+        assert [*legacy] == [*current]
+        assert {**legacy} == {**current}
+        assert legacy["column_7"] == current["column_7"]
+        assert legacy[-1] == current[-1]
+        assert len(legacy) == len(current)
+        assert ("column_1" in legacy) == ("column_1" in current)
+    assert consume(build_legacy()) == consume(build_current())
+
+
+def test_uses_less_memory():
+    assert allocated(build_current) < allocated(build_legacy) / 4
+
+
+if __name__ == '__main__':
+    for name, builder in (("legacy", build_legacy), ("current", build_current)):
+        build = min(timeit.repeat(builder, number=10, repeat=3)) / 10
+        rows = builder()
+        use = min(timeit.repeat(lambda: consume(rows), number=10, repeat=3)) / 10
+        print(f"{name:>8}: build {build * 1000:.2f} ms, consume {use * 1000:.2f} ms, {allocated(builder)} bytes")
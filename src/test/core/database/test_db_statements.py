@@ -0,0 +1,81 @@
+import pytest
+from muistot.database import Database
+from muistot.database.statements import StatementCache
+
+
+def test_reuses_clause():
+    cache = StatementCache()
+    first = cache("SELECT :a")
+    assert cache("SELECT :a") is first
+    assert cache.hits == 1
+    assert cache.misses == 1
+    assert "a" in first._bindparams
+
+
+def test_evicts_least_recently_used():
+    cache = StatementCache(size=2)
+    a = cache("SELECT 1")
+    cache("SELECT 2")
+    cache("SELECT 1")
+    cache("SELECT 3")
+    assert len(cache) == 2
+    assert cache("SELECT 1") is a
+    assert cache.misses == 3
+    cache("SELECT 2")
+    assert cache.misses == 4
+
+
+def test_clear():
+    cache = StatementCache()
+    cache("SELECT 1")
+    cache("SELECT 1")
+    cache.clear()
+    assert len(cache) == 0
+    assert cache.hits == 0
+    assert cache.misses == 0
+    assert "hits 0 misses 0" in cache.stats()
+
+
+@pytest.mark.anyio
+async def test_track_is_request_scoped():
+    import asyncio
+    cache = StatementCache()
+
+    async def query():
+        cache("SELECT 1")
+        await asyncio.sleep(0)
+
+    async def request(n):
+        with cache.track() as counts:
+            for _ in range(n):
+                await query()
+            await asyncio.create_task(query())  # Like the endpoint task of a middleware
+        return counts.hits + counts.misses
+
+    assert await asyncio.gather(request(2), request(5)) == [3, 6]
+    assert cache.hits + cache.misses == 9
+
+
+@pytest.mark.anyio
+async def test_connection_uses_cache():
+    from muistot.database import statements
+
+    seen = list()
+
+    class MockResult:
+
+        def fetchone(self):
+            return 1,
+
+    class MockConnection:
+        async def execute(self, query, parameters=None):
+            seen.append(query)
+            return MockResult()
+
+    db = Database(MockConnection())
+    sql = "SELECT 'test_connection_uses_cache'"
+    hits = statements.hits
+    assert await db.fetch_val(sql) == 1
+    assert await db.fetch_val(sql) == 1
+    assert seen[0] is seen[1]
+    assert statements.hits == hits + 1
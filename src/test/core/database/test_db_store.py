@@ -1,6 +1,6 @@
 import pytest
 from muistot.config import Config
-from muistot.database.store import _Databases, DatabaseDependency, register_databases
+from muistot.database.store import _Databases, DatabaseDependency, register_databases, STICKY
 
 
 def test_databases():
@@ -140,3 +140,160 @@ def test_connect_disconnect_calls_raise_no_effect(caplog):
     assert len(calls) == 0
     assert "Failed to connect to database: a" in caplog.text
     assert "Failed to disconnect from database: a" in caplog.text
+
+
+class _MockStorage:
+
+    def __init__(self):
+        self.data = dict()
+
+    async def set(self, key, value, prefix="custom:", ttl=None):
+        self.data[f"{prefix}{key}"] = ttl
+
+    async def exists(self, *keys, prefix="custom:"):
+        return any(f"{prefix}{key}" in self.data for key in keys)
+
+
+class _MockUser:
+
+    def __init__(self, identity):
+        self.identity = identity
+        self.is_authenticated = identity is not None
+
+
+def _request(method="GET", user=None, cache=None):
+    from fastapi import Request
+    r = Request(dict(type="http", method=method, headers=[], user=_MockUser(user)))
+    r.state.cache = cache
+    return r
+
+
+def _named_database(name):
+    import contextlib
+
+    class Mock:
+        is_connected = True
+
+        @contextlib.asynccontextmanager
+        async def __call__(self, read_only=False):
+            yield f"{name}-read" if read_only else name
+
+    return DatabaseDependency(name, Mock())
+
+
+@pytest.mark.anyio
+async def test_read_without_replica_uses_primary():
+    import contextlib
+    from muistot.database.store import ReadDependency
+
+    primary = _named_database("primary")
+    dep = ReadDependency(primary)
+    async with contextlib.asynccontextmanager(dep)(_request()) as db:
+        assert db == "primary-read"
+    assert dep.name == "primary"
+
+
+@pytest.mark.anyio
+async def test_read_routes_to_replica_until_written():
+    import contextlib
+    from muistot.database.store import ReadDependency
+
+    cache = _MockStorage()
+    primary = _named_database("primary")
+    primary.sticky = 5
+    dep = ReadDependency(primary, _named_database("replica"))
+
+    async with contextlib.asynccontextmanager(dep)(_request(user="a", cache=cache)) as db:
+        assert db == "replica-read"
+
+    async with contextlib.asynccontextmanager(primary)(_request("GET", user="a", cache=cache)) as db:
+        assert db == "primary"
+    assert len(cache.data) == 0, "Reads should not be sticky"
+
+    async with contextlib.asynccontextmanager(primary)(_request("POST", user="a", cache=cache)) as db:
+        assert db == "primary"
+    assert list(cache.data.values()) == [5]
+
+    async with contextlib.asynccontextmanager(dep)(_request(user="a", cache=cache)) as db:
+        assert db == "primary-read"
+    async with contextlib.asynccontextmanager(dep)(_request(user="b", cache=cache)) as db:
+        assert db == "replica-read"
+    async with contextlib.asynccontextmanager(dep)(_request(cache=cache)) as db:
+        assert db == "replica-read"
+
+
+@pytest.mark.anyio
+async def test_failed_write_is_not_sticky():
+    import contextlib
+
+    cache = _MockStorage()
+    primary = _named_database("primary")
+    primary.sticky = 5
+
+    with pytest.raises(ValueError):
+        async with contextlib.asynccontextmanager(primary)(_request("POST", user="a", cache=cache)):
+            raise ValueError()
+    assert len(cache.data) == 0
+
+
+@pytest.mark.anyio
+async def test_sticky():
+    from muistot.database import ReadDependency
+
+    cache = _MockStorage()
+    primary = _named_database("primary")
+    await cache.set("a", b"1", prefix=STICKY.format("primary"))
+    assert not await ReadDependency(primary).sticky(_request(user="a", cache=cache))
+    dep = ReadDependency(primary, _named_database("replica"))
+    assert await dep.sticky(_request(user="a", cache=cache))
+    assert not await dep.sticky(_request(user="b", cache=cache))
+    assert not await dep.sticky(_request(cache=cache))
+
+
+@pytest.mark.anyio
+async def test_after_commit():
+    import contextlib
+    from muistot.database import after_commit
+
+    calls = list()
+    primary = _named_database("primary")
+
+    async def hook():
+        calls.append(1)
+
+    async def failing_hook():
+        raise ValueError()
+
+    r = _request("POST", cache=_MockStorage())
+    async with contextlib.asynccontextmanager(primary)(r):
+        after_commit(r, failing_hook)
+        after_commit(r, hook)
+        assert len(calls) == 0
+    assert len(calls) == 1, "Failing hooks should not stop the others"
+
+    r = _request("POST", cache=_MockStorage())
+    with pytest.raises(ValueError):
+        async with contextlib.asynccontextmanager(primary)(r):
+            after_commit(r, hook)
+            raise ValueError()
+    assert len(calls) == 1, "Rolled back writes should not run hooks"
+
+
+def test_unknown_replica(monkeypatch):
+    from muistot.config.config import Database
+
+    monkeypatch.setitem(Config.database, "default", Database(replica="missing"))
+    with pytest.raises(ValueError):
+        _Databases()
+
+
+def test_replica_configured(monkeypatch):
+    from muistot.config.config import Database
+
+    monkeypatch.setitem(Config.database, "default", Database(replica="replica", sticky_seconds=3))
+    monkeypatch.setitem(Config.database, "replica", Database(host="replica"))
+    d = _Databases()
+    assert d.read.primary is d.default
+    assert d.read.replica is d.replica
+    assert d.default.sticky == 3
+    assert d.replica.sticky == 0
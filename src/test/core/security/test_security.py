@@ -132,3 +132,67 @@ async def test_disallow_auth():
         await disallow(**{REQUEST_HELPER: Mock})
 
     assert e.value.status_code == 403
+
+
+@pytest.mark.anyio
+async def test_hashing_runs_in_pool():
+    import threading
+    from muistot.security.password import HashingPool, verify_password_async, hash_password_async
+
+    pool = HashingPool(1, 0)
+    try:
+        assert await pool.run(threading.current_thread) is not threading.current_thread()
+        assert pool.calls == 1
+        assert "hashes 1 pending 0 rejected 0" in pool.stats()
+    finally:
+        pool.shutdown()
+
+    h = await hash_password_async(password="a")
+    assert await verify_password_async(password_hash=h, password="a") == (True, None)
+    assert await verify_password_async(password_hash=h, password="b") == (False, None)
+
+
+@pytest.mark.anyio
+async def test_hashing_pool_rejects_when_full():
+    import asyncio
+    import threading
+    from fastapi import HTTPException
+    from muistot.security.password import HashingPool
+
+    pool = HashingPool(1, 1)
+    release = threading.Event()
+    try:
+        running = [asyncio.create_task(pool.run(release.wait, timeout=5)) for _ in range(0, 2)]
+        await asyncio.sleep(0)
+        assert pool.pending == 2
+        with pytest.raises(HTTPException) as e:
+            await pool.run(release.wait)
+        assert e.value.status_code == 503
+        assert pool.rejected == 1
+        release.set()
+        assert await asyncio.gather(*running) == [True, True]
+        assert pool.pending == 0
+        assert pool.max_wait > 0
+    finally:
+        release.set()
+        pool.shutdown()
+
+
+@pytest.mark.parametrize("cost", [4, 6])
+def test_verify_password_rehashes_other_costs(cost):
+    from passlib.context import CryptContext
+    from muistot.security.password import verify_password, crypto_context
+
+    old = CryptContext(schemes=["bcrypt"], bcrypt__default_rounds=cost).hash("a")
+    current = crypto_context.hash("a")
+
+    valid, new_hash = verify_password(password_hash=old, password="a")
+    assert valid
+    assert new_hash is not None
+    assert check_password(password_hash=new_hash, password="a")
+    assert crypto_context.identify(new_hash) == "bcrypt"
+    assert not crypto_context.needs_update(new_hash)
+
+    assert verify_password(password_hash=current, password="a") == (True, None)
+    assert verify_password(password_hash=old, password="b") == (False, None)
+    assert verify_password(password_hash=None, password="b") == (False, None)
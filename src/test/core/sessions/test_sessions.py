@@ -25,13 +25,13 @@ class MockManager:
     def connect(self):
         pass
 
-    def disconnect(self):
+    async def disconnect(self):
         pass
 
-    def extend(self, value):
+    async def extend(self, value):
         pass
 
-    def get_session(self, token):
+    async def get_session(self, token):
         if token == "raise":
             raise ValueError()
         return Session(
@@ -41,16 +41,16 @@ class MockManager:
             ),
         )
 
-    def start_session(self, session):
+    async def start_session(self, session):
         pass
 
-    def end_session(self, token: str):
+    async def end_session(self, token: str):
         pass
 
-    def clear_sessions(self, user: str):
+    async def clear_sessions(self, user: str):
         pass
 
-    def clear_all_sessions(self):
+    async def clear_all_sessions(self):
         pass
 
 
@@ -128,7 +128,7 @@ def test_decode_not_ascii():
 async def test_manager_decode_data_correctness_missing():
     class MockManager2(MockManager):
 
-        def get_session(self, token):
+        async def get_session(self, token):
             if token == "raise":
                 raise ValueError()
             return Session(
@@ -143,7 +143,7 @@ async def test_manager_decode_data_correctness_missing():
 
     class MockManager3(MockManager):
 
-        def get_session(self, token):
+        async def get_session(self, token):
             if token == "raise":
                 raise ValueError()
             return Session(
@@ -6,7 +6,7 @@ from muistot.sessions.manager import SessionManager, Session, USER_PREFIX, TOKEN
 
 
 @pytest.fixture
-def mgr() -> SessionManager:
+async def mgr() -> SessionManager:
     class State:
         SessionManager = None
 
@@ -20,173 +20,242 @@ def mgr() -> SessionManager:
     manager: SessionManager = App.state.SessionManager
     manager.connect()
     yield manager
-    manager.disconnect()
+    await manager.disconnect()
     del manager
 
 
-def test_extend_nonexistent_noop(mgr):
-    mgr.extend("not-existing:dwadwawd")
-    mgr.extend(b"not-existing:dwadwawd")
+@pytest.mark.anyio
+async def test_extend_nonexistent_noop(mgr):
+    await mgr.extend("not-existing:dwadwawd")
+    await mgr.extend(b"not-existing:dwadwawd")
 
 
-def test_start_end_session(mgr):
-    token = mgr.start_session(Session(user="test", data=dict()))
+@pytest.mark.anyio
+async def test_start_end_session(mgr):
+    token = await mgr.start_session(Session(user="test", data=dict()))
 
-    mgr.end_session(token)
+    await mgr.end_session(token)
 
-    assert not mgr.redis.exists(TOKEN_PREFIX + decode(token))
-    assert len(mgr.redis.smembers(USER_PREFIX + "test")) == 0
-    assert len(mgr.get_sessions("test")) == 0
+    assert not await mgr.redis.exists(TOKEN_PREFIX + decode(token))
+    assert len(await mgr.redis.smembers(USER_PREFIX + "test")) == 0
+    assert len(await mgr.get_sessions("test")) == 0
 
 
-def test_cull_old(mgr):
-    mgr.redis.sadd(USER_PREFIX + "tc", b"1234")
-    mgr.clear_stale("tc")
-    assert len(mgr.redis.smembers(USER_PREFIX + "tc")) == 0
+@pytest.mark.anyio
+async def test_cull_old(mgr):
+    await mgr.redis.sadd(USER_PREFIX + "tc", b"1234")
+    await mgr.clear_stale("tc")
+    assert len(await mgr.redis.smembers(USER_PREFIX + "tc")) == 0
 
 
-def test_cull_on_load_all(mgr):
-    mgr.redis.sadd(USER_PREFIX + "tc2", b"1234")
-    assert len(mgr.get_sessions("tc2")) == 0
-    assert len(mgr.redis.smembers(USER_PREFIX + "test_cull_2")) == 0
+@pytest.mark.anyio
+async def test_cull_on_load_all(mgr):
+    await mgr.redis.sadd(USER_PREFIX + "tc2", b"1234")
+    assert len(await mgr.get_sessions("tc2")) == 0
+    assert len(await mgr.redis.smembers(USER_PREFIX + "test_cull_2")) == 0
 
 
-def test_cull_and_get_on_load_all(mgr):
-    mgr.redis.sadd(USER_PREFIX + "tc3", b"1234")
-    mgr.redis.sadd(USER_PREFIX + "tc3", TOKEN_PREFIX + b"12345")
-    mgr.redis.set(TOKEN_PREFIX + b"12345", json.dumps(dict(user="tc3", data=dict())))
+@pytest.mark.anyio
+async def test_cull_and_get_on_load_all(mgr):
+    await mgr.redis.sadd(USER_PREFIX + "tc3", b"1234")
+    await mgr.redis.sadd(USER_PREFIX + "tc3", TOKEN_PREFIX + b"12345")
+    await mgr.redis.set(TOKEN_PREFIX + b"12345", json.dumps(dict(user="tc3", data=dict())))
 
-    sessions = mgr.get_sessions("tc3")
+    sessions = await mgr.get_sessions("tc3")
 
     assert len(sessions) == 1
     assert sessions[0].user == "tc3" and len(sessions[0].data) == 0
-    assert len(mgr.redis.smembers(USER_PREFIX + "tc3")) == 1
+    assert len(await mgr.redis.smembers(USER_PREFIX + "tc3")) == 1
 
 
-def test_clear_all_user_sessions(mgr):
-    mgr.redis.sadd(USER_PREFIX + "ca", b"abc")
-    mgr.redis.sadd(USER_PREFIX + "ca", TOKEN_PREFIX + b"def")
-    mgr.redis.set(TOKEN_PREFIX + b"def", json.dumps(dict(user="ca", data=dict())))
+@pytest.mark.anyio
+async def test_clear_all_user_sessions(mgr):
+    await mgr.redis.sadd(USER_PREFIX + "ca", b"abc")
+    await mgr.redis.sadd(USER_PREFIX + "ca", TOKEN_PREFIX + b"def")
+    await mgr.redis.set(TOKEN_PREFIX + b"def", json.dumps(dict(user="ca", data=dict())))
 
-    mgr.clear_sessions("ca")
+    await mgr.clear_sessions("ca")
 
-    assert not mgr.redis.exists(TOKEN_PREFIX + b"abc")
-    assert not mgr.redis.exists(TOKEN_PREFIX + b"def")
-    assert len(mgr.redis.smembers(USER_PREFIX + "ca")) == 0
+    assert not await mgr.redis.exists(TOKEN_PREFIX + b"abc")
+    assert not await mgr.redis.exists(TOKEN_PREFIX + b"def")
+    assert len(await mgr.redis.smembers(USER_PREFIX + "ca")) == 0
 
 
-def test_clear_all_sessions(mgr):
-    mgr.redis.sadd(USER_PREFIX + "a", b"a")
-    mgr.redis.sadd(USER_PREFIX + "b", TOKEN_PREFIX + b"b")
-    mgr.redis.set(TOKEN_PREFIX + b"b", json.dumps(dict(user="b", data=dict())))
+@pytest.mark.anyio
+async def test_clear_all_sessions(mgr):
+    await mgr.redis.sadd(USER_PREFIX + "a", b"a")
+    await mgr.redis.sadd(USER_PREFIX + "b", TOKEN_PREFIX + b"b")
+    await mgr.redis.set(TOKEN_PREFIX + b"b", json.dumps(dict(user="b", data=dict())))
 
-    mgr.clear_all_sessions()
+    await mgr.clear_all_sessions()
 
-    assert not mgr.redis.exists(TOKEN_PREFIX + b"a")
-    assert not mgr.redis.exists(TOKEN_PREFIX + b"b")
-    assert len(mgr.redis.smembers(USER_PREFIX + "a")) == 0
-    assert len(mgr.redis.smembers(USER_PREFIX + "b")) == 0
+    assert not await mgr.redis.exists(TOKEN_PREFIX + b"a")
+    assert not await mgr.redis.exists(TOKEN_PREFIX + b"b")
+    assert len(await mgr.redis.smembers(USER_PREFIX + "a")) == 0
+    assert len(await mgr.redis.smembers(USER_PREFIX + "b")) == 0
 
 
-def test_get_session(mgr):
+@pytest.mark.anyio
+async def test_get_session(mgr):
     import hashlib
-    mgr.redis.sadd(USER_PREFIX + "gs", hashlib.sha256(TOKEN_PREFIX + b"gs").digest())
-    mgr.redis.set(hashlib.sha256(TOKEN_PREFIX + b"gs").digest(), json.dumps(dict(user="test", data=dict(success=True))))
+    await mgr.redis.sadd(USER_PREFIX + "gs", hashlib.sha256(TOKEN_PREFIX + b"gs").digest())
+    await mgr.redis.set(hashlib.sha256(TOKEN_PREFIX + b"gs").digest(), json.dumps(dict(user="test", data=dict(success=True))))
 
-    s = mgr.get_session(encode(TOKEN_PREFIX + b"gs"))
+    s = await mgr.get_session(encode(TOKEN_PREFIX + b"gs"))
     assert s.user == "test"
     assert s.data["success"]
 
 
-def test_start_get_session(mgr):
-    t = mgr.start_session(Session(user="test", data=dict(success=True)))
-    s = mgr.get_session(t)
+@pytest.mark.anyio
+async def test_start_get_session(mgr):
+    t = await mgr.start_session(Session(user="test", data=dict(success=True)))
+    s = await mgr.get_session(t)
     assert s.user == "test"
     assert s.data["success"]
 
 
-def test_get_bad_session(mgr):
+@pytest.mark.anyio
+async def test_get_bad_session(mgr):
     with pytest.raises(ValueError) as e:
-        mgr.get_session(encode(b"will-not-exist"))
+        await mgr.get_session(encode(b"will-not-exist"))
     assert "invalid session" in str(e.value).lower()
 
 
-def test_disconnect_on_none():
+@pytest.mark.anyio
+async def test_disconnect_on_none():
     mgr = SessionManager(redis_url="")
     mgr.connected = True
     assert mgr.redis is None
-    mgr.disconnect()
+    await mgr.disconnect()
     assert mgr.redis is None
     assert not mgr.connected
 
 
-def test_none_lifetime():
+@pytest.mark.anyio
+async def test_none_lifetime():
     mgr = SessionManager(redis_url="")
     mgr.connected = True
     mgr.redis = object()
     mgr.lifetime = None
-    mgr.extend(b"adwadaw")  # Throws if null is not correctly handled
+    await mgr.extend(b"adwadaw")  # Throws if null is not correctly handled
 
 
-def test_token_exists_retry():
+@pytest.mark.anyio
+async def test_token_exists_retry():
     class MockRedis:
         cnt = 0
 
-        def exists(self, *_, **__):
+        async def exists(self, *_, **__):
             MockRedis.cnt += 1
             return MockRedis.cnt < 10
 
-        def smembers(self, *_, **__):
-            yield b"123"
+        async def smembers(self, *_, **__):
+            return [b"123"]
 
         def __getattr__(self, item):
-            return lambda *_, **__: None
+            async def null(*_, **__):
+                return None
+
+            return null
 
     mgr = SessionManager(redis_url="")
     mgr.connected = True
     mgr.redis = MockRedis()
 
     s = Session(user="abcd", data=dict())
-    assert mgr.start_session(s) is not None
+    assert await mgr.start_session(s) is not None
     assert MockRedis.cnt >= 10
 
 
-def test_handle_none_end():
+@pytest.mark.anyio
+async def test_handle_none_end():
     token = encode(b"123")
 
     class MockRedis:
         ok = True
 
-        def get(self, *_, **__):
+        async def get(self, *_, **__):
             return None
 
-        def srem(self, *_, **__):
+        async def srem(self, *_, **__):
             MockRedis.ok = False
 
         def __getattr__(self, item):
-            return lambda *_, **__: None
+            async def null(*_, **__):
+                return None
+
+            return null
 
     mgr = SessionManager(redis_url="")
     mgr.connected = True
     mgr.redis = MockRedis()
-    mgr.end_session(token)
+    await mgr.end_session(token)
 
     assert MockRedis.ok  # Fails if rem is called
 
 
-def test_handle_none_in_gets():
+@pytest.mark.anyio
+async def test_handle_none_in_gets():
     class MockRedis:
 
-        def smembers(self, *_, **__):
-            yield b"123"
+        async def smembers(self, *_, **__):
+            return [b"123"]
 
-        def get(self, *_, **__):
+        async def get(self, *_, **__):
             return None
 
         def __getattr__(self, item):
-            return lambda *_, **__: None
+            async def null(*_, **__):
+                return None
+
+            return null
 
     mgr = SessionManager(redis_url="")
     mgr.connected = True
     mgr.redis = MockRedis()
-    assert mgr.get_sessions("a") == []  # Fails if none is appended
+    assert await mgr.get_sessions("a") == []  # Fails if none is appended
+
+
+@pytest.mark.anyio
+async def test_get_session_single_round_trip():
+    class MockPipeline:
+        def __init__(self):
+            self.commands = list()
+
+        async def __aenter__(self):
+            return self
+
+        async def __aexit__(self, *_):
+            pass
+
+        def get(self, *args):
+            self.commands.append("get")
+            return self
+
+        def expire(self, *args):
+            self.commands.append("expire")
+            return self
+
+        async def execute(self):
+            MockRedis.round_trips += 1
+            return [json.dumps(dict(user="test", data=dict())).encode("utf-8"), True]
+
+    class MockRedis:
+        round_trips = 0
+
+        def pipeline(self, *_, **__):
+            return MockPipeline()
+
+        def __getattr__(self, item):
+            async def round_trip(*_, **__):
+                MockRedis.round_trips += 1
+
+            return round_trip
+
+    mgr = SessionManager(redis_url="", lifetime=10)
+    mgr.connected = True
+    mgr.redis = MockRedis()
+
+    s = await mgr.get_session(encode(b"123"))
+    assert s.user == "test"
+    assert MockRedis.round_trips == 1
@@ -0,0 +1,131 @@
+import threading
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+
+import httpx
+import pytest
+from muistot.clients import HTTPClients
+
+REQUESTS = 20
+
+
+class StubHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    connections = 0
+    names = 0
+
+    def setup(self):
+        super(StubHandler, self).setup()
+        StubHandler.connections += 1
+
+    def do_GET(self):
+        StubHandler.names += 1
+        body = f'{{"value": "stub-user-{StubHandler.names}"}}'.encode("ascii")
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *_):
+        pass
+
+
+@pytest.fixture
+def stub_server():
+    StubHandler.connections = 0
+    server = ThreadingHTTPServer(("127.0.0.1", 0), StubHandler)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    try:
+        yield f"http://127.0.0.1:{server.server_address[1]}"
+    finally:
+        server.shutdown()
+        server.server_close()
+
+
+@pytest.mark.anyio
+async def test_shared_client_reuses_connection(stub_server):
+    clients = HTTPClients()
+    try:
+        for _ in range(0, REQUESTS):
+            r = await clients.get(f"{stub_server}/").get(f"{stub_server}/")
+            assert r.status_code == 200
+        assert clients.get(stub_server) is clients.get(f"{stub_server}/other")
+    finally:
+        await clients.close()
+    assert StubHandler.connections == 1
+
+
+@pytest.mark.anyio
+async def test_client_per_call_opens_connections(stub_server):
+    """Baseline for the shared client"""
+    for _ in range(0, REQUESTS):
+        async with httpx.AsyncClient() as client:
+            r = await client.get(f"{stub_server}/")
+            assert r.status_code == 200
+    assert StubHandler.connections == REQUESTS
+
+
+@pytest.mark.anyio
+async def test_clients_per_host(stub_server):
+    clients = HTTPClients()
+    try:
+        assert clients.get("http://a.example") is not clients.get("http://b.example")
+        assert clients.get("http://a.example/x") is clients.get("http://a.example/y")
+    finally:
+        await clients.close()
+
+
+@pytest.mark.anyio
+async def test_replaced_clients_closed():
+    import asyncio
+    clients = HTTPClients()
+    other = asyncio.new_event_loop()
+    other.close()
+    old = httpx.AsyncClient()
+    clients._clients[clients._origin("http://a.example")] = other, old
+    try:
+        assert clients.get("http://a.example") is not old
+        await asyncio.sleep(0)
+        assert old.is_closed
+    finally:
+        await clients.close()
+
+
+@pytest.mark.anyio
+async def test_close_all_loops():
+    import asyncio
+    clients = HTTPClients()
+    other = asyncio.new_event_loop()
+    other.close()
+    old = httpx.AsyncClient()
+    clients._clients["http://a.example"] = other, old
+    current = clients.get("http://b.example")
+    await clients.close()
+    assert old.is_closed
+    assert current.is_closed
+
+
+@pytest.mark.anyio
+async def test_namegen_uses_shared_client(stub_server, monkeypatch):
+    from muistot import clients
+    from muistot.config import Config
+    from muistot.login.logic import login
+
+    class MockDB:
+
+        async def fetch_one(self, *_, **__):
+            return 0, 0
+
+        async def execute(self, *_, **__):
+            pass
+
+    monkeypatch.setattr(Config.namegen, "url", stub_server)
+    monkeypatch.setattr(clients, "clients", HTTPClients())
+    monkeypatch.setattr(login, "clients", clients.clients)
+    try:
+        for _ in range(0, REQUESTS):
+            assert (await login.try_create_user("a@example.com", MockDB())).startswith("stub-user-")
+    finally:
+        await clients.clients.close()
+    assert StubHandler.connections == 1
@@ -12,6 +12,29 @@ def set_default():
     Config.mailer = old
 
 
+def test_close_on_shutdown():
+    from fastapi import FastAPI
+    from fastapi.testclient import TestClient
+    from muistot import mailer
+
+    closed = list()
+
+    class Closing(mailer.Mailer):
+        async def send_email(self, email: str, email_type: str, **data):
+            pass
+
+        def close(self, timeout=None):
+            closed.append(timeout)
+
+    app = FastAPI()
+    mailer.register_mailer(app)
+    mailer.instance = Closing()
+    with TestClient(app):
+        pass
+    assert closed == [Config.mailer.close_timeout_seconds]
+    assert mailer.instance is None
+
+
 def test_importing():
     with pytest.raises(RuntimeError) as e:
         _derive_default()
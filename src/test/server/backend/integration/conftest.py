@@ -6,7 +6,7 @@ from muistot.backend import main
 from muistot.database import Databases
 from muistot.security.password import hash_password
 
-from utils import authenticate as auth, mock_request, genword
+from utils import authenticate as auth, mock_request, genword, NullRedis
 
 User = namedtuple('User', ('username', 'email', 'password'))
 
@@ -18,28 +18,24 @@ async def client(db_instance):
             yield c
 
     main.app.dependency_overrides[Databases.default] = mock_dep
+    main.app.dependency_overrides[Databases.read] = mock_dep
     client = AsyncClient(app=main.app, base_url="http://test")
 
-    class Mock:
-
-        def __getattribute__(self, item):
-            return lambda *_, **__: None
-
     client.app = main.app
-    client.app.state.FastStorage.redis = Mock()
+    client.app.state.FastStorage.redis = NullRedis()
 
     async with client as c:
         yield c
 
 
 @pytest.fixture(scope="function")
-def using_cache(client):
+async def using_cache(client):
     old = client.app.state.FastStorage.redis
     client.app.state.FastStorage.redis = None
     client.app.state.FastStorage.connect()
     yield client.app.state.FastStorage.redis
-    client.app.state.FastStorage.redis.flushdb()
-    client.app.state.FastStorage.disconnect()
+    await client.app.state.FastStorage.redis.flushdb()
+    await client.app.state.FastStorage.disconnect()
     client.app.state.FastStorage.redis = old
 
 
@@ -129,7 +125,7 @@ async def auth_fixture_3(client, _credentials):
     yield await auth(client, username, password)
 
 
-@pytest.fixture(scope="module")
+@pytest.fixture
 def repo_config(_credentials):
     yield mock_request(_credentials[0][0])
 
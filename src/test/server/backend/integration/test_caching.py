@@ -16,99 +16,186 @@ async def setup(repo_config, db, username):
 
 @pytest.fixture
 def get_len(using_cache):
-    yield lambda: len(list(using_cache.keys("*")))
+    async def length():
+        return len([
+            k for k in await using_cache.keys("*")
+            if not k.startswith(b"entity-cache:tags:") and not k.endswith(b":etag")
+        ])
+
+    yield length
 
 
 @pytest.mark.anyio
 async def test_projects_cache(setup, superuser, client, using_cache, get_len):
-    start = get_len()
-    expected = 2
+    start = await get_len()
+    expected = 1
 
     r = await client.get(PROJECT.format(setup.project))
     check_code(status.HTTP_200_OK, r)
     p = to(Project, r)
-    assert get_len() - start == expected  # Added one key and One set
+    assert await get_len() - start == expected  # Added one key
 
     r = await client.get(PROJECT.format(setup.project))
     check_code(status.HTTP_200_OK, r)
     assert p == to(Project, r)
-    assert get_len() - start == expected  # No change
+    assert await get_len() - start == expected  # No change
 
     r = await client.get(PROJECTS)
     check_code(status.HTTP_200_OK, r)
     expected += 1
-    assert get_len() - start == expected  # Added one key and One set member
+    assert await get_len() - start == expected  # Added one key
 
     r = await client.post(PUBLISH_PROJECT.format(setup.project, False))
     check_code(status.HTTP_401_UNAUTHORIZED, r)
-    assert get_len() - start == expected  # No change
+    assert await get_len() - start == expected  # No change
 
     r = await client.post(PUBLISH_PROJECT.format(setup.project, False), headers=superuser)
     check_code(status.HTTP_204_NO_CONTENT, r)
-    assert get_len() == start  # Both keys deleted and set cleared
+    assert await get_len() == start  # Both keys deleted
 
 
 @pytest.mark.anyio
 async def test_sites_evict_projects(setup, superuser, client, using_cache, get_len):
-    start = get_len()
-    expected = 2
+    start = await get_len()
+    expected = 1
 
     r = await client.get(PROJECT.format(setup.project))
     check_code(status.HTTP_200_OK, r)
     p = to(Project, r)
     assert p.sites_count >= 1
-    assert get_len() - start == expected  # Added one key and One set
+    assert await get_len() - start == expected  # Added one key
 
     r = await client.get(SITES.format(setup.project))
     check_code(status.HTTP_200_OK, r)
-    expected += 2
-    assert get_len() - start == expected  # Added one key and One set
+    expected += 1
+    assert await get_len() - start == expected  # Added one key
 
     r = await client.post(PUBLISH_SITE.format(setup.project, setup.site, False), headers=superuser)
     check_code(status.HTTP_204_NO_CONTENT, r)
-    assert get_len() == start  # Evicted project and Site Caches
+    assert await get_len() == start  # Evicted project and Site Caches
 
 
 @pytest.mark.anyio
 async def test_memories_evict_sites(setup, superuser, client, using_cache, get_len):
-    start = get_len()
-    expected = 2
+    start = await get_len()
+    expected = 1
 
     r = await client.get(PROJECT.format(setup.project))
     check_code(status.HTTP_200_OK, r)
-    assert get_len() - start == expected  # Added one key and One set
+    assert await get_len() - start == expected  # Added one key
 
     r = await client.get(SITES.format(setup.project))
     check_code(status.HTTP_200_OK, r)
-    expected += 2
-    assert get_len() - start == expected  # Added one key and One set
+    expected += 1
+    assert await get_len() - start == expected  # Added one key
 
     r = await client.post(PUBLISH_MEMORY.format(setup.project, setup.site, setup.memory, False), headers=superuser)
     check_code(status.HTTP_204_NO_CONTENT, r)
     expected -= 2
-    assert get_len() - start == expected  # Evicted and Site Caches but not project
+    assert await get_len() - start == expected  # Evicted the parent project and its site listing
+
+
+@pytest.mark.anyio
+async def test_memories_evict_only_own_project(setup, superuser, client, using_cache, get_len, db, repo_config):
+    other = await create_project(db, repo_config)
+    try:
+        start = await get_len()
+
+        r = await client.get(SITES.format(other))
+        check_code(status.HTTP_200_OK, r)
+        assert await get_len() - start == 1  # Added one key
+
+        r = await client.post(
+            PUBLISH_MEMORY.format(setup.project, setup.site, setup.memory, False),
+            headers=superuser
+        )
+        check_code(status.HTTP_204_NO_CONTENT, r)
+        assert await get_len() - start == 1  # Sites of the other project stay cached
+    finally:
+        await db.execute("DELETE FROM projects WHERE name = :project", dict(project=other))
+
+
+@pytest.mark.anyio
+async def test_tiles_evicted_on_site_change(setup, superuser, client, using_cache, get_len):
+    start = await get_len()
+
+    r = await client.get(TILE.format(setup.project, 0, 0, 0))
+    check_code(status.HTTP_200_OK, r)
+    assert await get_len() - start == 1  # Added one key
+
+    r = await client.patch(
+        SITE.format(setup.project, setup.site),
+        json={"location": Point(lat=1, lon=-1).dict()},
+        headers=superuser,
+    )
+    check_code(status.HTTP_204_NO_CONTENT, r)
+    assert await get_len() == start  # Tile evicted with the site move
+
+    r = await client.get(TILE.format(setup.project, 1, 0, 0))
+    check_code(status.HTTP_200_OK, r)
+    assert setup.site in {s.id for s in to(SiteTile, r).items}
+    assert await get_len() - start == 1  # Added one key
+
+    r = await client.post(PUBLISH_SITE.format(setup.project, setup.site, False), headers=superuser)
+    check_code(status.HTTP_204_NO_CONTENT, r)
+    assert await get_len() == start  # Tile evicted with the publish status change
 
 
 @pytest.mark.anyio
 async def test_same_scopes_cache(setup, users, client, using_cache, get_len, superuser):
-    start = get_len()
-    expected = 2
+    start = await get_len()
+    expected = 1
 
     auth1 = await authenticate(client, users[1].username, users[1].password)
     auth2 = await authenticate(client, users[2].username, users[2].password)
 
     r = await client.get(PROJECT.format(setup.project), headers=auth1)
     check_code(status.HTTP_200_OK, r)
-    assert get_len() - start == expected  # Added one key and One set
+    assert await get_len() - start == expected  # Added one key
 
     r = await client.get(PROJECT.format(setup.project), headers=auth2)
     check_code(status.HTTP_200_OK, r)
-    assert get_len() - start == expected  # Nothing added with identical scopes
+    assert await get_len() - start == expected  # Nothing added with identical scopes
 
     r = await client.get(PROJECT.format(setup.project), headers=superuser)
     check_code(status.HTTP_200_OK, r)
     expected += 1
-    assert get_len() - start == expected  # Added one key
+    assert await get_len() - start == expected  # Added one key
+
+
+
+@pytest.mark.anyio
+async def test_language_cache(setup, client, using_cache, get_len):
+    start = await get_len()
+
+    r = await client.get(PROJECT.format(setup.project), headers={"Accept-Language": "fi"})
+    check_code(status.HTTP_200_OK, r)
+    assert await get_len() - start == 1  # Added one key
+
+    r = await client.get(PROJECT.format(setup.project), headers={"Accept-Language": "en"})
+    check_code(status.HTTP_200_OK, r)
+    assert await get_len() - start == 2  # Added one key for the other language
+
+    r = await client.get(PROJECT.format(setup.project), headers={"Accept-Language": "en-GB,en"})
+    check_code(status.HTTP_200_OK, r)
+    assert await get_len() - start == 2  # Resolves to the same language
+
+
+
+@pytest.mark.anyio
+async def test_cache_etag(setup, client, using_cache):
+    r = await client.get(SITES.format(setup.project))
+    check_code(status.HTTP_200_OK, r)
+    etag = r.headers["etag"]
+
+    r = await client.get(SITES.format(setup.project), headers={"If-None-Match": etag})
+    check_code(status.HTTP_304_NOT_MODIFIED, r)
+    assert r.headers["etag"] == etag
+    assert len(r.content) == 0
+
+    r = await client.get(SITES.format(setup.project), headers={"If-None-Match": '"stale"'})
+    check_code(status.HTTP_200_OK, r)
+    assert r.headers["etag"] == etag
 
 
 @pytest.mark.anyio
@@ -117,13 +204,7 @@ async def test_cache_is_faster(setup, client, using_cache, db, repo_config, supe
         await create_site(setup.project, db, repo_config)
 
     old = client.app.state.FastStorage.redis
-
-    class NullCache:
-
-        def __getattribute__(self, item):
-            return lambda *_, **__: None
-
-    client.app.state.FastStorage.redis = NullCache()
+    client.app.state.FastStorage.redis = NullRedis()
 
     await db.execute(
         """
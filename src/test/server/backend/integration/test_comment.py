@@ -244,3 +244,11 @@ async def test_others_no_modify(client, auth2, setup, auth3, auto_publish):
 
     r = await client.patch(r.headers[LOCATION], json=dict(comment="dwjadwdiwidjiwowadä"), headers=auth3)
     check_code(status.HTTP_403_FORBIDDEN, r)
+
+
+@pytest.mark.anyio
+async def test_fetch_pages(client, setup, db, repo_config):
+    comments = [await create_comment(*setup, db, repo_config) for _ in range(0, 3)]
+    pages = await fetch_pages(client, COMMENTS.format(*setup), Comments, 1)
+    assert [len(p) for p in pages] == [1, 1, 1]
+    assert [c.id for p in pages for c in p] == sorted(comments)
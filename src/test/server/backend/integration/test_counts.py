@@ -93,3 +93,59 @@ async def test_memory_count(client, db, setup, n, repo_config):
         client,
         partial(create_memory, setup.project, setup.site, db, repo_config),
     )
+
+
+@pytest.mark.anyio
+async def test_count_follows_delete(client, db, setup, repo_config):
+    """Test that deleting a published child updates the count
+    """
+    mid = await create_memory(setup.project, setup.site, db, repo_config)
+    assert to(Site, await client.get(SITE.format(*setup))).memories_count == 1
+
+    await db.execute("DELETE FROM memories WHERE id = :id", values=dict(id=mid))
+    assert to(Site, await client.get(SITE.format(*setup))).memories_count == 0
+
+
+@pytest.mark.anyio
+async def test_count_reconciled(client, db, setup, repo_config):
+    """Test that the reconciliation restores drifted counts
+    """
+    await create_memory(setup.project, setup.site, db, repo_config)
+    await db.execute("UPDATE sites SET memories_count = 10 WHERE name = :s", values=dict(s=setup.site))
+    assert to(Site, await client.get(SITE.format(*setup))).memories_count == 10
+
+    await db.execute("CALL reconcile_counters()")
+    assert to(Site, await client.get(SITE.format(*setup))).memories_count == 1
+
+
+@pytest.mark.anyio
+async def test_counts_auto_publish(client, db, setup, auth, auto_publish):
+    """Test that content published on creation through the API is counted
+    """
+    sites_count = to(Project, await client.get(PROJECT.format(setup.project))).sites_count
+
+    site = NewSite(
+        id=genword(length=32),
+        info=SiteInfo(lang="fi", name=genword(length=20)),
+        location=Point(lat=10, lon=10),
+    )
+    r = await client.post(SITES.format(setup.project), json=site.dict(), headers=auth)
+    check_code(201, r)
+    assert to(Project, await client.get(PROJECT.format(setup.project))).sites_count == sites_count + 1
+
+    r = await client.post(
+        MEMORIES.format(setup.project, site.id),
+        json=NewMemory(title=genword(length=20), story=genword(length=100)).dict(),
+        headers=auth,
+    )
+    check_code(201, r)
+    mid = extract_id(r)
+    assert to(Site, await client.get(SITE.format(setup.project, site.id))).memories_count == 1
+
+    r = await client.post(
+        COMMENTS.format(setup.project, site.id, mid),
+        json=NewComment(comment=genword(length=100)).dict(),
+        headers=auth,
+    )
+    check_code(201, r)
+    assert to(Memory, await client.get(MEMORY.format(setup.project, site.id, mid))).comments_count == 1
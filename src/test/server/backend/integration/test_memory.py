@@ -338,3 +338,34 @@ async def test_fetch_with_comments(client, setup, auth, auto_publish):
     m = to(Memory, await client.get(url + "?include_comments=true"))
     assert len(m.comments) == 10
     assert m.comments_count == 10
+
+
+@pytest.mark.anyio
+async def test_fetch_pages(client, setup, db, repo_config):
+    memories = [await create_memory(setup.project, setup.site, db, repo_config) for _ in range(0, 5)]
+    pages = await fetch_pages(client, MEMORIES.format(*setup), Memories, 2)
+    assert [len(p) for p in pages] == [2, 2, 1]
+    assert [m.id for p in pages for m in p] == sorted(memories)
+
+
+@pytest.mark.parametrize("q", ["?limit=0", "?limit=1&cursor=bad", "?cursor=InNpdGUi"])
+@pytest.mark.anyio
+async def test_fetch_pages_bad_params(client, setup, q):
+    r = await client.get(MEMORIES.format(*setup) + q)
+    check_code(status.HTTP_422_UNPROCESSABLE_ENTITY, r)
+
+
+@pytest.mark.anyio
+async def test_fetch_streamed(client, setup, db, repo_config):
+    memories = [await create_memory(setup.project, setup.site, db, repo_config) for _ in range(0, 5)]
+    r = await client.get(MEMORIES.format(*setup) + "?stream=true")
+    check_code(status.HTTP_200_OK, r)
+    assert {m.id for m in to(Memories, r).items} == set(memories)
+    assert to(Memories, r) == to(Memories, await client.get(MEMORIES.format(*setup)))
+
+
+@pytest.mark.parametrize("q", ["?stream=true&limit=1", "?stream=true&include_comments=true"])
+@pytest.mark.anyio
+async def test_fetch_streamed_bad_params(client, setup, q):
+    r = await client.get(MEMORIES.format(*setup) + q)
+    check_code(status.HTTP_422_UNPROCESSABLE_ENTITY, r)
@@ -446,6 +446,63 @@ async def test_site_localize_others_overwrite(client, setup, db, auth2, auth):
     assert s.modifier == modifier
 
 
+@pytest.mark.anyio
+async def test_site_localized_read_model(client, setup, db, auth, auto_publish):
+    _id, site = await _create_site()
+    r = await client.post(SITES.format(*setup), json=site.dict(), headers=auth)
+    check_code(status.HTTP_201_CREATED, r)
+
+    info = ModifiedSite(info=SiteInfo(name="english", lang="en")).dict(exclude_unset=True)
+    r = await client.patch(SITE.format(*setup, _id), json=info, headers=auth)
+    check_code(status.HTTP_204_NO_CONTENT, r)
+
+    s = to(Site, await client.get(SITE.format(*setup, _id), headers={headers.ACCEPT_LANGUAGE: "en"}))
+    assert s.info.name == "english"
+    assert s.info.lang == "en"
+
+    await db.execute(
+        """
+        DELETE si
+        FROM site_information si
+            JOIN sites s ON si.site_id = s.id
+                AND s.name = :id
+            JOIN languages l ON si.lang_id = l.id
+                AND l.lang = 'en'
+        """,
+        values=dict(id=_id)
+    )
+
+    s = to(Site, await client.get(SITE.format(*setup, _id), headers={headers.ACCEPT_LANGUAGE: "en"}))
+    assert s.info.name == site.info.name
+    assert s.info.lang == "fi"
+
+
+@pytest.mark.anyio
+async def test_site_localized_missing_language_row(client, setup, db, auth, auto_publish):
+    _id, site = await _create_site()
+    r = await client.post(SITES.format(*setup), json=site.dict(), headers=auth)
+    check_code(status.HTTP_201_CREATED, r)
+
+    await db.execute(
+        """
+        DELETE sl
+        FROM site_localized sl
+            JOIN sites s ON sl.site_id = s.id
+                AND s.name = :id
+        WHERE sl.lang = 'en'
+        """,
+        values=dict(id=_id)
+    )
+
+    s = to(Site, await client.get(SITE.format(*setup, _id), headers={headers.ACCEPT_LANGUAGE: "en"}))
+    assert s.info.name == site.info.name
+    assert s.info.lang == "fi"
+
+    r = await client.get(SITES.format(*setup), headers={headers.ACCEPT_LANGUAGE: "en"})
+    check_code(status.HTTP_200_OK, r)
+    assert _id in {o.id for o in to(Sites, r).items}
+
+
 @pytest.mark.anyio
 async def test_site_fetch_by_distance(client, setup, db, auth, auto_publish):
     sites_data = []
@@ -473,6 +530,155 @@ async def test_site_fetch_by_distance(client, setup, db, auth, auto_publish):
     assert b != a != c
 
 
+@pytest.mark.anyio
+async def test_site_fetch_by_area(client, setup, db, auth, auto_publish):
+    sites_data = []
+    for i in range(0, 5):
+        _id = genword(length=128)
+        _site = NewSite(
+            id=_id,
+            info=SiteInfo(lang="fi", name=genword(length=50)),
+            location=Point(lon=i * 10, lat=i * 10),
+        )
+        r = await client.post(SITES.format(*setup), json=_site.dict(), headers=auth)
+        check_code(status.HTTP_201_CREATED, r)
+        sites_data.append(_site.id)
+
+    r = await client.get(SITES.format(*setup) + "?min_lat=5&min_lon=5&max_lat=25&max_lon=25")
+    check_code(status.HTTP_200_OK, r)
+    sites = to(Sites, r)
+
+    assert {s.id for s in sites.items} == {sites_data[1], sites_data[2]}
+
+    r = await client.get(SITES.format(*setup) + "?n=1&min_lat=5&min_lon=5&max_lat=25&max_lon=25")
+    check_code(status.HTTP_200_OK, r)
+    sites = to(Sites, r)
+
+    assert len(sites.items) == 1
+    assert sites.items[0].id in {sites_data[1], sites_data[2]}
+
+
+@pytest.mark.parametrize("q", [
+    "?min_lat=0",
+    "?min_lat=0&min_lon=0&max_lat=10",
+    "?min_lat=10&min_lon=0&max_lat=0&max_lon=10",
+    "?min_lat=0&min_lon=10&max_lat=10&max_lon=0",
+    "?min_lat=-91&min_lon=0&max_lat=10&max_lon=10",
+    "?min_lat=0&min_lon=0&max_lat=10&max_lon=181",
+    "?n=0&min_lat=0&min_lon=0&max_lat=10&max_lon=10",
+    "?lat=5&lon=5&min_lat=0&min_lon=0&max_lat=10&max_lon=10",
+    "?n=1&lat=5&lon=5&min_lat=0&min_lon=0&max_lat=10&max_lon=10",
+])
+@pytest.mark.anyio
+async def test_site_fetch_by_area_bad_params(client, setup, q):
+    r = await client.get(SITES.format(*setup) + q)
+    check_code(status.HTTP_422_UNPROCESSABLE_ENTITY, r)
+
+
+@pytest.mark.anyio
+async def test_site_fetch_pages(client, setup, db, repo_config):
+    sites = [await create_site(setup.project, db, repo_config) for _ in range(0, 5)]
+    pages = await fetch_pages(client, SITES.format(*setup), Sites, 2)
+    assert [len(p) for p in pages] == [2, 2, 1]
+    assert len({s.id for p in pages for s in p}) == 5
+    assert {s.id for p in pages for s in p} == set(sites)
+
+
+@pytest.mark.parametrize("q", [
+    "?n=1&limit=1",
+    "?n=1&lat=10&lon=10&limit=1",
+    "?n=1&lat=10&lon=10&cursor=InNpdGUi",
+    "?cursor=MQ",
+])
+@pytest.mark.anyio
+async def test_site_fetch_pages_bad_params(client, setup, q):
+    r = await client.get(SITES.format(*setup) + q)
+    check_code(status.HTTP_422_UNPROCESSABLE_ENTITY, r)
+
+
+@pytest.mark.anyio
+async def test_site_fetch_streamed(client, setup, db, repo_config):
+    for _ in range(0, 5):
+        await create_site(setup.project, db, repo_config)
+    r = await client.get(SITES.format(*setup) + "?stream=true")
+    check_code(status.HTTP_200_OK, r)
+    streamed = to(Sites, r)
+    assert len(streamed.items) == 5
+    expected = to(Sites, await client.get(SITES.format(*setup)))
+    assert sorted(streamed.items, key=lambda o: o.id) == sorted(expected.items, key=lambda o: o.id)
+
+
+@pytest.mark.parametrize("q", ["?stream=true&limit=1", "?stream=true&n=1&lat=10&lon=10"])
+@pytest.mark.anyio
+async def test_site_fetch_streamed_bad_params(client, setup, q):
+    r = await client.get(SITES.format(*setup) + q)
+    check_code(status.HTTP_422_UNPROCESSABLE_ENTITY, r)
+
+
+@pytest.mark.anyio
+async def test_site_tile(client, setup, db, auth, auto_publish):
+    _id, site = await _create_site()
+    r = await client.post(SITES.format(*setup), json=site.dict(), headers=auth)
+    check_code(status.HTTP_201_CREATED, r)
+
+    r = await client.get(TILE.format(setup.project, 0, 0, 0))
+    check_code(status.HTTP_200_OK, r)
+    tile = to(SiteTile, r)
+    assert tile.clusters is None
+    assert _id in {s.id for s in tile.items}
+
+    r = await client.get(TILE.format(setup.project, 1, 0, 0))
+    check_code(status.HTTP_200_OK, r)
+    assert _id not in {s.id for s in to(SiteTile, r).items}
+
+
+@pytest.mark.anyio
+async def test_site_on_boundary(client, setup, db, auth, auto_publish):
+    _id, site = await _create_site()
+    site.location = Point(lat=22.5, lon=0)
+    r = await client.post(SITES.format(*setup), json=site.dict(), headers=auth)
+    check_code(status.HTTP_201_CREATED, r)
+
+    for x in (0, 1):
+        r = await client.get(TILE.format(setup.project, 1, x, 0))
+        check_code(status.HTTP_200_OK, r)
+        assert _id in {s.id for s in to(SiteTile, r).items}
+
+    # Snaps to the same area, the site is on the top edge
+    r = await client.get(SITES.format(*setup) + "?min_lat=5&min_lon=-10&max_lat=22.5&max_lon=5")
+    check_code(status.HTTP_200_OK, r)
+    assert _id in {s.id for s in to(Sites, r).items}
+
+
+@pytest.mark.anyio
+async def test_site_tile_clusters(client, setup, db, auth, auto_publish, monkeypatch):
+    monkeypatch.setattr(SiteRepo, "TILE_SITES", 1)
+    for i in range(0, 3):
+        _id, site = await _create_site()
+        site.location = Point(lat=10 + i / 100, lon=10 + i / 100)
+        r = await client.post(SITES.format(*setup), json=site.dict(), headers=auth)
+        check_code(status.HTTP_201_CREATED, r)
+
+    r = await client.get(TILE.format(setup.project, 0, 0, 0))
+    check_code(status.HTTP_200_OK, r)
+    tile = to(SiteTile, r)
+    assert tile.items is None
+    assert len(tile.clusters) == 1
+    assert tile.clusters[0].count == 3
+    assert tile.clusters[0].location.lat == pytest.approx(10.01)
+
+
+@pytest.mark.parametrize("q", [
+    (1, 2, 0),
+    (1, 0, 2),
+    (0, 1, 1),
+])
+@pytest.mark.anyio
+async def test_site_tile_not_found(client, setup, q):
+    r = await client.get(TILE.format(setup.project, *q))
+    check_code(status.HTTP_404_NOT_FOUND, r)
+
+
 @pytest.mark.anyio
 async def test_sites_include_memories(client, setup, db, auth, auto_publish, repo_config):
     _id, site = await _create_site()
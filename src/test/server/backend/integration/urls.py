@@ -5,6 +5,7 @@ PROJECTS = ROOT + "/projects"
 PROJECT = PROJECTS + "/{}"
 SITES = PROJECT + "/sites"
 SITE = SITES + "/{}"
+TILE = PROJECT + "/tiles/{}/{}/{}"
 MEMORIES = SITE + "/memories"
 MEMORY = MEMORIES + "/{}"
 COMMENTS = MEMORY + "/comments"
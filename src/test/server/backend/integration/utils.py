@@ -4,6 +4,7 @@ from typing import cast
 from urllib.parse import quote
 
 from fastapi import Request
+from starlette.datastructures import State
 from headers import AUTHORIZATION
 from muistot.backend.models import *
 from muistot.backend.repos import *
@@ -150,9 +151,54 @@ def mock_request(username):
         headers = dict()
         user = u
 
+        def __init__(self):
+            self.state = State()
+
     return cast(Request, MockRequest())
 
 
+class NullRedis:
+    """Redis that never has anything stored
+
+    Used to run the API without a cache, every command succeeds without doing anything.
+    """
+
+    class Pipeline:
+
+        async def __aenter__(self):
+            return self
+
+        async def __aexit__(self, *_):
+            pass
+
+        def __getattr__(self, item):
+            return lambda *_, **__: self
+
+        async def execute(self):
+            return []
+
+    async def mget(self, *keys):
+        return [None] * len(keys)
+
+    async def set(self, *_, **__):
+        return True
+
+    def pipeline(self, **_):
+        return NullRedis.Pipeline()
+
+    def register_script(self, _):
+        async def script(*_, **__):
+            return 0
+
+        return script
+
+    def __getattr__(self, item):
+        async def null(*_, **__):
+            return None
+
+        return null
+
+
 async def authenticate(client, username, password):
     r = await client.post(
         LOGIN,
@@ -180,3 +226,19 @@ def extract_id(r, _type=int):
     """
     from headers import LOCATION
     return _type(r.headers[LOCATION].removesuffix("/").split("/")[-1])
+
+
+async def fetch_pages(client, url: str, model: Type[T], limit: int, **kwargs) -> list:
+    """Walks all pages of a collection and returns the pages
+    """
+    pages = list()
+    cursor = None
+    while True:
+        params = dict(limit=limit) if cursor is None else dict(limit=limit, cursor=cursor)
+        r = await client.get(url, params=params, **kwargs)
+        check_code(200, r)
+        page = to(model, r)
+        pages.append(page.items)
+        cursor = page.next
+        if cursor is None:
+            return pages
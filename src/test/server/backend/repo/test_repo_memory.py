@@ -0,0 +1,112 @@
+import datetime
+
+import pytest
+from muistot.backend.repos import MemoryRepo
+from muistot.database.resultset import ResultSet
+
+
+class MockDB:
+
+    def __init__(self, memories: int, comments: int):
+        self.queries = 0
+        self.memories = memories
+        self.comments = comments
+
+    async def fetch_one(self, *_, values=None, **__):
+        self.queries += 1
+        return dict(
+            project_published=True,
+            admin_posting=False,
+            auto_publish=False,
+            default_language="fi",
+            site_published=True,
+            memory_published=None if values["memory"] is None else True,
+        )
+
+    async def execute(self, *_, **__):
+        self.queries += 1
+
+    async def iterate(self, query, values=None):
+        self.queries += 1
+        self.last = query, values
+        now = datetime.datetime.now()
+        if "FROM comments" in query:
+            for i in range(0, self.comments * self.memories):
+                yield ResultSet(dict(
+                    id=i + 1,
+                    memory_id=i % self.memories + 1,
+                    user="test-user",
+                    comment="comment",
+                    modified_at=now,
+                ).items())
+        else:
+            for i in range(0, self.memories):
+                yield ResultSet(dict(
+                    id=i + 1,
+                    title="title",
+                    story="story",
+                    user="test-user",
+                    image=None,
+                    modified_at=now,
+                    comments_count=self.comments,
+                ).items())
+
+
+@pytest.mark.anyio
+@pytest.mark.parametrize("n", [1, 10, 50])
+async def test_all_with_comments_query_count_flat(n):
+    db = MockDB(n, 3)
+    repo = MemoryRepo(db, "test-project", "test-site")
+    repo.lang = "fi"
+    memories = await repo.all(include_comments=True)
+
+    assert db.queries == 3  # Exists, Memories, Comments
+    assert len(memories) == n
+    for m in memories:
+        assert len(m.comments) == 3
+        assert all((c.id - 1) % n + 1 == m.id for c in m.comments)
+
+
+@pytest.mark.anyio
+async def test_all_with_comments_empty_memories():
+    db = MockDB(0, 3)
+    repo = MemoryRepo(db, "test-project", "test-site")
+    repo.lang = "fi"
+    assert await repo.all(include_comments=True) == []
+    assert db.queries == 2  # No comment query without memories
+
+
+@pytest.mark.anyio
+async def test_exists_memoized_across_repos():
+    db = MockDB(2, 0)
+    repo = MemoryRepo(db, "test-project", "test-site")
+    repo.lang = "fi"
+    await repo.all()
+    await repo.all()
+    await MemoryRepo(db, "test-project", "test-site").from_repo(repo).all()
+
+    assert db.queries == 4  # One exists check, three memory queries
+
+
+@pytest.mark.anyio
+async def test_exists_memo_cleared_on_write():
+    db = MockDB(2, 0)
+    repo = MemoryRepo(db, "test-project", "test-site")
+    repo.lang = "fi"
+    await repo.report(1)
+    await repo.report(1)
+    assert db.queries == 4  # Exists check after every write
+    assert len(repo.statuses) == 0
+
+
+@pytest.mark.anyio
+async def test_all_page_is_ordered_after_cursor():
+    db = MockDB(2, 0)
+    repo = MemoryRepo(db, "test-project", "test-site")
+    repo.lang = "fi"
+    await repo.all(limit=3, after=5)
+    query, values = db.last
+    assert "m.id > :after" in query
+    assert query.rstrip().endswith("ORDER BY m.id LIMIT :limit")
+    assert values["limit"] == 3
+    assert values["after"] == 5
@@ -308,3 +308,48 @@ async def test_project_contact_ok(db, pid):
     p = await repo.one(pid)
     assert p.id == pid
     assert p.contact is not None
+
+
+@pytest.mark.anyio
+@pytest.mark.parametrize("n", [1, 10, 100])
+async def test_all_query_count_flat(n):
+    """Listing projects should not issue a query per project
+    """
+    from muistot.database.resultset import ResultSet
+
+    class MockDB:
+        queries = 0
+
+        async def fetch_all(self, query, values=None):
+            MockDB.queries += 1
+            if "project_admins" in query:
+                return [ResultSet([("project_id", v), ("username", f"admin-{v}")]) for v in set(values.values())]
+            return [
+                ResultSet(dict(
+                    project_id=i,
+                    id=f"project-{i}",
+                    image=None,
+                    lang="fi",
+                    name=f"project-{i}",
+                    abstract=None,
+                    description=None,
+                    starts=None,
+                    ends=None,
+                    has_contact_data=False,
+                    sites_count=0,
+                    start_date=1,
+                    end_date=1,
+                    admin_posting=False,
+                    auto_publish=False,
+                ).items())
+                for i in range(1, n + 1)
+            ]
+
+    repo = ProjectRepo(MockDB())
+    repo.lang = "fi"
+    projects = await repo.all()
+
+    assert len(projects) == n
+    assert MockDB.queries == 2
+    for p in projects:
+        assert p.admins == [f"admin-{p.id.removeprefix('project-')}"]
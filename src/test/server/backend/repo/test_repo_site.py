@@ -7,3 +7,124 @@ async def test_handle_nulls():
     repo = SiteRepo(None, None)
     assert not await repo._handle_location(None, None)
     assert not await repo._handle_info(None, None)
+
+
+@pytest.mark.anyio
+async def test_fill_images_single_query():
+    class MockDB:
+        queries = 0
+
+        async def fetch_all(self, _, values=None):
+            MockDB.queries += 1
+            return [(v, f"{v}.jpg") for v in values.values()]
+
+    repo = SiteRepo(MockDB(), None)
+    rows = [
+        dict(id=f"site-{i}", memories_count=i % 2, image=None if i % 3 else "own.jpg")
+        for i in range(0, 100)
+    ]
+    out = await repo._fill_images(rows)
+
+    assert MockDB.queries == 1
+    for row, filled in zip(rows, out):
+        if row["image"] is not None:
+            assert filled["image"] == "own.jpg"
+        elif row["memories_count"] > 0:
+            assert filled["image"] == f"{row['id']}.jpg"
+        else:
+            assert filled["image"] is None
+
+
+@pytest.mark.anyio
+async def test_fill_images_no_query_when_not_needed():
+    repo = SiteRepo(None, None)
+    rows = [dict(id="a", memories_count=0, image=None), dict(id="b", memories_count=2, image="b.jpg")]
+    assert await repo._fill_images(rows) == rows
+
+
+@pytest.mark.anyio
+async def test_all_area_uses_spatial_index():
+    from muistot.backend.repos.exists import Status
+
+    class MockDB:
+        sql = None
+        values = None
+
+        async def iterate(self, sql, values=None):
+            MockDB.sql = sql
+            MockDB.values = values
+            for _ in ():
+                yield
+
+    repo = SiteRepo(MockDB(), "test")
+    assert await SiteRepo.all.__wrapped__(repo, 5, area=(1, 2, 3, 4), _status=Status.PUBLISHED) == []
+    assert "MBRIntersects" in MockDB.sql
+    assert "LIMIT :limit" in MockDB.sql
+    assert MockDB.values["limit"] == 5
+    assert "ST_DISTANCE_SPHERE" not in MockDB.sql
+    assert MockDB.values["min_lat"] == 1
+    assert MockDB.values["min_lon"] == 2
+    assert MockDB.values["max_lat"] == 3
+    assert MockDB.values["max_lon"] == 4
+
+
+def test_tile_area():
+    assert SiteRepo._tile_area(0, 0, 0) == pytest.approx((-85.0511287798, -180, 85.0511287798, 180))
+    min_lat, min_lon, max_lat, max_lon = SiteRepo._tile_area(1, 1, 0)
+    assert (min_lat, min_lon, max_lon) == pytest.approx((0, 0, 180))
+    assert max_lat == pytest.approx(85.0511287798)
+
+
+@pytest.mark.anyio
+@pytest.mark.parametrize("z, counts, clustered", [
+    (10, [SiteRepo.TILE_SITES], False),
+    (10, [SiteRepo.TILE_SITES, 1], True),
+    (SiteRepo.TILE_MAX_ZOOM, [SiteRepo.TILE_SITES, 1], False),
+])
+async def test_tile_clusters_dense_tiles(z, counts, clustered):
+    from muistot.backend.repos.exists import Status
+
+    class MockDB:
+        async def iterate(self, sql, values=None):
+            assert z < SiteRepo.TILE_MAX_ZOOM, "Clustered on the highest zoom"
+            if "GROUP BY\n" in sql:
+                for i, c in enumerate(counts):
+                    yield dict(count=c, lat=i, lon=i)
+
+    class MockRepo(SiteRepo):
+
+        async def all(self, *_, **__):
+            return []
+
+    repo = MockRepo(MockDB(), "test")
+    tile = await SiteRepo.tile.__wrapped__(repo, z, 0, 0, _status=Status.PUBLISHED)
+    if clustered:
+        assert tile.items is None
+        assert [c.count for c in tile.clusters] == counts
+    else:
+        assert tile.clusters is None
+        assert tile.items == []
+
+
+@pytest.mark.anyio
+async def test_stream_uses_fallback_images():
+    from muistot.backend.repos.exists import Status
+
+    class MockDB:
+        async def stream(self, sql, values=None):
+            assert "fallback_image" in sql
+            for i, (image, fallback) in enumerate([("own.jpg", None), (None, "memory.jpg"), (None, None)]):
+                yield dict(
+                    id=f"site-{i}",
+                    name=f"site-{i}",
+                    lang="fi",
+                    lat=10,
+                    lon=10,
+                    memories_count=1,
+                    image=image,
+                    fallback_image=fallback,
+                )
+
+    repo = SiteRepo(MockDB(), "test")
+    sites = [s async for s in await SiteRepo.stream.__wrapped__(repo, _status=Status.PUBLISHED)]
+    assert [s.image for s in sites] == ["own.jpg", "memory.jpg", None]
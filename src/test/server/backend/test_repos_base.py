@@ -53,10 +53,12 @@ def test_from_other_ok():
     class Mock:
         _user = "A"
         lang = "B"
+        statuses = dict()
 
     r = ProjectRepo(None).from_repo(Mock())
     assert r._user == "A"
     assert r.lang == "B"
+    assert r.statuses is Mock.statuses
 
 
 def test_indirect_inherit_warns(caplog):
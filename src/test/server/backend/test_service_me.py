@@ -5,7 +5,10 @@ from muistot.backend.services.me import *
 class MockManager:
 
     def __getattr__(self, item):
-        return lambda *_, **__: None
+        async def null(*_, **__):
+            return None
+
+        return null
 
 
 @pytest.mark.anyio
@@ -3,7 +3,7 @@ from fastapi import HTTPException, status
 from headers import ACCEPT_LANGUAGE, CONTENT_LANGUAGE
 from starlette.authentication import UnauthenticatedUser
 
-from muistot.backend.repos.base.utils import extract_language, check_language, not_implemented
+from muistot.backend.repos.base.utils import extract_language, check_language, in_list, not_implemented
 from muistot.config import Config
 
 
@@ -90,3 +90,87 @@ def test_get_language_no_throw():
     r.headers["Muistot-Language"] = "dwadwadwadwajdwadhwau"
 
     assert extract_language(r, default_on_invalid=True) == Config.localization.default
+
+
+@pytest.mark.parametrize("n, size", [(1, 1), (2, 2), (3, 4), (5, 8), (8, 8), (9, 16)])
+def test_in_list_padded(n, size):
+    condition, values = in_list("a", list(range(n)))
+    assert condition == ",".join(f":a_{i}" for i in range(size))
+    assert set(values.values()) == set(range(n))
+    assert values[f"a_{size - 1}"] == n - 1
+
+
+@pytest.mark.parametrize("key", [1, 2 ** 40, "site", "sité#1"])
+def test_cursor_round_trip(key):
+    from muistot.backend.api.utils._paging import encode_cursor, decode_cursor
+    assert decode_cursor(encode_cursor(key), type(key)) == key
+
+
+@pytest.mark.parametrize("cursor", ["", "!!!", "bm90IGpzb24", "InNpdGUi"])
+def test_cursor_bad(cursor):
+    from muistot.backend.api.utils import decode_cursor
+    with pytest.raises(HTTPException) as e:
+        decode_cursor(cursor, int)
+    assert e.value.status_code == status.HTTP_422_UNPROCESSABLE_ENTITY
+
+
+def test_paginate():
+    from muistot.backend.api.utils._paging import paginate, decode_cursor, page_size, PAGE_SIZE
+    items, cursor = paginate([1, 2, 3], 2, lambda o: o)
+    assert items == [1, 2]
+    assert decode_cursor(cursor, int) == 2
+    assert paginate([1, 2], 2, lambda o: o) == ([1, 2], None)
+    assert page_size(None, None) is None
+    assert page_size(None, cursor) == PAGE_SIZE
+    assert page_size(5, cursor) == 5
+
+
+@pytest.mark.anyio
+@pytest.mark.parametrize("n, chunk_size", [(0, 1 << 16), (1, 1 << 16), (50, 1 << 16), (50, 1)])
+async def test_streamed_matches_collection(n, chunk_size):
+    import json
+    from muistot.backend.api.utils import streamed
+    from muistot.backend.models import Comment, Comments
+
+    comments = [
+        Comment(id=i, user="user", comment=f"comment {i}", modified_at="2022-01-01T00:00:00")
+        for i in range(1, n + 1)
+    ]
+
+    async def items():
+        for c in comments:
+            yield c
+
+    r = streamed(items(), chunk_size=chunk_size)
+    body = b"".join([chunk async for chunk in r.body_iterator])
+    assert r.media_type == "application/json"
+    assert json.loads(body) == json.loads(Comments(items=comments).json(exclude_none=True))
+
+
+def test_snap_area():
+    from muistot.backend.api.utils._viewport import snap_area
+    area = (60.1234, 24.9, 60.1334, 24.95)
+    snapped = snap_area(area)
+    assert snapped[0] <= area[0] and snapped[1] <= area[1] and snapped[2] >= area[2] and snapped[3] >= area[3]
+    assert snapped[3] - snapped[1] < 2 * (area[3] - area[1])
+    assert snap_area((60.1235, 24.9001, 60.1335, 24.9501)) == snapped  # Panned slightly
+    assert snap_area((-90, -180, 90, 180)) == (-90, -180, 90, 180)
+    assert snap_area((1, 1, 1, 1))[0] < 1 < snap_area((1, 1, 1, 1))[2]
+
+
+@pytest.mark.parametrize("area", [
+    (0, None, None, None),
+    (0, 0, 10, None),
+    (10, 0, 0, 10),
+    (0, 10, 10, 0),
+])
+def test_viewport_bad_params(area):
+    from fastapi import HTTPException
+    from muistot.backend.api.utils import viewport
+    with pytest.raises(HTTPException):
+        viewport(*area)
+
+
+def test_viewport_none():
+    from muistot.backend.api.utils import viewport
+    assert viewport() is None
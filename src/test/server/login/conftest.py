@@ -65,19 +65,19 @@ async def client(db_instance):
     app.state.FastStorage.connect()
     app.state.SessionManager.connect()
 
-    app.state.FastStorage.redis.flushdb()
-    app.state.SessionManager.redis.flushdb()
+    await app.state.FastStorage.redis.flushdb()
+    await app.state.SessionManager.redis.flushdb()
 
     client = AsyncClient(app=app, base_url="http://test")
     client.app = app
     async with client as c:
         yield c
 
-    app.state.FastStorage.redis.flushdb()
-    app.state.SessionManager.redis.flushdb()
+    await app.state.FastStorage.redis.flushdb()
+    await app.state.SessionManager.redis.flushdb()
 
-    app.state.FastStorage.disconnect()
-    app.state.SessionManager.disconnect()
+    await app.state.FastStorage.disconnect()
+    await app.state.SessionManager.disconnect()
 
 
 @pytest.fixture
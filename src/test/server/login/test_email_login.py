@@ -4,7 +4,7 @@ import pytest
 from fastapi import HTTPException, status
 from headers import AUTHORIZATION
 
-from login_urls import EMAIL_LOGIN, STATUS, EMAIL_EXCHANGE
+from login_urls import EMAIL_LOGIN, STATUS, EMAIL_EXCHANGE, PW_LOGIN
 from muistot.login.logic.email import create_email_verifier, fetch_user_by_email, can_send_email
 from muistot.login.logic.email import send_login_email as send_email, hash_token
 from muistot.config import Config
@@ -67,7 +67,7 @@ async def test_create_503(db, user):
     """
     from muistot.login.logic.login import try_create_user
     with pytest.raises(HTTPException) as e:
-        await try_create_user(user.email, db, lang="en")
+        await try_create_user(user.email, db)
     assert e.value.status_code == status.HTTP_503_SERVICE_UNAVAILABLE
 
 
@@ -87,7 +87,7 @@ async def test_email_login_timeout_no_cache(non_existent_email, client):
     r = await client.post(f"{EMAIL_LOGIN}?email={non_existent_email}")
     assert r.status_code == status.HTTP_204_NO_CONTENT
 
-    client.app.state.FastStorage.redis.flushdb()
+    await client.app.state.FastStorage.redis.flushdb()
 
     r = await client.post(f"{EMAIL_LOGIN}?email={non_existent_email}")
     assert r.status_code == status.HTTP_429_TOO_MANY_REQUESTS
@@ -99,6 +99,30 @@ async def test_email_login_new_user(non_existent_email, client):
     assert r.status_code == status.HTTP_204_NO_CONTENT
 
 
+@pytest.mark.anyio
+async def test_email_login_new_user_is_passwordless(non_existent_email, client, capture_mail, db, monkeypatch):
+    from muistot.security import password
+
+    def fail(**_):
+        raise AssertionError("Hashed a password")
+
+    monkeypatch.setattr(password, "hash_password", fail)
+    monkeypatch.setattr(password, "check_password", fail)
+    monkeypatch.setattr(password, "verify_password", fail)
+
+    r = await client.post(f"{EMAIL_LOGIN}?email={non_existent_email}")
+    assert r.status_code == status.HTTP_204_NO_CONTENT
+
+    user = capture_mail[("login", non_existent_email)]["user"]
+    assert await db.fetch_val(
+        "SELECT password_hash IS NULL FROM users WHERE username = :user",
+        values=dict(user=user),
+    )
+
+    r = await client.post(PW_LOGIN, json={"username": user, "password": ""})
+    assert r.status_code == status.HTTP_400_BAD_REQUEST
+
+
 @pytest.mark.anyio
 async def test_email_login_full(non_existent_email, client, capture_mail):
     r = await client.post(f"{EMAIL_LOGIN}?email={non_existent_email}")
@@ -109,6 +109,27 @@ async def test_login_email(client, verified_user):
     assert r.status_code == status.HTTP_200_OK
 
 
+@pytest.mark.anyio
+async def test_login_rehashes_outdated_cost(client, verified_user, db):
+    from passlib.context import CryptContext
+    from muistot.security.password import crypto_context
+
+    user = verified_user
+    old = CryptContext(schemes=["bcrypt"], bcrypt__default_rounds=4).hash(user.password)
+    await db.execute(
+        "UPDATE users SET password_hash = :hash WHERE id = :id",
+        values=dict(hash=old, id=user.id),
+    )
+
+    r = await client.post(PW_LOGIN, json={"username": user.username, "password": user.password})
+    assert r.status_code == status.HTTP_200_OK, r.text
+
+    stored = await db.fetch_val("SELECT password_hash FROM users WHERE id = :id", values=dict(id=user.id))
+    assert stored != old.encode("ascii")
+    assert not crypto_context.needs_update(stored)
+    assert crypto_context.verify(user.password, stored)
+
+
 @pytest.mark.anyio
 async def test_login_both_fails(client, verified_user):
     user = verified_user
@@ -143,7 +164,7 @@ async def test_login_scopes_admin_works(client, verified_user, admin):
     assert r.status_code == status.HTTP_200_OK, r.text
     auth = r.headers[AUTHORIZATION]
 
-    s = client.app.state.SessionManager.get_session(auth.partition(' ')[2])
+    s = await client.app.state.SessionManager.get_session(auth.partition(' ')[2])
     assert scopes.ADMIN in s.data["scopes"]
     assert len(s.data["projects"]) == 1
 
@@ -161,7 +182,7 @@ async def test_login_scopes_superuser_works(client, verified_user, superuser):
     assert r.status_code == status.HTTP_200_OK, r.text
     auth = r.headers[AUTHORIZATION]
 
-    s = client.app.state.SessionManager.get_session(auth.partition(' ')[2])
+    s = await client.app.state.SessionManager.get_session(auth.partition(' ')[2])
     assert scopes.SUPERUSER in s.data["scopes"]
     assert scopes.ADMIN in s.data["scopes"]
 
@@ -0,0 +1,34 @@
+import pytest
+
+
+def _count_transaction_calls(dialect, monkeypatch):
+    """Counts the COMMIT and ROLLBACK round trips made through the dialect
+
+    The pool reset uses the same dialect methods.
+    """
+    calls = list()
+
+    def counted(name):
+        wrapped = getattr(dialect, name)
+
+        def call(connection):
+            calls.append(name)
+            return wrapped(connection)
+
+        return call
+
+    for n in ("do_commit", "do_rollback"):
+        monkeypatch.setattr(dialect, n, counted(n))
+    return calls
+
+
+@pytest.mark.anyio
+@pytest.mark.parametrize("read_only,expected", [
+    (False, 2),
+    (True, 1),
+])
+async def test_transaction_round_trips(db_instance, monkeypatch, read_only, expected):
+    calls = _count_transaction_calls(db_instance.engine.sync_engine.dialect, monkeypatch)
+    async with db_instance(read_only=read_only) as db:
+        assert await db.fetch_val("SELECT 1") == 1
+    assert len(calls) == expected, calls